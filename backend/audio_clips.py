@@ -0,0 +1,240 @@
+import asyncio
+import os
+import threading
+import time
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+from latency import LatencyHistogram
+from media_info import load_media_info
+
+"""
+Async version of poc/ffmpeg_util.make_audio_mp3 for the server.
+
+ffmpeg runs as an asyncio subprocess, so the event loop keeps serving clients
+while it encodes, and `-progress pipe:1` lets us stream how far along it is.
+
+ClipEncoder puts a bounded number of those jobs in flight at once. Hotkey
+presses submit and return immediately; extra clips queue for a free slot.
+
+Most sources already carry AAC or Opus, which Anki plays as is. In COPY mode
+the clip is cut on packet boundaries with `-c:a copy` into a matching
+container, which runs at I/O speed and keeps the original quality.
+"""
+
+
+COPY_CONTAINERS = {"aac": ".m4a", "opus": ".opus", "vorbis": ".ogg", "mp3": ".mp3", "flac": ".flac"}
+ENCODE = "encode"
+COPY = "copy"
+
+
+class AudioStreamInfo(NamedTuple):
+    codec: Optional[str]
+    start_time: float
+    packet_duration: Optional[float]  # seconds per packet, None if irregular or unknown
+
+
+def audio_clip_command(video_path, t1, t2, dest_file_path, codec_args=("-acodec", "mp3")):
+    duration = t2 - t1
+    return [
+        "ffmpeg", "-hide_banner", "-loglevel", "error", "-nostats", "-progress", "pipe:1",
+        "-ss", str(t1), "-i", str(video_path), "-t", str(duration),
+        "-vn", *codec_args, str(dest_file_path), "-y"
+    ]
+
+
+async def run_ffmpeg(command, duration, progress=None):
+    """
+    Run an ffmpeg command that has `-progress pipe:1`. progress, if given, is
+    called with {"fraction": 0..1}. Cancelling the awaiting task kills ffmpeg.
+    """
+    process = await asyncio.create_subprocess_exec(
+        *command,
+        stdin=asyncio.subprocess.DEVNULL,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE
+    )
+    try:
+        async for line in process.stdout:
+            key, _, value = line.decode(errors="replace").strip().partition("=")
+            # Despite the name, out_time_ms is in microseconds
+            if progress and key == "out_time_ms" and value.isdigit():
+                progress({"fraction": round(min(1.0, int(value) / 1_000_000 / duration), 3)})
+        stderr = await process.stderr.read()
+        returncode = await process.wait()
+    except asyncio.CancelledError:
+        if process.returncode is None:
+            process.kill()
+            await process.wait()
+        raise
+
+    if returncode != 0:
+        raise RuntimeError(f"FFmpeg failed with return code {returncode}: {stderr.decode(errors='replace').strip()}")
+
+
+async def make_audio_mp3(video_path, t1, t2, dest_file_path: Path, progress=None):
+    """Clip [t1, t2] of video_path's audio to an mp3"""
+    duration = t2 - t1
+    if duration <= 0:
+        raise ValueError(f"Clip end ({t2}) must be after its start ({t1})")
+
+    Path(dest_file_path).parent.mkdir(parents=True, exist_ok=True)
+    await run_ffmpeg(audio_clip_command(video_path, t1, t2, dest_file_path), duration, progress)
+    return Path(dest_file_path)
+
+
+async def probe_audio_stream(video_path):
+    """Codec and packet spacing of the first audio stream, from the shared media info cache"""
+    info = await asyncio.get_running_loop().run_in_executor(None, load_media_info, video_path)
+    return AudioStreamInfo(info.audio_codec, info.audio_start_time, info.audio_packet_duration)
+
+
+def snap_to_packet(t, info, tolerance):
+    """Nearest packet boundary to t, or None if that is further than tolerance away"""
+    if not info.packet_duration:
+        return None
+    packets = round((t - info.start_time) / info.packet_duration)
+    snapped = max(info.start_time, info.start_time + packets * info.packet_duration)
+    return snapped if abs(snapped - t) <= tolerance else None
+
+
+async def make_audio_clip(video_path, t1, t2, dest_file_path: Path, progress=None, mode=ENCODE, tolerance=0.05):
+    """
+    Clip [t1, t2] of video_path's audio. mode ENCODE always re-encodes to
+    dest_file_path's format. mode COPY stream-copies when the source codec has
+    a container we can put it in and both ends snap to a packet boundary within
+    tolerance seconds; the file then gets that container's extension. Otherwise
+    it falls back to ENCODE. Returns (path, mode actually used, t1, t2).
+    """
+    if t2 - t1 <= 0:
+        raise ValueError(f"Clip end ({t2}) must be after its start ({t1})")
+
+    if mode == COPY:
+        info = await probe_audio_stream(video_path)
+        suffix = COPY_CONTAINERS.get(info.codec)
+        start, end = snap_to_packet(t1, info, tolerance), snap_to_packet(t2, info, tolerance)
+        if suffix and start is not None and end is not None and end > start:
+            dest = Path(dest_file_path).with_suffix(suffix)
+            dest.parent.mkdir(parents=True, exist_ok=True)
+            command = audio_clip_command(video_path, start, end, dest, ("-c:a", "copy"))
+            await run_ffmpeg(command, end - start, progress)
+            return dest, COPY, start, end
+
+    return await make_audio_mp3(video_path, t1, t2, dest_file_path, progress), ENCODE, t1, t2
+
+
+class ClipResult(NamedTuple):
+    path: Path
+    queued: float  # seconds spent waiting for a free slot
+    encode: float  # seconds ffmpeg ran
+    mode: str  # ENCODE or COPY, whichever was actually used
+    start: float  # clip span after snapping to packets
+    end: float
+
+
+class ClipEncoder:
+    def __init__(self, max_jobs=None, loop=None, mode=ENCODE, tolerance=0.05):
+        """
+        max_jobs: ffmpeg processes allowed to run at once, default one per core
+        loop: event loop to run jobs on. Set it before the first submit to share
+            the server's loop; otherwise the encoder starts its own loop thread.
+        mode, tolerance: default clip mode and packet snapping, see make_audio_clip
+        """
+        self.max_jobs = max_jobs or os.cpu_count() or 1
+        self.loop = loop
+        self.mode = mode
+        self.tolerance = tolerance
+        self.slots = None
+        self.lock = threading.Lock()
+        self.latest = {}  # replace key -> Future of the newest job for it
+        self.histogram = LatencyHistogram("clip encode")
+        self.running = 0
+        self.queued = 0
+        self.completed = 0
+        self.cancelled = 0
+        self.failed = 0
+
+    def submit(self, video_path, t1, t2, dest_file_path, progress=None, replace_key=None, mode=None):
+        """
+        Queue a clip from any thread. Returns a concurrent.futures.Future of
+        ClipResult. A job submitted with the same replace_key (default: the
+        destination path) cancels the older one, queued or running.
+        """
+        loop = self._ensure_loop()
+        future = asyncio.run_coroutine_threadsafe(
+            self._job(video_path, t1, t2, dest_file_path, progress, mode or self.mode, time.perf_counter()), loop
+        )
+        key = replace_key if replace_key is not None else str(Path(dest_file_path).resolve())
+        with self.lock:
+            previous = self.latest.get(key)
+            self.latest[key] = future
+        if previous is not None:
+            previous.cancel()
+        future.add_done_callback(lambda done: self._forget(key, done))
+        return future
+
+    async def clip(self, video_path, t1, t2, dest_file_path, progress=None, replace_key=None, mode=None):
+        """Awaitable submit. Cancelling the awaiting task cancels the job."""
+        future = self.submit(video_path, t1, t2, dest_file_path, progress, replace_key, mode)
+        return await asyncio.wrap_future(future)
+
+    def stats(self):
+        return {
+            "max_jobs": self.max_jobs,
+            "running": self.running,
+            "queued": self.queued,
+            "completed": self.completed,
+            "cancelled": self.cancelled,
+            "failed": self.failed,
+            "encode": self.histogram.summary(),
+        }
+
+    def stop(self):
+        with self.lock:
+            futures = list(self.latest.values())
+        for future in futures:
+            future.cancel()
+
+    async def _job(self, video_path, t1, t2, dest_file_path, progress, mode, submitted):
+        if self.slots is None:
+            self.slots = asyncio.Semaphore(self.max_jobs)
+        self.queued += 1
+        try:
+            await self.slots.acquire()
+        except asyncio.CancelledError:
+            self.queued -= 1
+            self.cancelled += 1
+            raise
+        self.queued -= 1
+        self.running += 1
+        started = time.perf_counter()
+        try:
+            path, used, start, end = await make_audio_clip(
+                video_path, t1, t2, dest_file_path, progress, mode, self.tolerance
+            )
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            self.running -= 1
+            self.slots.release()
+
+        finished = time.perf_counter()
+        self.completed += 1
+        self.histogram.record(finished - started)
+        return ClipResult(path, started - submitted, finished - started, used, start, end)
+
+    def _forget(self, key, future):
+        with self.lock:
+            if self.latest.get(key) is future:
+                del self.latest[key]
+
+    def _ensure_loop(self):
+        with self.lock:
+            if self.loop is None:
+                self.loop = asyncio.new_event_loop()
+                threading.Thread(target=self.loop.run_forever, name="clip-encoder", daemon=True).start()
+            return self.loop
@@ -0,0 +1,267 @@
+import asyncio
+import base64
+import functools
+import time
+from pathlib import Path
+from typing import Callable, NamedTuple, Optional
+
+from commands import CommandError
+from frame_search import find_frame
+from pcm_buffer import encode_pcm
+from player_state import PlayerSnapshot
+from raw_screenshots import RawScreenshotPipeline
+from screenshot_pipeline import ScreenshotError, ScreenshotPipeline
+
+"""
+Capture handlers hosted by MPVWebSocketServer.
+
+These replace running poc/mpv_screenshot.py, poc/grab_audio.py and
+poc/timestamp_hotkey.py side by side, each with its own libmpv instance. A
+handler declares the mpv hotkeys and WebSocket commands it answers to. The
+server builds a CaptureContext at the moment of the keypress or request and
+awaits handler.capture(host, context) on its event loop. Blocking work goes
+through host.run_blocking, which uses the server's shared worker pool.
+
+Every context carries the snapshot and position taken at trigger time, so a
+screenshot and an audio clip from the same moment use the same clock.
+"""
+
+
+# Result fields only the requesting client gets; broadcasts and the replay log leave them out
+RESPONSE_ONLY_FIELDS = ("data",)
+
+
+class CaptureError(CommandError):
+    pass
+
+
+def output_path(directory, path):
+    """
+    A client-supplied output path, taken relative to directory. Raises
+    CaptureError if it resolves to anywhere outside directory, so a request
+    cannot write files elsewhere on the machine.
+    """
+    directory = Path(directory).resolve()
+    resolved = (directory / path).resolve()
+    if directory not in resolved.parents:
+        raise CaptureError(f"path must be inside {directory}")
+    return resolved
+
+
+class CaptureContext(NamedTuple):
+    action: str
+    args: dict
+    snapshot: PlayerSnapshot  # player state when the capture was triggered
+    time_pos: Optional[float]  # position estimated at triggered_at
+    triggered_at: float  # time.monotonic() of the keypress or request
+    progress: Callable[[dict], None]
+
+
+class CaptureHandler:
+    name = "capture"
+    hotkeys = {}  # mpv key -> action
+    commands = {}  # WebSocket command -> action
+
+    async def capture(self, host, context):
+        """Do the capture and return a JSON-serializable result dict"""
+        raise NotImplementedError
+
+
+class ScreenshotHandler(CaptureHandler):
+    name = "screenshot"
+
+    def __init__(self, hotkey='k', directory=None, prefix="screenshot", includes="subtitles", verify=False):
+        self.hotkeys = {hotkey: "capture"}
+        self.commands = {"screenshot": "capture", "screenshot_latency": "latency"}
+        self.directory = Path(directory) if directory else Path.cwd() / "screenshots"
+        self.prefix = prefix
+        self.includes = includes
+        self.verify = verify
+        self.pipeline = None
+
+    async def capture(self, host, context):
+        """
+        capture: args path (optional, under the screenshots directory),
+            includes ("subtitles", "video" or "window"),
+            verify (find the frame the screenshot shows, see frame_search.py)
+        latency: capture latency histogram so far
+        """
+        if self.pipeline is None:
+            self.pipeline = ScreenshotPipeline(host.player)
+        if context.action == "latency":
+            return self.pipeline.histogram.summary()
+
+        if context.args.get("path"):
+            path = output_path(self.directory, context.args["path"])
+        else:
+            path = self.directory / f"{self.prefix} - {context.time_pos}.jpg"
+        try:
+            screenshot = await asyncio.wrap_future(
+                self.pipeline.capture(path, context.args.get("includes", self.includes))
+            )
+        except ScreenshotError as e:
+            raise CaptureError(str(e))
+        result = {"path": str(screenshot.path), "latency_ms": round(screenshot.latency * 1000, 3)}
+
+        if context.args.get("verify", self.verify) and context.snapshot.path and context.time_pos is not None:
+            try:
+                match = await host.run_blocking(find_frame, context.snapshot.path, screenshot.path, context.time_pos)
+            except RuntimeError as e:
+                result["verify"] = {"error": str(e)}
+            else:
+                result["verify"] = {
+                    "time": match.time,
+                    "offset_ms": round((match.time - context.time_pos) * 1000, 3),
+                    "mse": round(match.mse, 3),
+                    "ssim": round(match.ssim, 4),
+                    "frames": match.frames,
+                }
+        return result
+
+
+class RawScreenshotHandler(CaptureHandler):
+    name = "raw_screenshot"
+
+    def __init__(self, hotkey=None, image_format="jpeg", max_width=None, max_height=None, quality=90,
+                 directory=None):
+        self.hotkeys = {hotkey: "capture"} if hotkey else {}
+        self.commands = {"screenshot_raw": "capture"}
+        self.directory = Path(directory) if directory else Path.cwd() / "screenshots"
+        self.encode_options = {
+            "image_format": image_format, "max_width": max_width, "max_height": max_height, "quality": quality
+        }
+        self.pipeline = None
+
+    async def capture(self, host, context):
+        """
+        args: format ("jpeg", "webp", "png"), max_width, max_height, quality,
+        includes, path (also write to disk, under the screenshots directory),
+        inline (return the bytes base64-encoded)
+        """
+        if self.pipeline is None:
+            self.pipeline = RawScreenshotPipeline(host.player, executor=host.workers)
+
+        options = dict(self.encode_options)
+        for arg, option in (("format", "image_format"), ("max_width", "max_width"),
+                            ("max_height", "max_height"), ("quality", "quality")):
+            if context.args.get(arg) is not None:
+                options[option] = context.args[arg]
+        if context.args.get("path"):
+            options["path"] = output_path(self.directory, context.args["path"])
+        try:
+            # The grab blocks on mpv, so it goes to the pool too; the encode is queued behind it
+            capture = functools.partial(self.pipeline.capture, context.args.get("includes", "subtitles"), **options)
+            future = await host.run_blocking(capture)
+            screenshot = await asyncio.wrap_future(future)
+        except (ValueError, RuntimeError) as e:
+            raise CaptureError(str(e))
+
+        result = {
+            "format": screenshot.format,
+            "width": screenshot.width,
+            "height": screenshot.height,
+            "size": len(screenshot.data),
+            "path": str(screenshot.path) if screenshot.path else None,
+            "grab_ms": round(screenshot.grab_latency * 1000, 3),
+            "encode_ms": round(screenshot.encode_latency * 1000, 3),
+        }
+        if context.args.get("inline"):
+            result["data"] = base64.b64encode(screenshot.data).decode("ascii")
+        return result
+
+
+class AudioClipHandler(CaptureHandler):
+    name = "audio_clip"
+
+    def __init__(self, start_hotkey='c', end_hotkey='n', directory=None, prefix="clip"):
+        self.hotkeys = {start_hotkey: "start", end_hotkey: "end"}
+        self.commands = {"clip_audio": "clip", "clip_start": "start", "clip_end": "end", "clip_stats": "stats"}
+        self.directory = Path(directory) if directory else Path.cwd() / "audio"
+        self.prefix = prefix
+        self.start_of_recording = None
+
+    async def capture(self, host, context):
+        """
+        start: remember the current position
+        end: clip from the remembered start to the current position
+        clip: args start, end (seconds), path (optional, under the audio
+            directory), replace (cancel the unfinished clip submitted with the
+            same replace key), mode ("encode" or "copy" to stream-copy when the
+            source codec allows)
+        stats: encoder queue and timing
+        """
+        if context.action == "stats":
+            return host.clips.stats()
+        if context.action == "start":
+            self.start_of_recording = context.time_pos
+            return {"start": context.time_pos}
+
+        if context.action == "end":
+            if self.start_of_recording is None:
+                raise CaptureError("Press the start hotkey before the end hotkey")
+            start, end = self.start_of_recording, context.time_pos
+            self.start_of_recording = None
+        else:
+            if context.args.get("start") is None or context.args.get("end") is None:
+                raise CaptureError("clip_audio needs start and end")
+            start, end = float(context.args["start"]), float(context.args["end"])
+
+        source = context.snapshot.path
+        if not source:
+            raise CaptureError("No file loaded")
+        if context.args.get("path"):
+            path = output_path(self.directory, context.args["path"])
+        else:
+            path = self.directory / f"{self.prefix} - {start} - {end}.mp3"
+
+        # Inside the decoded window: slice and encode, no reopen or seek
+        tap = host.pcm_tap
+        samples = tap.buffer.slice(start, end) if tap and tap.path == source else None
+        if samples is not None:
+            started = time.perf_counter()
+            try:
+                await host.run_blocking(encode_pcm, samples, tap.buffer.sample_rate, path)
+            except RuntimeError as e:
+                raise CaptureError(str(e))
+            return {
+                "path": str(path),
+                "start": start,
+                "end": end,
+                "source": "pcm_buffer",
+                "encode_ms": round((time.perf_counter() - started) * 1000, 3),
+            }
+
+        try:
+            clip = await host.clips.clip(
+                source, start, end, path, context.progress, context.args.get("replace"), context.args.get("mode")
+            )
+        except (ValueError, RuntimeError) as e:
+            raise CaptureError(str(e))
+        return {
+            "path": str(clip.path),
+            "start": clip.start,
+            "end": clip.end,
+            "source": "ffmpeg",
+            "mode": clip.mode,
+            "queued_ms": round(clip.queued * 1000, 3),
+            "encode_ms": round(clip.encode * 1000, 3),
+        }
+
+
+class TimeHarvestHandler(CaptureHandler):
+    name = "time_harvest"
+
+    def __init__(self, hotkey='h'):
+        self.hotkeys = {hotkey: "capture"}
+        self.commands = {"harvest_time": "capture"}
+
+    async def capture(self, host, context):
+        return {
+            "time_pos": context.time_pos,
+            "formatted_time": host.format_time(context.time_pos),
+            "wall_time": time.time(),
+        }
+
+
+def default_capture_handlers():
+    return [ScreenshotHandler(), RawScreenshotHandler(), AudioClipHandler(), TimeHarvestHandler()]
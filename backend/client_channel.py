@@ -0,0 +1,136 @@
+import asyncio
+import time
+from collections import deque
+
+from topics import Subscription
+from wire import PROTOCOL_JSON
+
+"""
+Per-client outgoing queue for the WebSocket server.
+
+Broadcasting only appends to each client's bounded deque; a sender task per
+client drains it. A slow client therefore only delays itself, and memory stays
+bounded no matter how fast messages are produced.
+"""
+
+DROP_OLDEST = "drop_oldest"  # on overflow, discard the oldest queued message of a droppable type
+NEVER_DROP = "never_drop"  # always queued, even past the bound (an "overflow")
+
+DEFAULT_POLICIES = {
+    "time_update": DROP_OLDEST,
+}
+
+
+class ClientChannel:
+    def __init__(self, websocket, maxsize=64, max_overflows=16, policies=None, on_close=None,
+                 protocol=PROTOCOL_JSON, metrics=None, subscription=None):
+        """
+        maxsize: queue depth at which the overflow policies kick in
+        max_overflows: NEVER_DROP messages queued past maxsize before the client
+            is disconnected; the count resets whenever the queue drains completely
+        policies: message type -> DROP_OLDEST / NEVER_DROP, default NEVER_DROP
+        on_close: called with this channel once it stops sending
+        protocol: wire format negotiated for this client, see wire.py
+        metrics: Metrics to record queue wait and send time into
+        subscription: the topics this client gets broadcasts for, default all
+        """
+        self.websocket = websocket
+        self.protocol = protocol
+        self.subscription = subscription or Subscription()
+        self.maxsize = maxsize
+        self.max_overflows = max_overflows
+        self.policies = DEFAULT_POLICIES if policies is None else policies
+        self.on_close = on_close
+        self.metrics = metrics
+        self.queue = deque()
+        self.wakeup = asyncio.Event()
+        self.sender_task = None
+        self.closed = False
+        self.overflows = 0
+        self.sent = 0
+        self.dropped = 0
+        self.total_overflows = 0
+        self.max_depth = 0
+
+    def start(self):
+        self.sender_task = asyncio.create_task(self._sender())
+
+    def offer(self, msg_type, payload):
+        """Queue a serialized message. Returns False once the client has been dropped."""
+        if self.closed:
+            return False
+
+        if len(self.queue) >= self.maxsize:
+            if self.policies.get(msg_type, NEVER_DROP) == DROP_OLDEST:
+                for item in self.queue:
+                    if self.policies.get(item[0], NEVER_DROP) == DROP_OLDEST:
+                        self.queue.remove(item)
+                        self.dropped += 1
+                        break
+                else:
+                    # Nothing older is droppable, so this sample is the cheapest to lose
+                    self.dropped += 1
+                    return True
+            else:
+                self.overflows += 1
+                self.total_overflows += 1
+                if self.overflows > self.max_overflows:
+                    self.close()
+                    return False
+
+        self.queue.append((msg_type, payload, time.perf_counter()))
+        if len(self.queue) > self.max_depth:
+            self.max_depth = len(self.queue)
+        self.wakeup.set()
+        return True
+
+    async def _sender(self):
+        try:
+            while True:
+                if not self.queue:
+                    self.overflows = 0
+                    self.wakeup.clear()
+                    await self.wakeup.wait()
+                    continue
+                _msg_type, payload, queued_at = self.queue.popleft()
+                if self.metrics is None:
+                    await self.websocket.send(payload)
+                else:
+                    started = time.perf_counter()
+                    self.metrics.record("client_queue_wait", started - queued_at)
+                    await self.websocket.send(payload)
+                    self.metrics.record("client_send", time.perf_counter() - started)
+                self.sent += 1
+        except asyncio.CancelledError:
+            pass
+        except Exception:
+            # Connection went away mid-send; handle_client cleans up the socket
+            pass
+        finally:
+            self._finish()
+
+    def close(self):
+        """Stop sending and disconnect the client"""
+        if self.closed:
+            return
+        self._finish()
+        if self.sender_task and not self.sender_task.done():
+            self.sender_task.cancel()
+        asyncio.ensure_future(self.websocket.close())
+
+    def _finish(self):
+        if self.closed:
+            return
+        self.closed = True
+        self.queue.clear()
+        if self.on_close:
+            self.on_close(self)
+
+    def stats(self):
+        return {
+            "depth": len(self.queue),
+            "max_depth": self.max_depth,
+            "sent": self.sent,
+            "dropped": self.dropped,
+            "overflows": self.total_overflows,
+        }
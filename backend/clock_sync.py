@@ -0,0 +1,183 @@
+import threading
+import time
+from typing import NamedTuple
+
+"""
+Clock-anchor time sync.
+
+Instead of streaming every position sample, the server publishes an anchor
+(media_time, server_monotonic, speed, paused) whenever the timeline changes:
+play, pause, seek, speed change, or measurable drift. Clients extrapolate the
+current position from the latest anchor using their own clock.
+
+Server side: AnchorStream. Client side reference: ClockExtrapolator.
+"""
+
+
+class ClockAnchor(NamedTuple):
+    media_time: float
+    server_monotonic: float
+    speed: float
+    paused: bool
+
+    def position_at(self, server_monotonic):
+        """Media time at a given server monotonic time"""
+        if self.paused:
+            return self.media_time
+        return self.media_time + (server_monotonic - self.server_monotonic) * self.speed
+
+
+def anchor_from_snapshot(snapshot, now=None, clock_rate=1.0):
+    """
+    Build an anchor from a PlayerSnapshot. While paused the position is pinned to
+    `now`, otherwise to the moment time_pos was observed. clock_rate is the
+    measured media-clock rate against the monotonic clock; it is folded into speed.
+    """
+    if now is None:
+        now = time.monotonic()
+    at = now if snapshot.paused else snapshot.time_pos_at
+    speed = (snapshot.speed or 1.0) * clock_rate
+    return ClockAnchor(snapshot.time_pos, at, speed, bool(snapshot.paused))
+
+
+class AnchorStream:
+    def __init__(self, emit, snapshot_source, drift_threshold=0.08, verify_interval=2.0):
+        """
+        emit: called with (ClockAnchor, reason) whenever a new anchor should go out
+        snapshot_source: returns the current PlayerSnapshot for drift checks
+        drift_threshold: seconds the observed position may stray from the
+            current anchor before a new one is published
+        verify_interval: seconds between drift checks while playing
+        """
+        self.emit = emit
+        self.snapshot_source = snapshot_source
+        self.drift_threshold = drift_threshold
+        self.verify_interval = verify_interval
+        self.loop = None  # asyncio loop that runs the drift checks
+        self.lock = threading.Lock()
+        self.active = False
+        self.anchor = None
+        self.pending_reason = "start"  # anchor on the next time-pos sample
+        self.check_handle = None
+        self.clock_rate = 1.0  # learned from drift; mpv's media clock follows the audio device
+
+    def start(self):
+        with self.lock:
+            self.active = True
+            self.anchor = None
+            self.pending_reason = "start"
+
+    def stop(self):
+        with self.lock:
+            self.active = False
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self._cancel_check)
+
+    def mark_seek(self):
+        with self.lock:
+            self.pending_reason = "seek"
+
+    def on_time_pos(self, snapshot):
+        """Every time-pos sample; only anchors if one is pending"""
+        with self.lock:
+            if not self.active or self.pending_reason is None or snapshot.time_pos is None:
+                return
+            reason = self.pending_reason
+            self.pending_reason = None
+        self._publish(snapshot, reason)
+
+    def on_pause(self, snapshot):
+        if snapshot.paused:
+            if snapshot.time_pos is not None:
+                self._publish(snapshot, "pause")
+        else:
+            # time_pos_at is stale after a pause; anchor on the first fresh sample
+            with self.lock:
+                self.pending_reason = "play"
+
+    def on_speed(self, snapshot):
+        if snapshot.time_pos is not None:
+            self._publish(snapshot, "speed")
+
+    def check_drift(self, snapshot, now=None):
+        """Publish a new anchor if the observed position strays from the current one"""
+        anchor = self.anchor
+        if not self.active or anchor is None or snapshot.paused or snapshot.time_pos is None:
+            return None
+        elapsed = snapshot.time_pos_at - anchor.server_monotonic
+        drift = snapshot.time_pos - anchor.position_at(snapshot.time_pos_at)
+        if abs(drift) > self.drift_threshold:
+            if elapsed >= self.verify_interval and snapshot.speed:
+                measured = (snapshot.time_pos - anchor.media_time) / (elapsed * snapshot.speed)
+                # Anything further off than 1% is a missed seek, not clock skew
+                if 0.99 < measured < 1.01:
+                    self.clock_rate = measured
+            self._publish(snapshot, "drift", now)
+        return drift
+
+    def _publish(self, snapshot, reason, now=None):
+        with self.lock:
+            if not self.active:
+                return
+            anchor = anchor_from_snapshot(snapshot, now, self.clock_rate)
+            self.anchor = anchor
+        self.emit(anchor, reason)
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self._schedule_check, not anchor.paused)
+
+    def _schedule_check(self, playing):
+        # Runs on the asyncio loop. Paused players get no timer at all.
+        self._cancel_check()
+        if playing and self.active:
+            self.check_handle = self.loop.call_later(self.verify_interval, self._run_check)
+
+    def _cancel_check(self):
+        if self.check_handle is not None:
+            self.check_handle.cancel()
+            self.check_handle = None
+
+    def _run_check(self):
+        self.check_handle = None
+        self.check_drift(self.snapshot_source())
+        anchor = self.anchor
+        if self.check_handle is None and anchor is not None and not anchor.paused:
+            self._schedule_check(True)
+
+
+class ClockExtrapolator:
+    """
+    Reference client: feed it the server's anchors and ask for the position.
+
+    The server/client clock offset is estimated from each message's
+    server_monotonic and the local receive time. Network delay only ever makes
+    the offset look smaller, so the largest estimate seen is kept.
+    """
+
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self.offset = None  # server_monotonic - local clock
+        self.anchor = None
+
+    def observe_server_time(self, server_monotonic, received_at=None):
+        if received_at is None:
+            received_at = self.clock()
+        estimate = server_monotonic - received_at
+        if self.offset is None or estimate > self.offset:
+            self.offset = estimate
+
+    def on_anchor(self, anchor, received_at=None):
+        """anchor: a ClockAnchor or the "anchor" dict from a time_update message"""
+        if isinstance(anchor, dict):
+            anchor = ClockAnchor(**anchor)
+        # Anchors may be pinned to an observation made before the send, so they
+        # cannot refine the offset; only seed it if nothing better exists yet.
+        if self.offset is None:
+            self.observe_server_time(anchor.server_monotonic, received_at)
+        self.anchor = anchor
+
+    def position(self, now=None):
+        if self.anchor is None or self.offset is None:
+            return None
+        if now is None:
+            now = self.clock()
+        return self.anchor.position_at(now + self.offset)
@@ -0,0 +1,103 @@
+import asyncio
+import time
+
+"""
+Request/response commands over the WebSocket.
+
+    client -> {"type": "request", "id": 7, "command": "seek", "args": {"position": 12.5}}
+    server -> {"type": "progress", "id": 7, "progress": {...}}            (long jobs, 0..n times)
+    server -> {"type": "response", "id": 7, "ok": true, "result": {...}, "elapsed_ms": 0.4}
+    server -> {"type": "response", "id": 7, "ok": false, "error": "..."}
+
+    client -> {"type": "cancel", "id": 7}
+
+Every request runs in its own task, so many can be in flight on one socket and
+responses come back in completion order. Clients match them up by id.
+"""
+
+
+class CommandError(Exception):
+    """A command failed in a way the client should see as a plain error message"""
+
+
+class CommandDispatcher:
+    def __init__(self):
+        self.handlers = {}
+        self.in_flight = {}  # (client key, request id) -> Task
+
+    def register(self, name, handler):
+        """
+        handler(args, progress) is a coroutine function. args is the request's
+        "args" dict; progress(dict) streams an update to the requesting client.
+        """
+        self.handlers[name] = handler
+
+    def dispatch(self, client, request, send):
+        """
+        Start handling a decoded request. send(message_dict) queues a reply to the
+        requesting client. Never awaits, so the read loop keeps pulling requests.
+        """
+        request_id = request.get("id")
+        if request_id is not None and not isinstance(request_id, (str, int)):
+            send(self._error(None, "Request id must be a string, an integer or null"))
+            return
+        key = (id(client), request_id)
+
+        if request.get("type") == "cancel":
+            task = self.in_flight.get(key)
+            if task:
+                task.cancel()
+            return
+
+        handler = self.handlers.get(request.get("command"))
+        if handler is None:
+            send(self._error(request_id, f"Unknown command: {request.get('command')}"))
+            return
+        if key in self.in_flight:
+            send(self._error(request_id, f"Request id {request_id} is already in flight"))
+            return
+
+        task = asyncio.create_task(self._run(handler, request, send))
+        self.in_flight[key] = task
+
+        def finished(task):
+            self.in_flight.pop(key, None)
+            # Covers tasks cancelled before they ever started running
+            if task.cancelled():
+                send(self._error(request_id, "Cancelled"))
+
+        task.add_done_callback(finished)
+
+    def cancel_client(self, client):
+        """Cancel everything a disconnected client still had in flight"""
+        for (client_key, _request_id), task in list(self.in_flight.items()):
+            if client_key == id(client):
+                task.cancel()
+
+    async def _run(self, handler, request, send):
+        request_id = request.get("id")
+        started = time.perf_counter()
+
+        def progress(update):
+            send({"type": "progress", "id": request_id, "progress": update})
+
+        try:
+            result = await handler(request.get("args") or {}, progress)
+        except CommandError as e:
+            send(self._error(request_id, str(e)))
+            return
+        except Exception as e:
+            send(self._error(request_id, f"{type(e).__name__}: {e}"))
+            return
+
+        send({
+            "type": "response",
+            "id": request_id,
+            "ok": True,
+            "result": result,
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 3),
+        })
+
+    @staticmethod
+    def _error(request_id, message):
+        return {"type": "response", "id": request_id, "ok": False, "error": message}
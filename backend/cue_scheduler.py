@@ -0,0 +1,96 @@
+import threading
+import time
+
+"""
+Boundary-predictive cue scheduling.
+
+Given the playhead, the playback speed and the subtitle timeline, the next cue
+change happens at a known moment. CueScheduler arms a single timer on the
+asyncio loop for that moment, fires the cue update exactly then and arms the
+next one. Nothing runs between cue boundaries; seek, pause and speed changes
+throw the timer away and compute a new one.
+"""
+
+
+class CueScheduler:
+    def __init__(self, update, snapshot_source, early_tolerance=0.002):
+        """
+        update: called with a position whenever cues must be re-evaluated (CueTracker side)
+        snapshot_source: returns the current PlayerSnapshot
+        early_tolerance: a timer that fires this much before the boundary still
+            counts as on time; earlier than that it is re-armed
+        """
+        self.update = update
+        self.snapshot_source = snapshot_source
+        self.early_tolerance = early_tolerance
+        self.index = None
+        self.loop = None
+        self.handle = None
+        self.lock = threading.Lock()
+        self.resync_pending = False
+
+    def set_index(self, index):
+        self.index = index
+        self.resync()
+
+    def mark_resync(self):
+        """Resync on the next time-pos sample (after a seek the new position is not known yet)"""
+        with self.lock:
+            self.resync_pending = True
+
+    def on_time_pos(self, snapshot):
+        with self.lock:
+            if not self.resync_pending:
+                return
+            self.resync_pending = False
+        self.resync()
+
+    def resync(self):
+        """Re-evaluate cues now and re-arm the timer. Safe to call from any thread."""
+        if self.loop is None:
+            # No loop yet: evaluate inline, there is nothing to schedule on
+            snapshot = self.snapshot_source()
+            self.update(snapshot.estimated_position())
+            return
+        self.loop.call_soon_threadsafe(self._resync)
+
+    def stop(self):
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self._cancel)
+
+    def _cancel(self):
+        if self.handle is not None:
+            self.handle.cancel()
+            self.handle = None
+
+    def _resync(self):
+        snapshot = self.snapshot_source()
+        position = snapshot.estimated_position()
+        self.update(position)
+        self._arm(snapshot, position)
+
+    def _arm(self, snapshot, position):
+        self._cancel()
+        if self.index is None or position is None or snapshot.paused:
+            return
+        boundary = self.index.next_boundary(position)
+        if boundary is None:
+            return
+        speed = snapshot.speed or 1.0
+        delay = max(0.0, (boundary - position) / speed)
+        self.handle = self.loop.call_later(delay, self._fire, boundary)
+
+    def _fire(self, boundary):
+        self.handle = None
+        snapshot = self.snapshot_source()
+        if snapshot.paused or snapshot.time_pos is None:
+            return
+        position = snapshot.estimated_position(time.monotonic())
+        if position < boundary - self.early_tolerance:
+            # Media clock ran slow against ours; wait out the remainder
+            self._arm(snapshot, position)
+            return
+        # Evaluate exactly at the boundary so the transition is frame-accurate
+        position = max(position, boundary)
+        self.update(position)
+        self._arm(snapshot, position)
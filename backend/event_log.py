@@ -0,0 +1,67 @@
+import os
+from collections import deque
+from itertools import islice
+
+from wire import connection_query
+
+"""
+Recent broadcast history, so reconnecting clients can catch up.
+
+Every event, capture and other low-frequency broadcast gets a sequence number
+and is kept in a bounded ring. A client that drops and comes back connects
+with the last sequence number it saw:
+
+    ws://localhost:8765/?since=<seq>&epoch=<epoch>
+
+and its welcome message carries exactly the messages it missed. If the gap is
+older than the ring, or the epoch belongs to an earlier server run, the welcome
+carries the whole ring with "resync": true and the client rebuilds its history
+from it. Time updates, anchors and stats are not kept: the welcome's state
+snapshot already supersedes them.
+
+Only the event loop touches an EventLog, so it needs no lock.
+"""
+
+REPLAYED_TYPES = frozenset({"event", "capture", "info", "error", "media_info"})
+
+
+class EventLog:
+    def __init__(self, maxlen=256):
+        self.entries = deque(maxlen=maxlen)
+        self.seq = 0  # last sequence number handed out
+        self.epoch = os.urandom(4).hex()  # tells this server run's numbers from an earlier one's
+
+    def append(self, message):
+        """Number message (sets message["seq"]) and keep it"""
+        self.seq += 1
+        message["seq"] = self.seq
+        self.entries.append(message)
+        return self.seq
+
+    def since(self, seq, epoch=None):
+        """
+        Messages after seq, or None if they cannot all be replayed: seq is from
+        another epoch, from the future, or older than the oldest kept message.
+        """
+        if epoch != self.epoch or seq > self.seq:
+            return None
+        if seq == self.seq:
+            return []
+        oldest = self.entries[0]["seq"] if self.entries else self.seq + 1
+        if seq < oldest - 1:
+            return None
+        # Sequence numbers are contiguous, so the tail is a slice
+        return list(islice(self.entries, seq - oldest + 1, None))
+
+    def recent(self):
+        return list(self.entries)
+
+
+def requested_resume(websocket):
+    """(since, epoch) from the connection URL's query string, since None if not given"""
+    query = connection_query(websocket)
+    try:
+        since = int(query["since"][0])
+    except (KeyError, ValueError):
+        since = None
+    return since, (query.get("epoch") or [None])[0]
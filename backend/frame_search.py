@@ -0,0 +1,162 @@
+import math
+import re
+import subprocess
+import threading
+from typing import NamedTuple
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from media_index import load_index
+
+"""
+Single-pass frame search: which frame of the video is this screenshot?
+
+The old check in poc/benchmark/benchmark-screenshotter-tool.py launched ffmpeg
+once per whole-second offset and compared PNGs. Here one ffmpeg process
+decodes the whole search window, input-seeking to the keyframe before it (see
+media_index.py), scaled down to a small grayscale size and piped as rawvideo
+into a preallocated NumPy block. Every frame is then scored against the
+reference at once, so the answer is a single frame with its pts, not a second.
+
+The reference goes through the same ffmpeg scaler, so an exact match scores an
+MSE of (close to) zero.
+"""
+
+SEARCH_WIDTH = 160
+SSIM_BLOCK = 8
+SSIM_C1 = (0.01 * 255) ** 2
+SSIM_C2 = (0.03 * 255) ** 2
+PTS_TIME = re.compile(rb"pts_time:\s*(-?[0-9.]+)")
+
+
+class FrameMatch(NamedTuple):
+    time: float  # pts of the best frame, seconds
+    index: int  # position of that frame in the window
+    mse: float
+    ssim: float
+    frames: int  # frames scored
+
+
+def _require_numpy():
+    if np is None:
+        raise RuntimeError("numpy is not installed")
+
+
+def load_reference(image_path, width, height):
+    """Decode and scale a screenshot the same way the search window is scaled"""
+    _require_numpy()
+    result = subprocess.run([
+        "ffmpeg", "-hide_banner", "-loglevel", "error", "-i", str(image_path),
+        "-vf", f"scale={width}:{height}", "-frames:v", "1", "-f", "rawvideo", "-pix_fmt", "gray", "pipe:1"
+    ], capture_output=True)
+    if result.returncode != 0 or len(result.stdout) != width * height:
+        raise RuntimeError(f"Could not decode {image_path}: {result.stderr.decode(errors='replace').strip()}")
+    return np.frombuffer(result.stdout, dtype=np.uint8).reshape(height, width)
+
+
+def image_size(image_path):
+    result = subprocess.run([
+        "ffprobe", "-v", "error", "-select_streams", "v:0",
+        "-show_entries", "stream=width,height", "-of", "csv=p=0", str(image_path)
+    ], capture_output=True, text=True)
+    try:
+        width, height = (int(value) for value in result.stdout.strip().split(",")[:2])
+    except ValueError:
+        raise RuntimeError(f"Could not read the size of {image_path}")
+    return width, height
+
+
+def read_window(video_path, start, end, width, height, index=None, expected_fps=60.0):
+    """
+    Decode [start, end] of video_path to gray width x height frames.
+    Returns (block, pts) where block[:len(pts)] holds the frames. Times are
+    media time, like mpv's time-pos (relative to the container start time).
+    """
+    _require_numpy()
+    index = index or load_index(video_path)
+    keyframe = index.keyframe_before(start)
+    frame_bytes = width * height
+    block = np.empty((int(math.ceil((end - start) * expected_fps)) + 2, height, width), dtype=np.uint8)
+
+    # Input -ss is relative to the container start time, but -copyts keeps the
+    # source timestamps, so trim and showinfo see absolute pts: shift by start_time
+    offset = index.start_time
+    process = subprocess.Popen([
+        "ffmpeg", "-hide_banner", "-nostats", "-loglevel", "info",
+        "-ss", f"{keyframe:.6f}", "-copyts", "-i", str(video_path), "-an", "-sn",
+        "-vf", f"trim=start={start + offset:.6f}:end={end + offset:.6f},scale={width}:{height},showinfo",
+        "-f", "rawvideo", "-pix_fmt", "gray", "pipe:1"
+    ], stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+    pts = []
+    stderr_lines = []
+    reader = threading.Thread(target=lambda: stderr_lines.extend(process.stderr), daemon=True)
+    reader.start()
+
+    count = 0
+    while True:
+        if count == len(block):
+            block = np.concatenate([block, np.empty_like(block)])
+        view = memoryview(block[count]).cast("B")
+        filled = 0
+        while filled < frame_bytes:
+            read = process.stdout.readinto(view[filled:])
+            if not read:
+                break
+            filled += read
+        if filled < frame_bytes:
+            break
+        count += 1
+
+    returncode = process.wait()
+    reader.join()
+    if returncode != 0:
+        raise RuntimeError(f"FFmpeg failed with return code {returncode}: {b''.join(stderr_lines[-5:]).decode(errors='replace').strip()}")
+    for line in stderr_lines:
+        match = PTS_TIME.search(line)
+        if match and b"showinfo" in line:
+            pts.append(float(match.group(1)) - offset)
+    if len(pts) != count:
+        raise RuntimeError(f"Got {count} frames but {len(pts)} timestamps")
+    return block, pts
+
+
+def score_frames(frames, reference):
+    """Per-frame MSE and mean blockwise SSIM against reference, all frames in one pass"""
+    frames = frames.astype(np.float32)
+    reference = reference.astype(np.float32)
+    mse = ((frames - reference) ** 2).mean(axis=(1, 2))
+
+    # SSIM over non-overlapping 8x8 blocks, then averaged per frame
+    count, height, width = frames.shape
+    rows, cols = height // SSIM_BLOCK, width // SSIM_BLOCK
+    x = frames[:, :rows * SSIM_BLOCK, :cols * SSIM_BLOCK].reshape(count, rows, SSIM_BLOCK, cols, SSIM_BLOCK)
+    y = reference[:rows * SSIM_BLOCK, :cols * SSIM_BLOCK].reshape(1, rows, SSIM_BLOCK, cols, SSIM_BLOCK)
+    mu_x, mu_y = x.mean(axis=(2, 4)), y.mean(axis=(2, 4))
+    var_x, var_y = x.var(axis=(2, 4)), y.var(axis=(2, 4))
+    cov = ((x - mu_x[:, :, None, :, None]) * (y - mu_y[:, :, None, :, None])).mean(axis=(2, 4))
+    ssim = ((2 * mu_x * mu_y + SSIM_C1) * (2 * cov + SSIM_C2)) / (
+        (mu_x ** 2 + mu_y ** 2 + SSIM_C1) * (var_x + var_y + SSIM_C2)
+    )
+    return mse, ssim.mean(axis=(1, 2))
+
+
+def find_frame(video_path, screenshot_path, center_time, window=1.0, width=SEARCH_WIDTH, index=None):
+    """
+    Find the frame within center_time +- window seconds that best matches the
+    screenshot. Returns a FrameMatch. Blocking; run it on a worker.
+    """
+    _require_numpy()
+    shot_width, shot_height = image_size(screenshot_path)
+    height = max(2, round(width * shot_height / shot_width / 2) * 2)
+    reference = load_reference(screenshot_path, width, height)
+
+    block, pts = read_window(video_path, max(0.0, center_time - window), center_time + window, width, height, index)
+    if not pts:
+        raise RuntimeError(f"No frames around {center_time:.3f}s")
+    mse, ssim = score_frames(block[:len(pts)], reference)
+    best = int(np.argmin(mse))
+    return FrameMatch(pts[best], best, float(mse[best]), float(ssim[best]), len(pts))
@@ -0,0 +1,266 @@
+import asyncio
+import json
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+"""
+mpv over its JSON IPC socket (--input-ipc-server) instead of libmpv.
+
+poc/time_montior.py and poc/upstairs_screenshot.py go through
+python_mpv_jsonipc, which waits for each reply before sending the next
+request. IPCConnection is asyncio-native: every request carries a request_id,
+any number can be in flight on the socket, and replies are matched up as they
+arrive. Property changes and events come in on the same socket and are
+delivered to observers and to events() subscribers as a stream.
+
+IPCPlayer wraps a connection in the subset of python-mpv's mpv.MPV interface
+that MPVWebSocketServer and the capture handlers use, so the server can attach
+to an mpv that is already running:
+
+    mpv --input-ipc-server=/tmp/mpvsocket video.mp4
+    python server.py --attach=/tmp/mpvsocket
+
+Callbacks run on a single dispatcher thread, like python-mpv's event thread,
+so they may call back into the player. Byte-array results (screenshot-raw)
+cannot travel over JSON IPC.
+"""
+
+KEY_MESSAGE = "mpvmod-key"
+
+
+class IPCError(Exception):
+    pass
+
+
+class IPCEvent(dict):
+    """An mpv event; fields are readable as attributes like python-mpv's MpvEvent"""
+
+    def __getattr__(self, name):
+        try:
+            return self[name.replace("_", "-")]
+        except KeyError:
+            raise AttributeError(name)
+
+
+async def open_ipc_stream(path):
+    """(reader, writer) for a Unix socket path or, on Windows, a named pipe"""
+    if sys.platform == "win32":
+        loop = asyncio.get_running_loop()
+        reader = asyncio.StreamReader(limit=2 ** 22)
+        protocol = asyncio.StreamReaderProtocol(reader)
+        transport, _ = await loop.create_pipe_connection(lambda: protocol, path)
+        return reader, asyncio.StreamWriter(transport, protocol, reader, loop)
+    return await asyncio.open_unix_connection(path, limit=2 ** 22)
+
+
+class IPCConnection:
+    def __init__(self, on_event=None):
+        """on_event(IPCEvent) is called on the loop for every event, property changes included"""
+        self.reader = None
+        self.writer = None
+        self.reader_task = None
+        self.pending = {}  # request_id -> Future
+        self.observers = {}  # observe id -> (property name, callback(name, value))
+        self.subscribers = []  # asyncio.Queue per events() consumer
+        self.next_id = 0
+        self.on_event = on_event
+        self.closed = False
+        self.saw_shutdown = False
+
+    async def connect(self, path):
+        self.reader, self.writer = await open_ipc_stream(path)
+        self.reader_task = asyncio.create_task(self._read())
+
+    async def close(self):
+        self.closed = True
+        if self.reader_task:
+            self.reader_task.cancel()
+        if self.writer:
+            self.writer.close()
+        self._fail_pending(IPCError("Connection closed"))
+
+    def send(self, command, async_command=False):
+        """Send a request without waiting. Returns a Future of the reply's data."""
+        self.next_id += 1
+        request_id = self.next_id
+        future = asyncio.get_running_loop().create_future()
+        self.pending[request_id] = future
+        request = {"command": list(command), "request_id": request_id}
+        if async_command:
+            request["async"] = True
+        self.writer.write(json.dumps(request).encode("utf-8") + b"\n")
+        return future
+
+    async def request(self, command, async_command=False):
+        return await self.send(command, async_command)
+
+    async def command(self, *args):
+        return await self.send(args)
+
+    async def get_property(self, name):
+        return await self.send(("get_property", name))
+
+    async def set_property(self, name, value):
+        return await self.send(("set_property", name, value))
+
+    async def observe_property(self, name, callback):
+        """callback(name, value) on every change, starting with the current value"""
+        self.next_id += 1
+        observe_id = self.next_id
+        self.observers[observe_id] = (name, callback)
+        await self.send(("observe_property", observe_id, name))
+        return observe_id
+
+    async def events(self, maxsize=1024):
+        """Async iterator over every event; a consumer that falls maxsize behind loses the oldest"""
+        queue = asyncio.Queue(maxsize)
+        self.subscribers.append(queue)
+        try:
+            while True:
+                yield await queue.get()
+        finally:
+            self.subscribers.remove(queue)
+
+    async def _read(self):
+        try:
+            async for line in self.reader:
+                try:
+                    message = json.loads(line)
+                except ValueError:
+                    continue
+                if "event" in message:
+                    self._dispatch_event(IPCEvent(message))
+                    continue
+                future = self.pending.pop(message.get("request_id"), None)
+                if future is None or future.done():
+                    continue
+                if message.get("error", "success") == "success":
+                    future.set_result(message.get("data"))
+                else:
+                    future.set_exception(IPCError(message["error"]))
+        finally:
+            self._fail_pending(IPCError("mpv closed the IPC connection"))
+            if not self.closed and not self.saw_shutdown:
+                # mpv went away without saying so (killed, socket removed)
+                self._dispatch_event(IPCEvent(event="shutdown"))
+
+    def _dispatch_event(self, event):
+        if event["event"] == "shutdown":
+            self.saw_shutdown = True
+        elif event["event"] == "property-change":
+            observer = self.observers.get(event.get("id"))
+            if observer:
+                observer[1](event.get("name"), event.get("data"))
+        if self.on_event:
+            self.on_event(event)
+        for queue in self.subscribers:
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(event)
+
+    def _fail_pending(self, error):
+        pending, self.pending = self.pending, {}
+        for future in pending.values():
+            if not future.done():
+                future.set_exception(error)
+
+
+class IPCPlayer:
+    """Blocking, python-mpv-shaped facade over IPCConnection"""
+
+    def __init__(self, socket_path, timeout=5.0):
+        self._timeout = timeout
+        self._event_handlers = {}  # event name -> [handler(event)]
+        self._key_handlers = {}  # key -> handler()
+        self._dispatcher = ThreadPoolExecutor(max_workers=1, thread_name_prefix="mpv-ipc-events")
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="mpv-ipc", daemon=True)
+        self._thread.start()
+        self._ipc = IPCConnection(on_event=self._on_event)
+        self._call(self._ipc.connect(socket_path))
+
+    def _call(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop).result(self._timeout)
+
+    def _on_event(self, event):
+        name = event["event"]
+        if name == "client-message":
+            args = event.get("args") or []
+            if len(args) == 2 and args[0] == KEY_MESSAGE and args[1] in self._key_handlers:
+                self._dispatcher.submit(self._key_handlers[args[1]])
+            return
+        for handler in self._event_handlers.get(name, ()):
+            self._dispatcher.submit(handler, event)
+
+    def observe_property(self, name, handler):
+        def forward(prop, value):
+            self._dispatcher.submit(handler, prop, value)
+        self._call(self._ipc.observe_property(name, forward))
+
+    def event_callback(self, *event_types):
+        def register(handler):
+            for event_type in event_types:
+                self._event_handlers.setdefault(event_type, []).append(handler)
+            return handler
+        return register
+
+    def on_key_press(self, key):
+        def register(handler):
+            self._key_handlers[key] = handler
+            self.command("keybind", key, f"script-message {KEY_MESSAGE} {json.dumps(key)}")
+            return handler
+        return register
+
+    def command(self, name, *args):
+        return self._call(self._ipc.command(name, *args))
+
+    def node_command(self, name, *args):
+        return self.command(name, *args)
+
+    def command_async(self, name, *args, callback=None):
+        """Run name with mpv's async flag; callback(error, result) runs on the dispatcher thread"""
+        future = asyncio.run_coroutine_threadsafe(self._ipc.request((name, *args), async_command=True), self._loop)
+        if callback is not None:
+            def done(finished):
+                error = finished.exception()
+                self._dispatcher.submit(callback, error, None if error else finished.result())
+            future.add_done_callback(done)
+        return future
+
+    def seek(self, amount, reference="relative", precision="default-precise"):
+        self.command("seek", amount, reference, precision)
+
+    def play(self, filename):
+        self.command("loadfile", filename)
+
+    def quit(self, code=None):
+        try:
+            self.command("quit", *([] if code is None else [code]))
+        except IPCError:
+            pass
+        self.terminate()
+
+    def terminate(self):
+        """Disconnect. An mpv we attached to keeps running."""
+        try:
+            self._call(self._ipc.close())
+        except Exception:
+            pass
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._dispatcher.shutdown(wait=False)
+
+    def __getattr__(self, name):
+        # Only reached for names that are not attributes: read the mpv property
+        if name.startswith("_"):
+            raise AttributeError(name)
+        try:
+            return self._call(self._ipc.get_property(name.replace("_", "-")))
+        except IPCError:
+            return None  # like python-mpv for unavailable properties
+
+    def __setattr__(self, name, value):
+        if name.startswith("_"):
+            object.__setattr__(self, name, value)
+        else:
+            self._call(self._ipc.set_property(name.replace("_", "-"), value))
@@ -0,0 +1,72 @@
+import threading
+
+"""
+HDR-style latency histogram.
+
+Values are recorded in microseconds and bucketed by their top PRECISION_BITS
+significant bits, so every bucket is within ~1% of the values it holds no
+matter whether they are 50 us or 5 s. Recording is O(1) and memory grows with
+the number of distinct buckets, not with the number of samples.
+"""
+
+PRECISION_BITS = 7
+
+
+class LatencyHistogram:
+    def __init__(self, name=""):
+        self.name = name
+        self.lock = threading.Lock()
+        self.buckets = {}  # bucket lower bound (us) -> count
+        self.count = 0
+        self.total_us = 0
+        self.max_us = 0
+        self.min_us = None
+
+    def record(self, seconds):
+        value = max(0, int(seconds * 1_000_000))
+        shift = max(0, value.bit_length() - PRECISION_BITS)
+        bucket = (value >> shift) << shift
+        with self.lock:
+            self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+            self.count += 1
+            self.total_us += value
+            if value > self.max_us:
+                self.max_us = value
+            if self.min_us is None or value < self.min_us:
+                self.min_us = value
+
+    def percentile(self, pct):
+        """Latency in seconds below which pct percent of samples fall"""
+        with self.lock:
+            if not self.count:
+                return None
+            target = self.count * pct / 100
+            seen = 0
+            for bucket in sorted(self.buckets):
+                seen += self.buckets[bucket]
+                if seen >= target:
+                    return max(min(bucket, self.max_us), self.min_us) / 1_000_000
+            return self.max_us / 1_000_000
+
+    def summary(self):
+        """Count, mean and percentiles in milliseconds"""
+        if not self.count:
+            return {"count": 0}
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total_us / self.count / 1000, 3),
+            "min_ms": round(self.min_us / 1000, 3),
+            "p50_ms": round(self.percentile(50) * 1000, 3),
+            "p95_ms": round(self.percentile(95) * 1000, 3),
+            "p99_ms": round(self.percentile(99) * 1000, 3),
+            "max_ms": round(self.max_us / 1000, 3),
+        }
+
+    def format(self):
+        stats = self.summary()
+        if not stats["count"]:
+            return f"{self.name}: no samples"
+        return (
+            f"{self.name}: n={stats['count']} p50={stats['p50_ms']}ms p95={stats['p95_ms']}ms "
+            f"p99={stats['p99_ms']}ms max={stats['max_ms']}ms"
+        )
@@ -0,0 +1,167 @@
+import asyncio
+import json
+import os
+import stat
+import struct
+import sys
+from types import SimpleNamespace
+
+from ipc_player import open_ipc_stream
+
+"""
+Length-prefixed message framing for same-machine clients.
+
+The Electron main process always runs next to the server, so TCP loopback and
+WebSocket framing and masking buy it nothing. On Unix the server can also
+listen on a Unix domain socket and keep the WebSocket protocol over it
+(websockets.unix_serve, `ws+unix://` in the ws package). Windows has no
+WebSocket server over named pipes, so there, and on Unix when asked for, each
+message travels as one frame instead:
+
+    <I B> payload    big-endian payload length, kind (0 = UTF-8 text, 1 = binary)
+
+The client's first frame is a JSON hello carrying what the WebSocket handshake
+would have: the request path (for ?since= and ?topics=) and the subprotocols
+it accepts, e.g. {"path": "/?topics=captures", "subprotocols": ["mpvmod.bin"]}.
+After that, frames carry exactly what WebSocket messages would, so
+FramedConnection can stand in for a websockets connection in handle_client.
+"""
+
+FRAME_HEADER = struct.Struct(">IB")
+TEXT = 0
+BINARY = 1
+MAX_FRAME = 1 << 24
+
+
+class FramedConnection:
+    """The parts of a websockets connection the server uses, over a stream pair"""
+
+    def __init__(self, reader, writer, max_size=MAX_FRAME):
+        self.reader = reader
+        self.writer = writer
+        self.max_size = max_size
+        self.request = SimpleNamespace(path="/")
+        self.subprotocol = None
+        self.remote_address = "local"
+
+    async def handshake(self, subprotocols=()):
+        """Server side: read the client's hello frame. Raises ValueError if it is malformed."""
+        hello = json.loads(await self.recv())
+        if not isinstance(hello, dict):
+            raise ValueError("expected a JSON object")
+        path = hello.get("path") or "/"
+        offered = hello.get("subprotocols") or []
+        if not isinstance(path, str) or not isinstance(offered, list):
+            raise ValueError("path must be a string and subprotocols a list")
+        self.request = SimpleNamespace(path=path)
+        self.subprotocol = next((protocol for protocol in offered if protocol in subprotocols), None)
+
+    async def send(self, message):
+        if isinstance(message, str):
+            kind, message = TEXT, message.encode("utf-8")
+        else:
+            kind = BINARY
+        self.writer.write(FRAME_HEADER.pack(len(message), kind) + message)
+        await self.writer.drain()
+
+    async def recv(self):
+        """
+        Next message (str or bytes); raises asyncio.IncompleteReadError at EOF,
+        ValueError for an oversized frame or a text frame that is not UTF-8
+        """
+        length, kind = FRAME_HEADER.unpack(await self.reader.readexactly(FRAME_HEADER.size))
+        if length > self.max_size:
+            raise ValueError(f"Frame of {length} bytes is over the {self.max_size} byte limit")
+        payload = await self.reader.readexactly(length)
+        return payload.decode("utf-8") if kind == TEXT else payload
+
+    def __aiter__(self):
+        return self._messages()
+
+    async def _messages(self):
+        # Ends quietly when the peer goes away, like iterating a websocket
+        try:
+            while True:
+                yield await self.recv()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            return
+        except ValueError as e:
+            # What websockets closes with 1007/1009 for; the stream cannot be
+            # trusted past a bad frame, so say why and hang up
+            await self.fail(f"Bad frame: {e}")
+
+    async def fail(self, reason):
+        """Send an error frame with reason, if the peer is still there, and close"""
+        try:
+            await self.send(json.dumps({"type": "error", "content": reason}))
+        except ConnectionError:
+            pass
+        await self.close()
+
+    async def close(self):
+        self.writer.close()
+        try:
+            await self.writer.wait_closed()
+        except ConnectionError:
+            pass
+
+
+def remove_stale_socket(path):
+    """Delete a socket file left behind by an earlier run, so bind() succeeds"""
+    try:
+        if stat.S_ISSOCK(os.stat(path).st_mode):
+            os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
+class _PipeServer:
+    """close()/wait_closed() over the PipeServer list from start_serving_pipe"""
+
+    def __init__(self, pipes):
+        self.pipes = pipes
+
+    def close(self):
+        for pipe in self.pipes:
+            pipe.close()
+
+    async def wait_closed(self):
+        pass
+
+
+async def serve_framed(handler, path, subprotocols=()):
+    """
+    Serve handler(FramedConnection) on a Unix socket path, or a named pipe
+    (\\\\.\\pipe\\name) on Windows. Returns an object with close() and wait_closed().
+    """
+    async def on_connect(reader, writer):
+        connection = FramedConnection(reader, writer)
+        try:
+            await connection.handshake(subprotocols)
+        except ValueError as e:
+            await connection.fail(f"Bad hello: {e}")
+            return
+        except (asyncio.IncompleteReadError, ConnectionError):
+            await connection.close()
+            return
+        await handler(connection)
+
+    if sys.platform == "win32":
+        loop = asyncio.get_running_loop()
+
+        def protocol_factory():
+            return asyncio.StreamReaderProtocol(asyncio.StreamReader(limit=MAX_FRAME), on_connect)
+
+        return _PipeServer(await loop.start_serving_pipe(protocol_factory, path))
+
+    remove_stale_socket(path)
+    return await asyncio.start_unix_server(on_connect, path)
+
+
+async def connect_framed(path, request_path="/", subprotocols=()):
+    """Client side: connect to serve_framed() at path and send the hello"""
+    reader, writer = await open_ipc_stream(path)
+    connection = FramedConnection(reader, writer)
+    connection.request = SimpleNamespace(path=request_path)
+    await connection.send(json.dumps({"path": request_path, "subprotocols": list(subprotocols)}))
+    return connection
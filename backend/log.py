@@ -0,0 +1,134 @@
+import json
+import logging
+import queue
+import sys
+import threading
+from logging.handlers import QueueHandler, QueueListener
+
+"""
+Console logging that never blocks the caller.
+
+The server used to print() every broadcast, time updates included, from mpv's
+event thread and the event loop. On a slow console (Windows conhost, a remote
+terminal) that write stalls the thread doing it. Here every record goes into a
+bounded in-memory queue and a background thread does the actual writing. If
+the console falls so far behind that the queue fills, records are dropped and
+counted instead of waiting.
+
+High-frequency message types are sampled before they are even formatted:
+with the default SAMPLE_EVERY only one time_update in 25 reaches the console.
+
+    logger = get_logger(__name__)
+    logger.info("📁 Loading: %s", name, extra={"msg_type": "info", "data": {...}})
+
+msg_type drives sampling; data is included by the JSON formatter.
+"""
+
+LOGGER_NAME = "mpvmod"
+SAMPLE_EVERY = {"time_update": 25, "stats": 12}
+QUEUE_SIZE = 10000
+
+_listener = None
+_lock = threading.Lock()
+
+
+def get_logger(name=None):
+    return logging.getLogger(LOGGER_NAME if not name else f"{LOGGER_NAME}.{name}")
+
+
+class SamplingFilter(logging.Filter):
+    """Let one record in N through per msg_type; others pass untouched"""
+
+    def __init__(self, every=None):
+        super().__init__()
+        self.every = SAMPLE_EVERY if every is None else every
+        self.seen = {}
+        self.lock = threading.Lock()
+
+    def filter(self, record):
+        every = self.every.get(getattr(record, "msg_type", None))
+        if not every or every <= 1:
+            return True
+        with self.lock:
+            seen = self.seen.get(record.msg_type, 0)
+            self.seen[record.msg_type] = seen + 1
+        return seen % every == 0
+
+
+class DroppingQueueHandler(QueueHandler):
+    """QueueHandler that drops instead of blocking when the queue is full"""
+
+    def __init__(self, record_queue):
+        super().__init__(record_queue)
+        self.dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def prepare(self, record):
+        # Skip QueueHandler.prepare's eager formatting: the listener thread formats
+        return record
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "time": record.created,
+            "level": record.levelname,
+            "logger": record.name,
+            "type": getattr(record, "msg_type", None),
+            "message": record.getMessage(),
+        }
+        data = getattr(record, "data", None)
+        if data is not None:
+            entry["data"] = data
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def setup_logging(level=logging.INFO, stream=None, structured=False, sample_every=None):
+    """
+    Route the mpvmod loggers through a background writer thread.
+    structured: one JSON object per line instead of the plain message
+    sample_every: msg_type -> N, overrides SAMPLE_EVERY
+    Returns the queue handler (its .dropped counts records lost to a full queue).
+    """
+    global _listener
+    with _lock:
+        if _listener is not None:
+            _listener.stop()
+
+        output = logging.StreamHandler(stream or sys.stdout)
+        output.setFormatter(JsonFormatter() if structured else logging.Formatter("%(message)s"))
+
+        record_queue = queue.Queue(QUEUE_SIZE)
+        handler = DroppingQueueHandler(record_queue)
+        handler.addFilter(SamplingFilter(sample_every))
+
+        logger = logging.getLogger(LOGGER_NAME)
+        logger.handlers = [handler]
+        logger.setLevel(level)
+        logger.propagate = False
+
+        _listener = QueueListener(record_queue, output)
+        _listener.start()
+        return handler
+
+
+def shutdown_logging():
+    """Flush what is queued and stop the writer thread"""
+    global _listener
+    with _lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+
+
+def ensure_logging():
+    """setup_logging() with defaults, unless it has already been called"""
+    if _listener is None:
+        setup_logging()
@@ -0,0 +1,184 @@
+import bisect
+import hashlib
+import mmap
+import os
+import struct
+import subprocess
+import threading
+from pathlib import Path
+
+"""
+Per-file keyframe and audio packet index.
+
+Seeking with -ss before -i is fast but lands on a keyframe; -ss after -i is
+exact but decodes from the start of the file (see the comment block in
+poc/ffmpeg_util.py). With the keyframe timestamps known, extraction can
+input-seek to the keyframe at or before the target and output-seek only the
+remaining delta, so it is both exact and cheap.
+
+Timestamps are stored relative to the container's start_time, the time base
+of mpv's time-pos and of ffmpeg's input -ss. ffprobe reports absolute pts,
+which differ from it in MPEG-TS files and many remuxes; start_time is kept
+for the callers that run ffmpeg with -copyts and see absolute pts.
+
+ffprobe runs once per file version. The timestamps go into a small binary file
+under the cache directory, keyed by path, size and mtime, and are memory-mapped
+on load, so a two-hour film's index opens without parsing anything.
+
+File layout (little-endian):
+    header  "<4sHxxqqQQd" magic, version, size, mtime_ns, keyframe count, audio packet count,
+                          container start_time (seconds)
+    float64[keyframe count]      video keyframe pts, seconds, sorted
+    float64[audio packet count]  audio packet pts, seconds, sorted
+"""
+
+MAGIC = b"MIDX"
+VERSION = 3  # 1 could hold empty indexes, 2 absolute pts; see probe_timestamps
+HEADER = struct.Struct("<4sHxxqqQQd")
+DEFAULT_CACHE_DIR = Path.home() / ".cache" / "mpvmod" / "index"
+
+_loaded = {}  # (path, size, mtime_ns) -> MediaIndex
+_lock = threading.Lock()
+
+
+class MediaIndex:
+    def __init__(self, keyframes, audio_packets, start_time=0.0, mapping=None):
+        """
+        keyframes, audio_packets: sorted sequences of seconds from start_time
+            (memoryviews when mapped)
+        start_time: the container's start time, to convert to absolute pts
+        """
+        self.keyframes = keyframes
+        self.audio_packets = audio_packets
+        self.start_time = start_time
+        self.mapping = mapping  # keeps the mmap alive
+
+    def keyframe_before(self, t):
+        """Latest keyframe at or before t, or 0.0 if there is none"""
+        i = bisect.bisect_right(self.keyframes, t)
+        return self.keyframes[i - 1] if i else 0.0
+
+    def nearest_audio_packet(self, t):
+        """Audio packet start closest to t, or None without audio"""
+        count = len(self.audio_packets)
+        if not count:
+            return None
+        i = bisect.bisect_left(self.audio_packets, t)
+        candidates = [self.audio_packets[j] for j in (i - 1, i) if 0 <= j < count]
+        return min(candidates, key=lambda pts: abs(pts - t))
+
+    def seek_args(self, video_path, t):
+        """
+        ffmpeg input arguments that decode from the keyframe before t and drop
+        frames up to exactly t: -ss <keyframe> -i <path> -ss <delta>
+        """
+        keyframe = self.keyframe_before(t)
+        return ["-ss", f"{keyframe:.6f}", "-i", str(video_path), "-ss", f"{t - keyframe:.6f}"]
+
+
+def cache_path(video_path, cache_dir=None):
+    digest = hashlib.sha1(os.path.abspath(video_path).encode("utf-8")).hexdigest()
+    return Path(cache_dir or DEFAULT_CACHE_DIR) / f"{digest}.idx"
+
+
+def probe_timestamps(video_path):
+    """
+    Run ffprobe once: (keyframes of the first video stream, packets of the
+    first audio stream, container start_time), times relative to start_time
+    """
+    result = subprocess.run([
+        "ffprobe", "-v", "error",
+        "-show_entries", "stream=index,codec_type:packet=stream_index,pts_time,flags:format=start_time",
+        "-of", "csv", str(video_path)
+    ], capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"ffprobe failed with return code {result.returncode}: {result.stderr.strip()}")
+
+    # ffprobe prints every packet line before the stream lines, so packets can
+    # only be classified once the streams are known
+    video_stream = audio_stream = None
+    start_time = 0.0
+    packets = []
+    for line in result.stdout.splitlines():
+        fields = line.split(",")
+        if fields[0] == "format" and len(fields) >= 2 and fields[1] != "N/A":
+            start_time = float(fields[1])
+        elif fields[0] == "stream" and len(fields) >= 3:
+            if fields[2] == "video" and video_stream is None:
+                video_stream = fields[1]
+            elif fields[2] == "audio" and audio_stream is None:
+                audio_stream = fields[1]
+        elif fields[0] == "packet" and len(fields) >= 4 and fields[2] != "N/A":
+            packets.append(fields)
+
+    keyframes, audio_packets = [], []
+    for _, stream, pts, flags, *_ in packets:
+        if stream == video_stream and "K" in flags:
+            keyframes.append(round(float(pts) - start_time, 6))
+        elif stream == audio_stream:
+            audio_packets.append(round(float(pts) - start_time, 6))
+    # Packets come in decode order; B-frames make pts non-monotonic
+    return sorted(keyframes), sorted(audio_packets), start_time
+
+
+def write_index(path, stat, keyframes, audio_packets, start_time):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temp = path.with_suffix(".tmp")
+    with open(temp, "wb") as out:
+        out.write(HEADER.pack(MAGIC, VERSION, stat.st_size, stat.st_mtime_ns, len(keyframes), len(audio_packets),
+                              start_time))
+        out.write(struct.pack(f"<{len(keyframes)}d", *keyframes))
+        out.write(struct.pack(f"<{len(audio_packets)}d", *audio_packets))
+    os.replace(temp, path)
+
+
+def map_index(path, stat):
+    """Memory-map a cached index, or None if it is missing or stale"""
+    try:
+        with open(path, "rb") as f:
+            mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+    if len(mapping) < HEADER.size:
+        mapping.close()
+        return None
+    magic, version, size, mtime_ns, keyframe_count, packet_count, start_time = HEADER.unpack_from(mapping)
+    expected = HEADER.size + 8 * (keyframe_count + packet_count)
+    if (magic, version, size, mtime_ns) != (MAGIC, VERSION, stat.st_size, stat.st_mtime_ns) or len(mapping) != expected:
+        mapping.close()
+        return None
+
+    # memoryview.cast gives native-order doubles; every platform we run on is little-endian
+    view = memoryview(mapping)[HEADER.size:].cast("d")
+    return MediaIndex(view[:keyframe_count], view[keyframe_count:], start_time, mapping)
+
+
+def load_index(video_path, cache_dir=None):
+    """MediaIndex for video_path, from memory, the on-disk cache, or one ffprobe run. Blocking."""
+    stat = os.stat(video_path)
+    key = (os.path.abspath(video_path), stat.st_size, stat.st_mtime_ns)
+    with _lock:
+        index = _loaded.get(key)
+    if index is not None:
+        return index
+
+    path = cache_path(video_path, cache_dir)
+    index = map_index(path, stat)
+    if index is None:
+        write_index(path, stat, *probe_timestamps(video_path))
+        index = map_index(path, stat)
+    with _lock:
+        _loaded[key] = index
+    return index
+
+
+def extract_frame(video_path, t, dest_file_path, index=None):
+    """Write the frame at t to dest_file_path (format from its extension). Blocking."""
+    index = index or load_index(video_path)
+    result = subprocess.run([
+        "ffmpeg", "-hide_banner", "-loglevel", "error", *index.seek_args(video_path, t),
+        "-frames:v", "1", str(dest_file_path), "-y"
+    ], capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"FFmpeg failed with return code {result.returncode}: {result.stderr.strip()}")
+    return Path(dest_file_path)
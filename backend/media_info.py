@@ -0,0 +1,166 @@
+import hashlib
+import json
+import os
+import subprocess
+import threading
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+from subtitles import find_external_subtitles
+
+"""
+Per-file media metadata: duration, streams, audio codec, frame rate and
+subtitle tracks.
+
+Until now every tool worked these out on its own: the server waited for mpv's
+demuxer to report a duration, and clip extraction ran its own ffprobe before
+choosing ffmpeg arguments. load_media_info gets all of it from one ffprobe
+pass. The result is kept in memory and as a small JSON file under the cache
+directory, keyed by path, size and mtime, so the next load of the same file
+costs a stat and a read.
+
+External subtitles are separate files that can come and go without touching
+the video, so they are looked up again on every call instead of cached.
+"""
+
+VERSION = 1
+DEFAULT_CACHE_DIR = Path.home() / ".cache" / "mpvmod" / "media"
+PROBE_PACKETS = 64  # enough leading packets to see a few from the first audio stream
+
+_loaded = {}  # (path, size, mtime_ns) -> MediaInfo
+_lock = threading.Lock()
+
+
+class MediaInfo(NamedTuple):
+    path: str
+    duration: Optional[float]
+    format_name: Optional[str]
+    frame_rate: Optional[float]  # first video stream, frames per second
+    width: Optional[int]
+    height: Optional[int]
+    audio_codec: Optional[str]  # first audio stream
+    audio_start_time: float
+    audio_packet_duration: Optional[float]  # seconds per packet, None if irregular or unknown
+    streams: list  # one dict per stream: index, type, codec, language, title, default, ...
+    subtitle_tracks: list  # the subtitle entries of streams
+    external_subtitles: list  # sidecar subtitle file paths
+
+    def as_dict(self):
+        return self._asdict()
+
+
+def cache_path(video_path, cache_dir=None):
+    digest = hashlib.sha1(os.path.abspath(video_path).encode("utf-8")).hexdigest()
+    return Path(cache_dir or DEFAULT_CACHE_DIR) / f"{digest}.json"
+
+
+def _number(value, kind=float):
+    try:
+        return kind(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _rate(value):
+    """ffprobe's "24000/1001" as a float, None for "0/0" or missing"""
+    numerator, _, denominator = str(value or "").partition("/")
+    numerator, denominator = _number(numerator), _number(denominator or 1)
+    return numerator / denominator if numerator and denominator else None
+
+
+def _stream_entry(stream):
+    tags = stream.get("tags") or {}
+    entry = {
+        "index": stream.get("index"),
+        "type": stream.get("codec_type"),
+        "codec": stream.get("codec_name"),
+        "language": tags.get("language"),
+        "title": tags.get("title"),
+        "default": bool((stream.get("disposition") or {}).get("default")),
+    }
+    if entry["type"] == "video":
+        entry.update(width=stream.get("width"), height=stream.get("height"),
+                     frame_rate=_rate(stream.get("avg_frame_rate")) or _rate(stream.get("r_frame_rate")))
+    elif entry["type"] == "audio":
+        entry.update(sample_rate=_number(stream.get("sample_rate"), int), channels=stream.get("channels"))
+    return entry
+
+
+def probe_media(video_path):
+    """Run ffprobe once over format, streams and the first few packets. Blocking."""
+    result = subprocess.run([
+        "ffprobe", "-v", "error", "-show_format", "-show_streams",
+        "-show_entries", "packet=stream_index,duration_time",
+        "-read_intervals", f"%+#{PROBE_PACKETS}", "-of", "json", str(video_path)
+    ], capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"ffprobe failed with return code {result.returncode}: {result.stderr.strip()}")
+    probe = json.loads(result.stdout or "{}")
+
+    raw_streams = probe.get("streams") or []
+    streams = [_stream_entry(stream) for stream in raw_streams]
+    video = next((s for s in streams if s["type"] == "video"), {})
+    audio = next((s for s in raw_streams if s.get("codec_type") == "audio"), {})
+    durations = {round(float(packet["duration_time"]), 6) for packet in probe.get("packets", [])
+                 if packet.get("stream_index") == audio.get("index")
+                 and packet.get("duration_time") not in (None, "N/A")}
+
+    return MediaInfo(
+        path=os.path.abspath(video_path),
+        duration=_number((probe.get("format") or {}).get("duration")),
+        format_name=(probe.get("format") or {}).get("format_name"),
+        frame_rate=video.get("frame_rate"),
+        width=video.get("width"),
+        height=video.get("height"),
+        audio_codec=audio.get("codec_name"),
+        audio_start_time=_number(audio.get("start_time")) or 0.0,
+        audio_packet_duration=durations.pop() if len(durations) == 1 else None,
+        streams=streams,
+        subtitle_tracks=[s for s in streams if s["type"] == "subtitle"],
+        external_subtitles=[],
+    )
+
+
+def read_cached(path, stat):
+    """MediaInfo from a cache file, or None if it is missing or stale"""
+    try:
+        with open(path, encoding="utf-8") as f:
+            cached = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if (cached.get("version"), cached.get("size"), cached.get("mtime_ns")) != (VERSION, stat.st_size, stat.st_mtime_ns):
+        return None
+    try:
+        return MediaInfo(**cached["info"])
+    except (KeyError, TypeError):
+        return None
+
+
+def write_cached(path, stat, info):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temp = path.with_suffix(".tmp")
+    with open(temp, "w", encoding="utf-8") as out:
+        json.dump({"version": VERSION, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns,
+                   "info": info._replace(external_subtitles=[]).as_dict()}, out)
+    os.replace(temp, path)
+
+
+def load_media_info(video_path, cache_dir=None):
+    """MediaInfo for video_path, from memory, the on-disk cache, or one ffprobe run. Blocking."""
+    stat = os.stat(video_path)
+    key = (os.path.abspath(video_path), stat.st_size, stat.st_mtime_ns)
+    with _lock:
+        info = _loaded.get(key)
+    if info is None:
+        path = cache_path(video_path, cache_dir)
+        info = read_cached(path, stat)
+        if info is None:
+            info = probe_media(video_path)
+            try:
+                write_cached(path, stat, info)
+            except OSError:
+                pass  # read-only cache directory: keep the in-memory copy
+        with _lock:
+            _loaded[key] = info
+    return info._replace(external_subtitles=[str(p) for p in find_external_subtitles(video_path)])
+
@@ -0,0 +1,106 @@
+import asyncio
+import threading
+import time
+
+from latency import LatencyHistogram
+
+"""
+Timing spans for the server's hot paths.
+
+    with metrics.span("encode"):
+        ...
+    metrics.record("loop_delay", seconds)
+
+Every span name gets its own LatencyHistogram. snapshot() is what the `stats`
+WebSocket message carries; prometheus() renders the same data in the
+Prometheus text format for the optional HTTP endpoint started by serve_metrics.
+"""
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class _Span:
+    __slots__ = ("histogram", "started")
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.record(time.perf_counter() - self.started)
+        return False
+
+
+class Metrics:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.histograms = {}  # span name -> LatencyHistogram
+
+    def histogram(self, name):
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            with self.lock:
+                histogram = self.histograms.setdefault(name, LatencyHistogram(name))
+        return histogram
+
+    def span(self, name):
+        return _Span(self.histogram(name))
+
+    def record(self, name, seconds):
+        self.histogram(name).record(seconds)
+
+    def snapshot(self):
+        """Span name -> count, mean and percentiles in milliseconds"""
+        with self.lock:
+            histograms = list(self.histograms.items())
+        return {name: histogram.summary() for name, histogram in sorted(histograms)}
+
+    def prometheus(self, gauges=None, prefix="mpvmod"):
+        """Prometheus text exposition of every span, plus gauges (name -> number)"""
+        with self.lock:
+            histograms = sorted(self.histograms.items())
+        lines = [f"# TYPE {prefix}_span_seconds summary"]
+        for name, histogram in histograms:
+            if not histogram.count:
+                continue
+            for quantile in QUANTILES:
+                lines.append(f'{prefix}_span_seconds{{span="{name}",quantile="{quantile}"}} '
+                             f'{histogram.percentile(quantile * 100):.6f}')
+            lines.append(f'{prefix}_span_seconds_sum{{span="{name}"}} {histogram.total_us / 1_000_000:.6f}')
+            lines.append(f'{prefix}_span_seconds_count{{span="{name}"}} {histogram.count}')
+        for name, value in sorted((gauges or {}).items()):
+            lines.append(f"# TYPE {prefix}_{name} gauge")
+            lines.append(f"{prefix}_{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+async def serve_metrics(metrics, host="localhost", port=9108, gauges=None):
+    """
+    Serve GET /metrics in the Prometheus text format on the running loop.
+    gauges() returns extra name -> number pairs at scrape time.
+    """
+    async def handle(reader, writer):
+        try:
+            request_line = await reader.readline()
+            while (await reader.readline()).strip():
+                pass  # skip headers
+            parts = request_line.decode("latin-1").split()
+            if len(parts) >= 2 and parts[0] == "GET" and parts[1].split("?")[0] == "/metrics":
+                status, body = "200 OK", metrics.prometheus(gauges() if gauges else None)
+            else:
+                status, body = "404 Not Found", "try /metrics\n"
+            payload = body.encode("utf-8")
+            writer.write(
+                f"HTTP/1.1 {status}\r\nContent-Type: text/plain; version=0.0.4\r\n"
+                f"Content-Length: {len(payload)}\r\nConnection: close\r\n\r\n".encode("latin-1") + payload
+            )
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    return await asyncio.start_server(handle, host, port)
@@ -0,0 +1,227 @@
+import io
+import subprocess
+import threading
+import time
+import wave
+from pathlib import Path
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+"""
+Rolling window of decoded audio for instant clips.
+
+Clipping with ffmpeg after the keypress means reopening the file, seeking and
+decoding, which can't get near the 20 ms in dreams.md. PcmTap instead keeps a
+parallel ffmpeg decode of the playing file running, aligned to mpv's position,
+and writes s16le PCM into a preallocated NumPy ring. A clip inside the window
+is a slice of that array plus an encode (WAV in-process, MP3 through an ffmpeg
+stdin pipe) on a worker.
+
+The tap decodes at most `lead` seconds ahead of the player and blocks ffmpeg
+through the pipe otherwise, so pauses and speed changes need no special case.
+When the player jumps outside the window (seek, new file) the ring is reset
+and ffmpeg restarts a window's length before the new position, so the history
+behind the playhead fills in at decode speed.
+"""
+
+SAMPLE_WIDTH = 2  # s16le
+
+
+class PcmRingBuffer:
+    def __init__(self, seconds=60.0, sample_rate=48000, channels=2, max_bytes=None):
+        """
+        seconds: window length
+        max_bytes: memory budget; shrinks the window if it would not fit
+        """
+        if np is None:
+            raise RuntimeError("numpy is not installed")
+        frame_bytes = channels * SAMPLE_WIDTH
+        capacity = int(seconds * sample_rate)
+        if max_bytes is not None:
+            capacity = min(capacity, max_bytes // frame_bytes)
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.capacity = max(1, capacity)
+        self.data = np.zeros((self.capacity, channels), dtype=np.int16)
+        self.lock = threading.Lock()
+        self.start_time = None  # media time of the first frame since the last reset
+        self.frames = 0  # frames written since the last reset
+
+    @property
+    def seconds(self):
+        return self.capacity / self.sample_rate
+
+    @property
+    def nbytes(self):
+        return self.data.nbytes
+
+    def reset(self, start_time):
+        with self.lock:
+            self.start_time = start_time
+            self.frames = 0
+
+    def write(self, pcm):
+        """Append interleaved s16le bytes (whole frames) after the last write"""
+        samples = np.frombuffer(pcm, dtype=np.int16).reshape(-1, self.channels)
+        with self.lock:
+            if len(samples) >= self.capacity:
+                self.frames += len(samples) - self.capacity
+                samples = samples[-self.capacity:]
+            offset = self.frames % self.capacity
+            head = min(len(samples), self.capacity - offset)
+            self.data[offset:offset + head] = samples[:head]
+            self.data[:len(samples) - head] = samples[head:]
+            self.frames += len(samples)
+
+    def window(self):
+        """(first, last) media time held, or None before the first write"""
+        with self.lock:
+            return self._window_locked()
+
+    def slice(self, t1, t2):
+        """Copy of the frames for [t1, t2], or None if the span is not all in the window"""
+        with self.lock:
+            window = self._window_locked()
+            if window is None or t1 < window[0] or t2 > window[1] or t2 <= t1:
+                return None
+            first = int(round((t1 - self.start_time) * self.sample_rate))
+            last = int(round((t2 - self.start_time) * self.sample_rate))
+            indices = np.arange(first, last) % self.capacity
+            return self.data.take(indices, axis=0)
+
+    def _window_locked(self):
+        if self.start_time is None or not self.frames:
+            return None
+        end = self.start_time + self.frames / self.sample_rate
+        return end - min(self.frames, self.capacity) / self.sample_rate, end
+
+
+class PcmTap:
+    def __init__(self, buffer, position_source, lead=2.0, chunk_seconds=0.02):
+        """
+        buffer: PcmRingBuffer to fill
+        position_source(): the player's current media time, or None
+        lead: how far ahead of the player to decode
+        """
+        self.buffer = buffer
+        self.position_source = position_source
+        self.lead = lead
+        self.chunk_bytes = int(chunk_seconds * buffer.sample_rate) * buffer.channels * SAMPLE_WIDTH
+        self.path = None
+        self.process = None
+        self.running = False
+        self.thread = None
+        self.restart_requested = threading.Event()
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name="pcm-tap", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        self.restart_requested.set()
+        self._kill()
+
+    def set_source(self, path):
+        """Follow a newly loaded file"""
+        self.path = str(path) if path else None
+        self.restart_requested.set()
+
+    def covers(self, t1, t2):
+        window = self.buffer.window()
+        return window is not None and window[0] <= t1 and t2 <= window[1]
+
+    def _decode_command(self, start):
+        return [
+            "ffmpeg", "-hide_banner", "-loglevel", "error", "-nostdin",
+            "-ss", str(start), "-i", self.path, "-vn",
+            "-f", "s16le", "-ac", str(self.buffer.channels), "-ar", str(self.buffer.sample_rate), "pipe:1"
+        ]
+
+    def _run(self):
+        while self.running:
+            self.restart_requested.clear()
+            position = self.position_source()
+            if not self.path or position is None:
+                self.restart_requested.wait(0.1)
+                continue
+
+            start = max(0.0, position - self.buffer.seconds + self.lead)
+            self.buffer.reset(start)
+            self.process = subprocess.Popen(
+                self._decode_command(start), stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+            )
+            self._pump(self.process)
+            self._kill()
+
+    def _pump(self, process):
+        """Read PCM until restart, EOF, or the player leaves the window"""
+        frame_bytes = self.buffer.channels * SAMPLE_WIDTH
+        pending = b""
+        caught_up = False  # until then, the window trails the player while it prefills
+        while self.running and not self.restart_requested.is_set():
+            position = self.position_source()
+            window = self.buffer.window()
+            if position is not None and window is not None:
+                caught_up = caught_up or window[1] >= position
+                if position < window[0] or (caught_up and position > window[1] + self.lead * 2):
+                    return  # seeked away
+                if window[1] > position + self.lead:
+                    time.sleep(0.01)
+                    continue
+
+            chunk = process.stdout.read(self.chunk_bytes)
+            if not chunk:
+                # EOF: keep the window until the player seeks out of it or a new file loads
+                while self.running and not self.restart_requested.wait(0.1):
+                    position = self.position_source()
+                    if position is not None and not self.covers(position, position):
+                        return
+                return
+
+            # Pipe reads can end mid-frame; carry the remainder over
+            pending += chunk
+            whole = len(pending) - len(pending) % frame_bytes
+            self.buffer.write(pending[:whole])
+            pending = pending[whole:]
+
+    def _kill(self):
+        process = self.process
+        if process is not None and process.poll() is None:
+            process.kill()
+            process.wait()
+
+
+def encode_pcm(samples, sample_rate, dest_file_path):
+    """
+    Write a slice from PcmRingBuffer.slice to dest_file_path. .wav is written
+    in-process; anything else is encoded by ffmpeg reading the PCM from stdin.
+    Blocking, run it on a worker.
+    """
+    dest = Path(dest_file_path)
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    channels = samples.shape[1]
+    if dest.suffix.lower() == ".wav":
+        buffer = io.BytesIO()
+        with wave.open(buffer, "wb") as out:
+            out.setnchannels(channels)
+            out.setsampwidth(SAMPLE_WIDTH)
+            out.setframerate(sample_rate)
+            out.writeframes(samples.tobytes())
+        dest.write_bytes(buffer.getvalue())
+        return dest
+
+    result = subprocess.run([
+        "ffmpeg", "-hide_banner", "-loglevel", "error",
+        "-f", "s16le", "-ac", str(channels), "-ar", str(sample_rate), "-i", "pipe:0",
+        str(dest), "-y"
+    ], input=samples.tobytes(), capture_output=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"FFmpeg failed with return code {result.returncode}: {result.stderr.decode(errors='replace').strip()}")
+    return dest
@@ -0,0 +1,91 @@
+import threading
+import time
+from typing import NamedTuple, Optional
+
+"""
+Observer-fed snapshot of the mpv properties the server cares about.
+
+Readers grab `state.snapshot` (a single attribute read, no lock, no libmpv call)
+and get a consistent, immutable view. Writers are mpv's property observers,
+which replace the snapshot wholesale and bump `version`.
+"""
+
+
+class PlayerSnapshot(NamedTuple):
+    time_pos: Optional[float] = None
+    time_pos_at: float = 0.0  # time.monotonic() when time_pos was observed
+    duration: Optional[float] = None
+    paused: bool = True
+    filename: Optional[str] = None
+    path: Optional[str] = None
+    idle_active: bool = True
+    speed: float = 1.0
+    version: int = 0
+
+    def estimated_position(self, now=None):
+        """time_pos advanced by the monotonic time since it was observed"""
+        if self.time_pos is None or self.paused:
+            return self.time_pos
+        if now is None:
+            now = time.monotonic()
+        return self.time_pos + (now - self.time_pos_at) * (self.speed or 1.0)
+
+
+# mpv property name -> PlayerSnapshot field
+OBSERVED_PROPERTIES = {
+    'time-pos': 'time_pos',
+    'duration': 'duration',
+    'pause': 'paused',
+    'filename': 'filename',
+    'path': 'path',
+    'idle-active': 'idle_active',
+    'speed': 'speed',
+}
+
+
+class PlayerState:
+    def __init__(self, metrics=None):
+        """metrics: Metrics to time observer callbacks into ("property_update")"""
+        self.snapshot = PlayerSnapshot()
+        self.lock = threading.Lock()  # serialises writers; readers never take it
+        self.listeners = []
+        self.metrics = metrics
+
+    def attach(self, player):
+        """Observe every snapshot property on an mpv.MPV instance"""
+        for prop in OBSERVED_PROPERTIES:
+            player.observe_property(prop, self._on_property)
+
+    def add_listener(self, listener):
+        """listener(field, snapshot) is called after each change, on the writer's thread"""
+        self.listeners.append(listener)
+
+    def _on_property(self, name, value):
+        field = OBSERVED_PROPERTIES[name]
+        if field == 'speed' and value is None:
+            value = 1.0
+        elif field in ('paused', 'idle_active') and value is None:
+            value = True
+        if self.metrics is None:
+            self.update(field, value)
+            return
+        with self.metrics.span("property_update"):
+            self.update(field, value)
+
+    def update(self, field, value):
+        with self.lock:
+            current = self.snapshot
+            changes = {field: value, 'version': current.version + 1}
+            now = time.monotonic()
+            if field == 'time_pos':
+                changes['time_pos_at'] = now
+            elif field in ('paused', 'speed'):
+                # Rebase so estimated_position() stays continuous across the change
+                changes['time_pos'] = current.estimated_position(now)
+                changes['time_pos_at'] = now
+            snapshot = current._replace(**changes)
+            self.snapshot = snapshot
+
+        for listener in self.listeners:
+            listener(field, snapshot)
+        return snapshot
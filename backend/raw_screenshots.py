@@ -0,0 +1,151 @@
+import io
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+"""
+In-memory screenshots from mpv's screenshot-raw.
+
+screenshot-to-file makes mpv encode a JPEG on its own thread and we read it
+back from disk. screenshot-raw instead hands us the frame as BGR0 bytes. The
+grab is the only part that touches the player: the bytes are wrapped without
+copying (memoryview, or a NumPy view via RawFrame.array()) and resizing and
+encoding run on a pool. Pillow releases the GIL while it resizes and encodes,
+so a thread pool already spreads a burst of captures over the cores; pass a
+ProcessPoolExecutor to go further at the cost of one copy per frame.
+
+Encoded bytes come back in memory. Writing them to disk is optional.
+"""
+
+FORMATS = {"jpeg": "JPEG", "jpg": "JPEG", "webp": "WEBP", "png": "PNG", "bmp": "BMP"}
+
+
+class RawFrame(NamedTuple):
+    width: int
+    height: int
+    stride: int
+    format: str  # mpv's pixel format, "bgr0" unless asked otherwise
+    data: memoryview
+
+    def array(self):
+        """(height, width, 4) uint8 NumPy view of the frame, no copy"""
+        if np is None:
+            raise RuntimeError("numpy is not installed")
+        rows = np.frombuffer(self.data, dtype=np.uint8).reshape(self.height, self.stride // 4, 4)
+        return rows[:, :self.width]
+
+    def image(self):
+        """RGB PIL image of the frame"""
+        if Image is None:
+            raise RuntimeError("Pillow is not installed")
+        raw_mode = {"bgr0": "BGRX", "bgra": "BGRA", "rgba": "RGBA", "rgb0": "RGBX"}.get(self.format)
+        if raw_mode is None:
+            raise ValueError(f"Unsupported screenshot-raw format: {self.format}")
+        return Image.frombuffer("RGB", (self.width, self.height), self.data, "raw", raw_mode, self.stride, 1)
+
+
+class EncodedScreenshot(NamedTuple):
+    data: bytes
+    format: str
+    width: int
+    height: int
+    path: Optional[Path]  # set if the bytes were also written to disk
+    grab_latency: float  # seconds spent in screenshot-raw on the calling thread
+    encode_latency: float  # seconds spent resizing, encoding and writing on the pool
+
+
+def grab_raw_frame(player, includes="subtitles"):
+    """Run screenshot-raw and wrap the result. The only step that talks to mpv."""
+    # node_command returns mpv's reply node; plain command() discards it
+    result = player.node_command("screenshot-raw", includes)
+    return RawFrame(result["w"], result["h"], result["stride"], result.get("format", "bgr0"), memoryview(result["data"]))
+
+
+def fit_size(width, height, max_width=None, max_height=None):
+    """Largest size within max_width x max_height keeping the aspect ratio. Never upscales."""
+    scale = 1.0
+    if max_width:
+        scale = min(scale, max_width / width)
+    if max_height:
+        scale = min(scale, max_height / height)
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+def encode_frame(frame, image_format="jpeg", max_width=None, max_height=None, quality=90, path=None):
+    """Resize and encode a RawFrame. Runs on the pool; top level so process pools can pickle it."""
+    started = time.perf_counter()
+    pil_format = FORMATS.get(image_format.lower())
+    if pil_format is None:
+        raise ValueError(f"Unsupported image format: {image_format}")
+
+    image = frame.image()
+    size = fit_size(frame.width, frame.height, max_width, max_height)
+    if size != image.size:
+        image = image.resize(size, Image.BILINEAR)
+
+    buffer = io.BytesIO()
+    options = {"quality": quality} if pil_format in ("JPEG", "WEBP") else {}
+    image.save(buffer, pil_format, **options)
+    data = buffer.getvalue()
+
+    if path is not None:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(data)
+    return EncodedScreenshot(data, pil_format.lower(), size[0], size[1], path, 0.0, time.perf_counter() - started)
+
+
+class RawScreenshotPipeline:
+    def __init__(self, player, executor=None, max_workers=None):
+        """
+        player: an mpv.MPV instance
+        executor: pool to encode on. Defaults to a thread pool of max_workers.
+        """
+        self.player = player
+        self.owns_executor = executor is None
+        self.executor = executor or ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="encode")
+
+    def capture(self, includes="subtitles", **encode_options):
+        """
+        Grab the current frame and encode it on the pool. encode_options are
+        passed to encode_frame (image_format, max_width, max_height, quality,
+        path). Returns a Future of EncodedScreenshot.
+        """
+        started = time.perf_counter()
+        frame = grab_raw_frame(self.player, includes)
+        grab_latency = time.perf_counter() - started
+
+        if isinstance(self.executor, ProcessPoolExecutor):
+            frame = frame._replace(data=bytes(frame.data))
+        future = self.executor.submit(encode_frame, frame, **encode_options)
+        return _with_grab_latency(future, grab_latency)
+
+    def stop(self):
+        if self.owns_executor:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _with_grab_latency(future, grab_latency):
+    result = Future()
+
+    def done(encoded):
+        if encoded.cancelled():
+            result.cancel()
+        elif encoded.exception() is not None:
+            result.set_exception(encoded.exception())
+        else:
+            result.set_result(encoded.result()._replace(grab_latency=grab_latency))
+
+    future.add_done_callback(done)
+    return result
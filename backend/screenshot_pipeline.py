@@ -0,0 +1,186 @@
+import os
+import threading
+import time
+from concurrent.futures import Future
+from pathlib import Path
+from typing import NamedTuple
+
+from latency import LatencyHistogram
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:
+    FileSystemEventHandler = object
+    Observer = None
+
+"""
+Completion-driven screenshots.
+
+The old capture path was: send screenshot-to-file, sleep 0.5 s, check the file.
+Here the command goes through mpv's async command API and the capture resolves
+the moment mpv reports completion. mpv writes the file before it replies, so
+the file is normally already there. If it is not (network drives, antivirus
+holding the handle), we wait for a filesystem notification via watchdog, or a
+short bounded stat loop if watchdog is not installed.
+
+Nothing here blocks the caller: capture() returns a concurrent.futures.Future.
+"""
+
+
+class ScreenshotError(Exception):
+    pass
+
+
+class ScreenshotResult(NamedTuple):
+    path: Path
+    latency: float  # seconds from capture() to the file being ready
+
+
+class _DirectoryEvents(FileSystemEventHandler):
+    def __init__(self, waiter):
+        self.waiter = waiter
+
+    def on_any_event(self, event):
+        for attr in ("src_path", "dest_path"):
+            path = getattr(event, attr, None)
+            if path:
+                self.waiter.resolve(path)
+
+
+class FileWaiter:
+    """Resolves futures when files appear"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.waiting = {}  # normalized path -> [Future]
+        self.observer = None
+        self.watched = set()
+
+    def wait_for(self, path, timeout):
+        key = self._key(path)
+        future = Future()
+        with self.lock:
+            self.waiting.setdefault(key, []).append(future)
+            if Observer is not None:
+                self._watch_locked(os.path.dirname(key))
+
+        # Check after registering, so a file created in between is not missed
+        if os.path.exists(key):
+            self.resolve(key)
+        elif Observer is None:
+            threading.Thread(target=self._stat_loop, args=(key, timeout), daemon=True).start()
+
+        timer = threading.Timer(timeout, self._expire, (key, future))
+        timer.daemon = True
+        timer.start()
+        return future
+
+    def resolve(self, path):
+        key = self._key(path)
+        with self.lock:
+            futures = self.waiting.pop(key, None)
+        for future in futures or ():
+            if not future.done():
+                future.set_result(key)
+
+    def stop(self):
+        if self.observer is not None:
+            self.observer.stop()
+
+    def _watch_locked(self, directory):
+        if directory in self.watched:
+            return
+        if self.observer is None:
+            self.observer = Observer()
+            self.observer.daemon = True
+            self.observer.start()
+        self.observer.schedule(_DirectoryEvents(self), directory, recursive=False)
+        self.watched.add(directory)
+
+    def _stat_loop(self, key, timeout):
+        # Fallback without watchdog: bounded 2 ms stat loop
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if os.path.exists(key):
+                self.resolve(key)
+                return
+            with self.lock:
+                if key not in self.waiting:
+                    return
+            time.sleep(0.002)
+
+    def _expire(self, key, future):
+        with self.lock:
+            futures = self.waiting.get(key)
+            if futures and future in futures:
+                futures.remove(future)
+                if not futures:
+                    del self.waiting[key]
+        if not future.done():
+            future.set_exception(ScreenshotError(f"Screenshot file did not appear: {key}"))
+
+    @staticmethod
+    def _key(path):
+        return os.path.normcase(os.path.abspath(str(path)))
+
+
+class ScreenshotPipeline:
+    def __init__(self, player, file_timeout=2.0, histogram=None):
+        """
+        player: an mpv.MPV instance
+        file_timeout: how long to wait for the file after mpv reports completion
+        histogram: LatencyHistogram to record capture latency into
+        """
+        self.player = player
+        self.file_timeout = file_timeout
+        self.histogram = histogram or LatencyHistogram("screenshot")
+        self.files = FileWaiter()
+
+    def capture(self, path, includes="subtitles"):
+        """Take a screenshot to path. Returns a Future of ScreenshotResult."""
+        started = time.perf_counter()
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        future = Future()
+
+        def finish(error=None):
+            if error is not None:
+                future.set_exception(error)
+                return
+            latency = time.perf_counter() - started
+            self.histogram.record(latency)
+            future.set_result(ScreenshotResult(path, latency))
+
+        def on_command_done(error, _result):
+            # mpv's event thread
+            if error is not None:
+                finish(ScreenshotError(f"screenshot-to-file failed: {error}"))
+            elif path.exists():
+                finish()
+            else:
+                waiter = self.files.wait_for(path, self.file_timeout)
+                waiter.add_done_callback(lambda waited: finish(waited.exception()))
+
+        self._command_async(on_command_done, "screenshot-to-file", str(path), includes)
+        return future
+
+    def _command_async(self, on_done, name, *args):
+        command_async = getattr(self.player, "command_async", None)
+        if command_async is not None:
+            command_async(name, *args, callback=on_done)
+            return
+
+        # Older python-mpv without command_async: block a helper thread instead of the caller
+        def run():
+            try:
+                self.player.command(name, *args)
+            except Exception as e:
+                on_done(e, None)
+                return
+            on_done(None, None)
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def stop(self):
+        self.files.stop()
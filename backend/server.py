@@ -4,42 +4,153 @@ os.environ["PATH"] = r"C:\Users\roly\mpv-dev-x86_64" + os.pathsep + os.environ["
 import asyncio
 import websockets
 import json
+import logging
 import time
 import sys
 import signal
 import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Optional
-import mpv
+
+try:
+    import mpv
+except (ImportError, OSError):  # no libmpv: only --attach to an IPC socket works
+    mpv = None
+
+from audio_clips import ClipEncoder
+from captures import RESPONSE_ONLY_FIELDS, CaptureContext, default_capture_handlers
+from client_channel import ClientChannel
+from clock_sync import AnchorStream, ClockAnchor
+from commands import CommandDispatcher, CommandError
+from cue_scheduler import CueScheduler
+from event_log import REPLAYED_TYPES, EventLog, requested_resume
+from ipc_player import IPCPlayer
+from local_transport import remove_stale_socket, serve_framed
+from log import ensure_logging, get_logger, shutdown_logging
+from media_info import load_media_info
+from metrics import Metrics, serve_metrics
+from pcm_buffer import PcmRingBuffer, PcmTap
+from player_state import PlayerState
+from subtitles import CueTracker, SubtitleIndex, find_sidecar_subtitles, load_srt
+from time_stream import TimeStream
+from topics import TOPICS, Subscription, parse_topics, requested_topics, topic_of
+import wire
 
 # FIXME: the MPV, and harvesting time, should be a layer behind the WS Server
 
+logger = get_logger("server")
+
 class MPVWebSocketServer:
-    def __init__(self, poll_interval=0.208):
+    def __init__(self, poll_interval=0.208, time_mode="stream", coalesce_window=0.0, max_emit_rate=30.0,
+                 drift_threshold=0.08, anchor_verify_interval=2.0,
+                 client_queue_size=64, client_max_overflows=16, drop_policies=None, capture_workers=4,
+                 clip_jobs=None, clip_mode="encode", pcm_buffer_seconds=0, pcm_buffer_max_bytes=None,
+                 player_options=None, stats_interval=5.0, metrics_port=None, ipc_socket=None,
+                 replay_size=256, session_id=None, workers=None, clips=None, handle_signals=True,
+                 player=None):
+        """
+        time_mode: "stream" emits time updates from mpv's time-pos observer,
+            "anchor" only sends clock anchors for clients to extrapolate from,
+            "poll" keeps the old fixed-interval monitor thread
+        coalesce_window, max_emit_rate: tuning for "stream" mode, see TimeStream
+        drift_threshold, anchor_verify_interval: tuning for "anchor" mode, see AnchorStream
+        client_queue_size, client_max_overflows, drop_policies: per-client send
+            queue tuning, see ClientChannel
+        capture_workers: size of the worker pool shared by capture handlers and
+            blocking libmpv calls
+        clip_jobs: ffmpeg audio clip jobs allowed at once, default one per core
+        clip_mode: "encode" to always make mp3s, "copy" to stream-copy the
+            source audio when its codec allows, see make_audio_clip
+        pcm_buffer_seconds, pcm_buffer_max_bytes: keep this much decoded audio
+            around the playhead for instant clips (0 disables), see PcmTap
+        player_options: extra mpv options, e.g. {"vo": "null"} to run headless
+        ipc_socket: attach to an mpv already running with
+            --input-ipc-server=<ipc_socket> instead of embedding libmpv (see
+            IPCPlayer); player_options are ignored
+        replay_size: recent events and captures kept for reconnecting
+            clients, see EventLog
+        stats_interval: seconds between "stats" broadcasts (0 disables; the
+            stats command works either way)
+        metrics_port: serve the same numbers at http://localhost:<port>/metrics
+            in the Prometheus text format
+        session_id: this player's ID when it is one session of a SessionServer
+        workers, clips: a worker pool / ClipEncoder shared with other sessions,
+            used instead of creating (and later shutting down) our own;
+            capture_workers, clip_jobs and clip_mode then do not apply
+        handle_signals: install the Ctrl+C handler (a SessionServer does it instead)
+        player: an object with mpv.MPV's interface to use instead of creating
+            one (or attaching to ipc_socket), e.g. a stub for poc checks
+        """
         self.poll_interval = poll_interval
+        self.time_mode = time_mode
+        self.time_stream = TimeStream(self.broadcast_time_update, coalesce_window, max_emit_rate)
+        self.anchor_stream = AnchorStream(
+            self.broadcast_anchor, lambda: self.state.snapshot, drift_threshold, anchor_verify_interval
+        )
         self.running = False
         self.monitor_thread = None
         self.player_active = True
         self.last_pause_state = None
-        self.last_time_pos = None
-        self.clients = set()
+        ensure_logging()
+        self.metrics = Metrics()
+        self.stats_interval = stats_interval
+        self.metrics_port = metrics_port
+        self.metrics_server = None
+        self.stats_task = None
+        self.state = PlayerState(self.metrics)
+        self.subtitles: Optional[SubtitleIndex] = None
+        self.cue_tracker: Optional[CueTracker] = None
+        self.cue_scheduler = CueScheduler(self.update_cues, lambda: self.state.snapshot)
+        self.client_queue_size = client_queue_size
+        self.client_max_overflows = client_max_overflows
+        self.drop_policies = drop_policies
+        self.clients = {}  # websocket -> ClientChannel
+        self.subscribers = {topic: set() for topic in TOPICS}  # topic -> ClientChannels, see topics.py
+        self.event_log = EventLog(replay_size)
+        self.commands = CommandDispatcher()
+        self.capture_handlers = {}  # name -> CaptureHandler
+        self.session_id = session_id
+        self.owns_pools = workers is None
+        self.workers = workers or ThreadPoolExecutor(max_workers=capture_workers, thread_name_prefix="capture")
+        self.clips = clips or ClipEncoder(max_jobs=clip_jobs, mode=clip_mode)
+        self.pcm_tap: Optional[PcmTap] = None
+        if pcm_buffer_seconds:
+            self.pcm_tap = PcmTap(
+                PcmRingBuffer(pcm_buffer_seconds, max_bytes=pcm_buffer_max_bytes),
+                lambda: self.state.snapshot.estimated_position()
+            )
+        self.media_path = None  # file media_info is (being) looked up for
+        self.media_info = None  # MediaInfo of the current file, once known
         self.server = None
+        self.local_server = None  # Unix socket / named pipe listener, see local_transport.py
         self.loop: Optional[asyncio.AbstractEventLoop] = None  # Will store the event loop reference
         
-        # Create MPV instance
-        self.player = mpv.MPV(
-            idle=True,
-            osc=True,
-            sub_auto='all',
-            input_default_bindings=True,
-            input_vo_keyboard=True,
-            autofit='50%',
-            geometry='+0+0'  # Right edge (+-0) and top edge (+0)
-
-        )
+        # Create MPV instance, or attach to a running one
+        self.attached = ipc_socket is not None and player is None
+        if player is not None:
+            self.player = player
+        elif self.attached:
+            self.player = IPCPlayer(ipc_socket)
+        elif mpv is None:
+            raise RuntimeError("python-mpv/libmpv is not available; attach to mpv's IPC socket instead")
+        else:
+            self.player = mpv.MPV(
+                idle=True,
+                osc=True,
+                sub_auto='all',
+                input_default_bindings=True,
+                input_vo_keyboard=True,
+                autofit='50%',
+                geometry='+0+0',  # Right edge (+-0) and top edge (+0)
+                **(player_options or {})
+            )
         
+        self.state.attach(self.player)
         self.setup_event_handlers()
-        signal.signal(signal.SIGINT, self.signal_handler)
+        self.setup_commands()
+        if handle_signals:
+            signal.signal(signal.SIGINT, self.signal_handler)
         
     def setup_event_handlers(self):
         """Set up MPV event handlers and property observers"""
@@ -48,6 +159,7 @@ class MPVWebSocketServer:
         def on_start_file(event):
             message = f"🟢 Started playing: {self.get_filename()}"
             self.broadcast_message("event", message)
+            self.cue_scheduler.mark_resync()
             
         @self.player.event_callback('end-file')
         def on_end_file(event):
@@ -57,19 +169,20 @@ class MPVWebSocketServer:
             
         @self.player.event_callback('seek')
         def on_seek(event):
-            pos = self.get_time_pos()
+            # The first time-pos after the seek goes out without coalescing
+            self.time_stream.mark_urgent()
+            self.anchor_stream.mark_seek()
+            self.cue_scheduler.mark_resync()
+            # The snapshot has not seen the post-seek time-pos yet; read it live
+            try:
+                pos = self.player.time_pos
+            except Exception:
+                pos = None
             if pos is not None:
                 message = f"⏩ Seeked to {self.format_time(pos)}"
                 self.broadcast_message("event", message)
         
-        @self.player.property_observer('pause')
-        def on_pause_observer(_name, value):
-            if self.last_pause_state != value:
-                if value:
-                    self.broadcast_message("event", "⏸️  Paused")
-                else:
-                    self.broadcast_message("event", "▶️  Resuming")
-                self.last_pause_state = value
+        self.state.add_listener(self.on_state_change)
         
         @self.player.event_callback('shutdown')
         def on_shutdown(event):
@@ -77,44 +190,177 @@ class MPVWebSocketServer:
             self.player_active = False
             self.stop_monitoring()
     
+    def on_state_change(self, field, snapshot):
+        """Called on mpv's event thread whenever an observed property changes"""
+        # TimeStream / AnchorStream ignore input unless their mode is running
+        if field == 'time_pos':
+            self.time_stream.push(snapshot.time_pos)
+            self.anchor_stream.on_time_pos(snapshot)
+            self.cue_scheduler.on_time_pos(snapshot)
+        elif field == 'paused':
+            if self.last_pause_state != snapshot.paused:
+                if snapshot.paused:
+                    self.broadcast_message("event", "⏸️  Paused")
+                else:
+                    self.broadcast_message("event", "▶️  Resuming")
+                self.last_pause_state = snapshot.paused
+                if snapshot.time_pos is not None:
+                    self.time_stream.push(snapshot.time_pos, urgent=True)
+                self.anchor_stream.on_pause(snapshot)
+                self.cue_scheduler.resync()
+        elif field == 'speed':
+            if snapshot.time_pos is not None:
+                self.time_stream.push(snapshot.time_pos, urgent=True)
+            self.anchor_stream.on_speed(snapshot)
+            self.cue_scheduler.resync()
+        elif field == 'path':
+            self.load_sidecar_subtitles(snapshot.path)
+            self.prefetch_media_info(snapshot.path)
+            if self.pcm_tap:
+                self.pcm_tap.set_source(snapshot.path)
+                self.pcm_tap.start()
+    
+    def setup_commands(self):
+        """Register the request/response commands clients can send, see commands.py"""
+        self.commands.register("ping", self.cmd_ping)
+        self.commands.register("seek", self.cmd_seek)
+        self.commands.register("pause", self.cmd_pause)
+        self.commands.register("load_file", self.cmd_load_file)
+        self.commands.register("stats", self.cmd_stats)
+    
+    async def run_blocking(self, func, *args):
+        """Run a blocking call on the shared worker pool"""
+        return await self.loop.run_in_executor(self.workers, func, *args)
+    
+    async def run_player(self, func, *args):
+        """Run a blocking libmpv call off the event loop"""
+        if not self.player_active:
+            raise CommandError("Player is not active")
+        
+        def timed():
+            with self.metrics.span("libmpv_call"):
+                return func(*args)
+        return await self.run_blocking(timed)
+    
+    async def cmd_ping(self, args, progress):
+        return {"server_monotonic": time.monotonic()}
+    
+    async def cmd_stats(self, args, progress):
+        return self.stats_snapshot()
+    
+    async def cmd_seek(self, args, progress):
+        """args: position (seconds), reference ("absolute" or "relative", default absolute)"""
+        if args.get("position") is None:
+            raise CommandError("seek needs a position")
+        position = float(args["position"])
+        reference = args.get("reference", "absolute")
+        await self.run_player(self.player.seek, position, reference)
+        return {"position": position, "reference": reference}
+    
+    async def cmd_pause(self, args, progress):
+        """args: paused (bool); toggles when omitted"""
+        paused = args.get("paused")
+        if paused is None:
+            paused = not self.state.snapshot.paused
+        await self.run_player(setattr, self.player, "pause", bool(paused))
+        return {"paused": bool(paused)}
+    
+    async def cmd_load_file(self, args, progress):
+        """args: path"""
+        if not args.get("path"):
+            raise CommandError("load_file needs a path")
+        if not await self.run_player(self.load_file, args["path"]):
+            raise CommandError(f"Failed to load {args['path']}")
+        return {"path": args["path"]}
+    
+    def add_capture_handler(self, handler):
+        """Bind a CaptureHandler's hotkeys and commands, see captures.py"""
+        self.capture_handlers[handler.name] = handler
+        
+        for key, action in handler.hotkeys.items():
+            self.player.on_key_press(key)(self.capture_hotkey_callback(handler, action))
+        
+        for command, action in handler.commands.items():
+            self.commands.register(command, self.capture_command(handler, action))
+    
+    def capture_hotkey_callback(self, handler, action):
+        def on_hotkey():
+            # mpv's event thread: take the timestamp now, do the work on the loop
+            context = self.capture_context(action, {}, lambda update: None)
+            if self.loop is None:
+                logger.warning("⚠️  %s: server not started yet, ignoring hotkey", handler.name)
+                return
+            asyncio.run_coroutine_threadsafe(self.run_capture(handler, context), self.loop)
+        return on_hotkey
+    
+    def capture_command(self, handler, action):
+        async def command(args, progress):
+            return await self.run_capture(handler, self.capture_context(action, args, progress))
+        return command
+    
+    def capture_context(self, action, args, progress):
+        now = time.monotonic()
+        snapshot = self.state.snapshot
+        return CaptureContext(action, args, snapshot, snapshot.estimated_position(now), now, progress)
+    
+    async def run_capture(self, handler, context):
+        """Run a capture and publish its result to every client"""
+        if not self.player_active:
+            raise CommandError("Player is not active")
+        try:
+            with self.metrics.span(f"capture.{handler.name}"):
+                result = await handler.capture(self, context)
+        except Exception as e:
+            self.broadcast_message("error", f"❌ {handler.name} failed: {e}", {
+                "handler": handler.name,
+                "action": context.action
+            })
+            raise
+        
+        # Inline image data goes back in the requester's response only, not to
+        # every client and the replay log
+        published = result
+        if isinstance(result, dict) and any(field in result for field in RESPONSE_ONLY_FIELDS):
+            published = {key: value for key, value in result.items() if key not in RESPONSE_ONLY_FIELDS}
+        self.broadcast_message("capture", f"📸 {handler.name} ({context.action}) at {self.format_time(context.time_pos)}", {
+            "handler": handler.name,
+            "action": context.action,
+            "time_pos": context.time_pos,
+            "result": published
+        })
+        return result
+    
+    # The getters below read the observer-fed snapshot and never call into libmpv
+    
     def get_time_pos(self):
         """Get current time position"""
-        try:
-            if not self.player_active:
-                return None
-            return self.player.time_pos
-        except:
+        if not self.player_active:
             return None
+        return self.state.snapshot.time_pos
     
     def get_duration(self):
-        """Get media duration"""
-        try:
-            if not self.player_active:
-                return None
-            return self.player.duration
-        except:
+        """Get media duration, from the metadata cache until mpv's demuxer reports it"""
+        if not self.player_active:
             return None
+        duration = self.state.snapshot.duration
+        if duration is None and self.media_info is not None:
+            return self.media_info.duration
+        return duration
     
     def get_filename(self):
         """Get current filename"""
-        try:
-            if not self.player_active:
-                return "Player closed"
-            filename = self.player.filename
-            if filename and isinstance(filename, str):
-                return Path(filename).name
-            return "Unknown"
-        except:
-            return "Unknown"
+        if not self.player_active:
+            return "Player closed"
+        filename = self.state.snapshot.filename
+        if filename and isinstance(filename, str):
+            return Path(filename).name
+        return "Unknown"
     
     def is_paused(self):
         """Check if player is currently paused"""
-        try:
-            if not self.player_active:
-                return True
-            return self.player.pause
-        except:
+        if not self.player_active:
             return True
+        return self.state.snapshot.paused
     
     def format_time(self, seconds):
         """Format seconds as MM:SS.S"""
@@ -127,9 +373,11 @@ class MPVWebSocketServer:
     
     def broadcast_message(self, msg_type, content, extra_data=None):
         """Broadcast message to all connected WebSocket clients"""
-        if not self.clients:
-            # If no WebSocket clients, print to console like original
-            print(content)
+        # Queued for the log thread (and sampled for time updates), never written here
+        logger.log(logging.ERROR if msg_type == "error" else logging.INFO, content,
+                   extra={"msg_type": msg_type, "data": extra_data})
+        replayed = msg_type in REPLAYED_TYPES
+        if not replayed and not self.has_subscribers(msg_type):
             return
             
         message = {
@@ -141,86 +389,252 @@ class MPVWebSocketServer:
         if extra_data:
             # message.update(extra_data)
             message["extra_data"] = extra_data
+
         
-        # Print to console as well
-        print(content)
-        
-        # Schedule the async broadcast from the thread
-        if self.clients and self.loop:
+        # Schedule the async broadcast from the thread; replayed types go
+        # through the loop even without clients, to be numbered and kept
+        if self.loop:
             asyncio.run_coroutine_threadsafe(
-                self._async_broadcast(message), 
+                self._async_broadcast(message, time.monotonic()), 
                 self.loop
             )
+        elif replayed:
+            self.event_log.append(message)
     
-    async def _async_broadcast(self, message):
-        """Async method to broadcast to WebSocket clients"""
-        if not self.clients:
-            return
+    async def _async_broadcast(self, message, monotonic):
+        """Serialize once per wire protocol and hand the message to every client's send queue"""
+        # Numbering on the loop, between fan-outs, means a client registering
+        # now gets each message either in its welcome replay or live, not both
+        if message["type"] in REPLAYED_TYPES:
+            self.event_log.append(message)
+        topic = topic_of(message["type"])
+        channels = self.subscribers[topic]
+        if not channels:
+            return  # nobody wants this topic: nothing to serialize
             
-        disconnected_clients = set()
-        json_message = json.dumps(message)
+        # How long run_coroutine_threadsafe took to get us onto the loop
+        self.metrics.record("loop_delay", time.monotonic() - monotonic)
+        payloads = {}
+        now = time.monotonic()
+        # A clock anchor changes what clients extrapolate from; never hold one back
+        anchor = "anchor" in (message.get("extra_data") or {})
         
-        for client in self.clients.copy():  # Use copy to avoid modification during iteration
-            try:
-                await client.send(json_message)
-            except Exception as e:
-                disconnected_clients.add(client)
+        # offer() never awaits, so a slow client cannot hold up the others
+        for channel in list(channels):
+            subscription = channel.subscription
+            wait = 0.0 if anchor else subscription.delay(topic, now)
+            if wait is None:
+                continue
+            payload = payloads.get(channel.protocol)
+            if payload is None:
+                payload = payloads[channel.protocol] = self.encode_message(message, channel.protocol, monotonic)
+            if wait:
+                # Over this client's max_rate: keep the latest, send it when the interval is up
+                if subscription.defer(topic, message["type"], payload):
+                    self.loop.call_later(wait, self.flush_deferred, channel, topic)
+                continue
+            subscription.sent(topic, now)
+            channel.offer(message["type"], payload)
+    
+    def flush_deferred(self, channel, topic):
+        """Send the message held back for channel's max_rate on topic, if it is still wanted"""
+        if channel not in self.subscribers[topic]:
+            return
+        pending = channel.subscription.pending.pop(topic, None)
+        if pending is None:
+            return  # superseded by an anchor, or the client resubscribed
+        channel.subscription.sent(topic, time.monotonic())
+        channel.offer(*pending)
+    
+    def encode_message(self, message, protocol, monotonic):
+        """Serialize a message dict for one wire protocol"""
+        with self.metrics.span(f"encode.{protocol}"):
+            return self._encode_message(message, protocol, monotonic)
+    
+    def _encode_message(self, message, protocol, monotonic):
+        if protocol == wire.PROTOCOL_BINARY:
+            extra_data = message.get("extra_data") or {}
+            if "anchor" in extra_data:
+                return wire.encode_anchor(ClockAnchor(**extra_data["anchor"]), extra_data["server_monotonic"])
+            if message["type"] == "time_update":
+                return wire.encode_time_update(
+                    message["extra_data"]["time_pos"], monotonic, self.state.snapshot.paused
+                )
+            return wire.encode_message(message)
+        return json.dumps(message)
+    
+    def has_subscribers(self, msg_type):
+        """Whether any client is subscribed to msg_type's topic"""
+        return bool(self.subscribers[topic_of(msg_type)])
+    
+    def subscribe(self, channel, intervals):
+        """Replace channel's topics (topic -> min seconds between messages); None unsubscribes from all"""
+        for channels in self.subscribers.values():
+            channels.discard(channel)
+        if intervals is None:
+            return
+        channel.subscription = Subscription(intervals)
+        for topic in intervals:
+            self.subscribers[topic].add(channel)
+    
+    def on_channel_closed(self, channel):
+        """A client's sender stopped (socket error or too many overflows)"""
+        self.subscribe(channel, None)
+        if self.clients.pop(channel.websocket, None) is not None:
+            logger.info("Removed disconnected WebSocket client. Remaining: %d", len(self.clients))
+    
+    def stats_snapshot(self):
+        """Span histograms, per-client queues and clip jobs, as sent in "stats" messages"""
+        return {
+            "spans": self.metrics.snapshot(),
+            "clients": self.get_queue_stats(),
+            "clips": self.clips.stats(),
+            "server_monotonic": time.monotonic()
+        }
+    
+    def metrics_gauges(self):
+        """Point-in-time numbers for the Prometheus endpoint"""
+        return {
+            "clients": len(self.clients),
+            "client_queue_depth_max": max((len(channel.queue) for channel in self.clients.values()), default=0),
+            "clip_jobs_running": self.clips.running,
+            "clip_jobs_queued": self.clips.queued
+        }
+    
+    async def broadcast_stats_periodically(self):
+        while True:
+            await asyncio.sleep(self.stats_interval)
+            if self.has_subscribers("stats"):
+                self.broadcast_message("stats", "📊 Server stats", self.stats_snapshot())
+    
+    def get_queue_stats(self):
+        """Per-client send queue depth and drop counters"""
+        return [
+            {"remote": str(getattr(channel.websocket, "remote_address", None)), **channel.stats()}
+            for channel in self.clients.values()
+        ]
+    
+    def broadcast_time_update(self, time_pos):
+        """Broadcast a time_update for time_pos, or the idle/not-ready status if there is none"""
+        if time_pos is not None:
+            duration = self.get_duration()
+            formatted_time = self.format_time(time_pos)
+            
+            if duration and isinstance(duration, (int, float)) and isinstance(time_pos, (int, float)):
+                progress = (time_pos / duration) * 100
+                formatted_duration = self.format_time(duration)
+                content = f"⏱️  {formatted_time} / {formatted_duration} ({progress:.1f}%)"
+                
+                # Send structured data for WebSocket clients
+                extra_data = {
+                    "time_pos": round(time_pos, 3),  
+                    # "duration": duration,
+                    "progress": round(progress, 3),
+                    "formatted_time": formatted_time,
+                    "formatted_duration": formatted_duration
+                }
+                self.broadcast_message("time_update", content, extra_data)
+            else:
+                self.broadcast_message("time_update", f"⏱️  {formatted_time}", {
+                    "time_pos": time_pos,
+                    "formatted_time": formatted_time
+                })
+            return True
         
-        # Remove disconnected clients
-        for client in disconnected_clients:
-            self.clients.discard(client)
-            print(f"Removed disconnected WebSocket client. Remaining: {len(self.clients)}")
+        if not self.player_active:
+            return False
+        if self.state.snapshot.idle_active:
+            self.broadcast_message("status", "💤 Player idle (no media loaded)")
+        else:
+            self.broadcast_message("status", "⚠️  No time position available")
+        return True
+    
+    def load_subtitles(self, srt_path):
+        """Index an SRT file so the server can announce cue changes"""
+        try:
+            self.subtitles = SubtitleIndex(load_srt(srt_path))
+            self.cue_tracker = CueTracker(self.subtitles)
+            self.cue_scheduler.set_index(self.subtitles)
+            self.broadcast_message("info", f"📝 Loaded {len(self.subtitles)} subtitle cues from {Path(srt_path).name}")
+            return True
+        except Exception as e:
+            self.subtitles = None
+            self.cue_tracker = None
+            self.cue_scheduler.set_index(None)
+            self.broadcast_message("error", f"❌ Failed to load subtitles: {e}")
+            return False
+    
+    def load_sidecar_subtitles(self, path):
+        """
+        Load the SRT next to path, or drop the previous file's cues. Runs from
+        the 'path' observer, so files opened by load_file, the playlist or
+        whoever drives an attached mpv all get their cues.
+        """
+        sidecar = find_sidecar_subtitles(path) if path and os.path.isfile(path) else None
+        if sidecar:
+            self.load_subtitles(sidecar)
+        else:
+            self.subtitles = None
+            self.cue_tracker = None
+            self.cue_scheduler.set_index(None)
+    
+    def update_cues(self, time_pos):
+        """
+        Broadcast cue_exit / cue_enter when the set of on-screen cues changes.
+        Driven by CueScheduler at cue boundaries and after seek/pause/speed changes.
+        """
+        tracker = self.cue_tracker
+        if tracker is None:
+            return
+        change = tracker.update(time_pos)
+        if change is None:
+            return
+        entered, exited = change
+        # cue_indices are positions in the index, unique per cue; cue_numbers the SRT numbers the GUI shows
+        if exited:
+            numbers = [self.subtitles.cues[index].number for index in exited]
+            self.broadcast_message("cue_exit", f"💬 Cue {', '.join(map(str, numbers))} ended", {
+                "cue_indices": exited,
+                "cue_numbers": numbers,
+                "time_pos": time_pos
+            })
+        if entered:
+            cues = [self.subtitles.cues[index] for index in entered]
+            self.broadcast_message("cue_enter", "💬 " + " / ".join(cue.text for cue in cues), {
+                "cue_indices": entered,
+                "cue_numbers": [cue.number for cue in cues],
+                "cues": [cue._asdict() for cue in cues],
+                "time_pos": time_pos
+            })
+    
+    def broadcast_anchor(self, anchor, reason):
+        """Broadcast a clock anchor as a time_update clients can extrapolate from"""
+        formatted_time = self.format_time(anchor.media_time)
+        state = "paused" if anchor.paused else f"x{anchor.speed:g}"
+        self.broadcast_message("time_update", f"⚓ {formatted_time} ({reason}, {state})", {
+            "time_pos": round(anchor.media_time, 3),
+            "formatted_time": formatted_time,
+            "anchor": anchor._asdict(),
+            "reason": reason,
+            "server_monotonic": time.monotonic()
+        })
     
     def monitor_time(self):
         """Monitor time position and broadcast updates"""
         self.broadcast_message("info", f"🕐 Starting time monitoring (every {int(self.poll_interval * 1000)}ms)...")
         
+        last_version = None
         while self.running and self.player_active:
             try:
-                if self.is_paused():
+                snapshot = self.state.snapshot
+                if snapshot.paused or snapshot.version == last_version:
                     time.sleep(self.poll_interval)
                     continue
+                last_version = snapshot.version
                 
-                time_pos = self.get_time_pos()
-
-                
-                if time_pos is not None:
-                    duration = self.get_duration()
-                    formatted_time = self.format_time(time_pos)
-                    
-                    if duration and isinstance(duration, (int, float)) and isinstance(time_pos, (int, float)):
-                        progress = (time_pos / duration) * 100
-                        formatted_duration = self.format_time(duration)
-                        content = f"⏱️  {formatted_time} / {formatted_duration} ({progress:.1f}%)"
-                        
-                        # Send structured data for WebSocket clients
-                        extra_data = {
-                            "time_pos": round(time_pos, 3),  
-                            # "duration": duration,
-                            "progress": round(progress, 3),
-                            "formatted_time": formatted_time,
-                            "formatted_duration": formatted_duration
-                        }
-                        self.broadcast_message("time_update", content, extra_data)
-                    else:
-                        self.broadcast_message("time_update", f"⏱️  {formatted_time}", {
-                            "time_pos": time_pos,
-                            "formatted_time": formatted_time
-                        })
-                else:
-                    try:
-                        if not self.player_active:
-                            break
-                        idle = self.player.idle_active
-                        if idle:
-                            self.broadcast_message("status", "💤 Player idle (no media loaded)")
-                        else:
-                            self.broadcast_message("status", "⚠️  No time position available")
-                    except:
-                        if self.player_active:
-                            self.broadcast_message("error", "⚠️  Player not ready")
-                        else:
-                            break
+                with self.metrics.span("monitor_iteration"):
+                    if not self.broadcast_time_update(snapshot.time_pos):
+                        break
                 
                 time.sleep(self.poll_interval)
                 
@@ -238,114 +652,319 @@ class MPVWebSocketServer:
                 self.broadcast_message("error", "❌ Player is not active")
                 return False
             self.broadcast_message("info", f"📁 Loading: {Path(filepath).name}")
+            self.prefetch_media_info(filepath)
             self.player.play(filepath)
             return True
         except Exception as e:
             self.broadcast_message("error", f"❌ Failed to load file: {e}")
             return False
     
+    def prefetch_media_info(self, path):
+        """
+        Look up path's metadata on a worker (a cache read, or one ffprobe the
+        first time) and broadcast it as "media_info". Runs alongside mpv
+        opening the file, so clients usually know the duration and tracks first.
+        """
+        if not path or path == self.media_path or not os.path.isfile(path):
+            return
+        self.media_path = path
+        self.media_info = None
+
+        def done(future):
+            if self.media_path != path:
+                return  # another file was loaded meanwhile
+            try:
+                info = future.result()
+            except Exception as e:
+                self.broadcast_message("error", f"❌ Could not read media info: {e}")
+                return
+            self.media_info = info
+            tracks = len(info.subtitle_tracks) + len(info.external_subtitles)
+            self.broadcast_message("media_info", f"🎞️  {Path(path).name}: {self.format_time(info.duration)}, "
+                                   f"{len(info.streams)} streams, {tracks} subtitle tracks", info.as_dict())
+
+        self.workers.submit(load_media_info, path).add_done_callback(done)
+    
     def start_monitoring(self):
-        """Start the time monitoring thread"""
+        """Start streaming time updates, or the polling thread in "poll" mode"""
         if not self.running:
             self.running = True
+            if self.time_mode == "stream":
+                rate = f"{1 / self.time_stream.min_interval:.0f}/s" if self.time_stream.min_interval else "every frame"
+                self.broadcast_message("info", f"🕐 Streaming time updates from mpv (max {rate})...")
+                self.time_stream.start()
+                return
+            if self.time_mode == "anchor":
+                self.broadcast_message("info", f"⚓ Sending clock anchors (drift check every {self.anchor_stream.verify_interval:g}s)...")
+                self.anchor_stream.start()
+                return
             self.monitor_thread = threading.Thread(target=self.monitor_time, daemon=True)
             self.monitor_thread.start()
     
     def stop_monitoring(self):
-        """Stop the time monitoring thread"""
+        """Stop time updates"""
         if self.running:
             self.broadcast_message("info", "⏹️  Stopping monitoring...")
             self.running = False
+            self.time_stream.stop()
+            self.anchor_stream.stop()
+            self.cue_scheduler.stop()
             if self.monitor_thread and self.monitor_thread.is_alive():
                 self.monitor_thread.join(timeout=2)
     
     async def register_client(self, websocket):
         """Register a new WebSocket client"""
-        self.clients.add(websocket)
-        print(f"WebSocket client connected. Total clients: {len(self.clients)}")
+        channel = ClientChannel(
+            websocket,
+            maxsize=self.client_queue_size,
+            max_overflows=self.client_max_overflows,
+            policies=self.drop_policies,
+            metrics=self.metrics,
+            on_close=self.on_channel_closed,
+            protocol=wire.negotiated_protocol(websocket)
+        )
+        self.clients[websocket] = channel
+        logger.info("WebSocket client connected. Total clients: %d", len(self.clients))
+        
+        # Topics from ?topics=..., every topic if none were asked for
+        try:
+            intervals, topics_error = requested_topics(websocket), None
+        except ValueError as e:
+            intervals, topics_error = None, str(e)
+        self.subscribe(channel, intervals or dict.fromkeys(TOPICS, 0.0))
         
-        # Send welcome message with current status
+        # Send welcome message with current status, plus whatever a
+        # reconnecting client (?since=<seq>&epoch=<epoch>) missed
+        since, epoch = requested_resume(websocket)
+        missed = self.event_log.since(since, epoch) if since is not None else None
+        events = self.event_log.recent() if missed is None else missed
+        snapshot = self.state.snapshot
         welcome = {
             "type": "welcome",
             "content": "Connected to MPV WebSocket Server",
             "timestamp": time.time(),
+            "session": self.session_id,
             "player_active": self.player_active,
-            "filename": self.get_filename() if self.player_active else None
+            "filename": self.get_filename() if self.player_active else None,
+            "server_monotonic": time.monotonic(),
+            "state": {
+                "time_pos": snapshot.estimated_position(),
+                "duration": self.get_duration(),
+                "paused": snapshot.paused,
+                "speed": snapshot.speed,
+                "path": snapshot.path,
+                "idle": snapshot.idle_active,
+            },
+            "anchor": self.anchor_stream.anchor._asdict() if self.anchor_stream.anchor else None,
+            "active_cues": list(self.cue_tracker.active) if self.cue_tracker else [],
+            "media": self.media_info.as_dict() if self.media_info else None,
+            "epoch": self.event_log.epoch,
+            "seq": self.event_log.seq,
+            # resync: events is the whole ring and replaces the client's history;
+            # otherwise it is just the messages after `since`
+            "resync": missed is None,
+            "events": [event for event in events if topic_of(event["type"]) in channel.subscription.intervals],
+            "topics": channel.subscription.as_dict(),
+            "topics_error": topics_error,
+            "protocol": channel.protocol
         }
-        await websocket.send(json.dumps(welcome))
+        channel.offer("welcome", json.dumps(welcome))
+        channel.start()
+        return channel
     
     async def unregister_client(self, websocket):
         """Remove a WebSocket client"""
-        self.clients.discard(websocket)
-        print(f"WebSocket client disconnected. Total clients: {len(self.clients)}")
+        channel = self.clients.pop(websocket, None)
+        if channel:
+            channel.close()
+        logger.info("WebSocket client disconnected. Total clients: %d", len(self.clients))
+    
+    def send_to(self, channel, message):
+        """Queue a message for a single client"""
+        channel.offer(message["type"], self.encode_message(message, channel.protocol, time.monotonic()))
+    
+    def handle_request(self, channel, raw):
+        """Decode one incoming frame and hand it to the command dispatcher"""
+        try:
+            request = wire.decode_frame(raw) if isinstance(raw, bytes) else json.loads(raw)
+            if not isinstance(request, dict):
+                raise ValueError("expected an object")
+        except Exception as e:
+            self.send_to(channel, {"type": "response", "id": None, "ok": False, "error": f"Bad request: {e}"})
+            return
+        if request.get("type") == "subscribe":
+            self.handle_subscribe(channel, request)
+            return
+        try:
+            self.commands.dispatch(channel, request, lambda message: self.send_to(channel, message))
+        except Exception as e:
+            # A malformed request must not take the connection down with it
+            self.send_to(channel, {"type": "response", "id": None, "ok": False, "error": f"Bad request: {e}"})
+    
+    def handle_subscribe(self, channel, request):
+        """{"type": "subscribe", "topics": [...] or {topic: {"max_rate": n}}}, see topics.py"""
+        try:
+            intervals = parse_topics(request.get("topics", list(TOPICS)))
+        except (ValueError, TypeError) as e:
+            self.send_to(channel, {"type": "subscribed", "ok": False, "error": str(e),
+                                   "topics": channel.subscription.as_dict()})
+            return
+        self.subscribe(channel, intervals)
+        self.send_to(channel, {"type": "subscribed", "ok": True, "topics": channel.subscription.as_dict()})
     
     async def handle_client(self, websocket):
-        """Handle WebSocket client connections - one-way streaming only"""
-        await self.register_client(websocket)
+        """Handle a WebSocket client: broadcasts go out, command requests come in"""
+        channel = await self.register_client(websocket)
         try:
-            # Keep connection alive, but don't process any incoming messages
-            await websocket.wait_closed()
+            async for raw in websocket:
+                self.handle_request(channel, raw)
         except websockets.exceptions.ConnectionClosed:
             pass
         finally:
+            self.commands.cancel_client(channel)
             await self.unregister_client(websocket)
     
-    async def start_websocket_server(self, host="localhost", port=8765):
-        """Start the WebSocket server"""
-        self.server = await websockets.serve(self.handle_client, host, port)
-        print(f"🌐 WebSocket server started on ws://{host}:{port}")
+    def start_session(self):
+        """Bind the time streams, cue scheduler and stats task to the running loop"""
+        self.loop = asyncio.get_running_loop()
+        self.time_stream.loop = self.loop
+        self.anchor_stream.loop = self.loop
+        self.cue_scheduler.loop = self.loop
+        self.clips.loop = self.loop
+        self.cue_scheduler.resync()
+        if self.stats_interval:
+            self.stats_task = asyncio.create_task(self.broadcast_stats_periodically())
+    
+    async def start_websocket_server(self, host="localhost", port=8765, local_path=None, local_framing="websocket",
+                                     origins=()):
+        """
+        Start the WebSocket server.
+        local_path: also listen on this Unix socket path (a \\\\.\\pipe\\ name on Windows)
+        local_framing: "websocket" keeps the WebSocket protocol on the Unix socket;
+            "framed" uses length-prefixed frames, which is what named pipes always use
+        origins: browser origins allowed to connect besides clients sending none, see open_listeners
+        """
+        self.start_session()
+        self.server, self.local_server = await open_listeners(self.handle_client, host, port, local_path,
+                                                              local_framing, origins)
+        if self.metrics_port:
+            self.metrics_server = await serve_metrics(self.metrics, host, self.metrics_port, self.metrics_gauges)
+            logger.info("📊 Metrics on http://%s:%s/metrics", host, self.metrics_port)
         return self.server
     
     def signal_handler(self, sig, frame):
         """Handle Ctrl+C gracefully"""
-        print("\n🛑 Shutting down...")
+        logger.info("\n🛑 Shutting down...")
         self.cleanup()
+        shutdown_logging()
         sys.exit(0)
     
     def cleanup(self):
         """Clean up resources"""
         self.player_active = False
         self.stop_monitoring()
+        if self.owns_pools:
+            self.workers.shutdown(wait=False, cancel_futures=True)
+            self.clips.stop()
+        if self.stats_task:
+            self.stats_task.cancel()
+        if self.metrics_server:
+            self.metrics_server.close()
+        if self.local_server:
+            self.local_server.close()
+        if self.pcm_tap:
+            self.pcm_tap.stop()
         
         try:
-            if hasattr(self.player, 'quit'):
+            if self.attached:
+                self.player.terminate()  # leave the user's mpv running
+            elif hasattr(self.player, 'quit'):
                 self.player.quit()
             elif hasattr(self.player, 'terminate'):
                 self.player.terminate()
         except:
             pass
 
+async def open_listeners(handler, host="localhost", port=8765, local_path=None, local_framing="websocket",
+                         origins=()):
+    """
+    Serve handler(websocket) on ws://host:port and, with local_path, on a Unix
+    socket or named pipe too (see start_websocket_server). Returns (server, local_server).
+
+    Browsers send an Origin header with every WebSocket handshake; the Electron
+    main process and scripts send none. Only those, plus the listed origins,
+    may connect over TCP, so a web page open in the user's browser cannot
+    drive the player through ws://localhost.
+    """
+    # Clients that request no subprotocol still connect and get JSON
+    server = await websockets.serve(handler, host, port, subprotocols=wire.SUBPROTOCOLS,
+                                   select_subprotocol=wire.select_subprotocol, origins=[None, *origins])
+    local_server = None
+    if local_path:
+        framed = local_framing == "framed" or sys.platform == "win32"
+        if framed:
+            local_server = await serve_framed(handler, local_path, wire.SUBPROTOCOLS)
+        else:
+            remove_stale_socket(local_path)
+            local_server = await websockets.unix_serve(handler, local_path, subprotocols=wire.SUBPROTOCOLS,
+                                                      select_subprotocol=wire.select_subprotocol)
+        logger.info("🔌 Local clients on %s (%s)", local_path, "framed" if framed else "websocket")
+    logger.info("🌐 WebSocket server started on ws://%s:%s", host, port)
+    return server, local_server
+
 async def main():
     if len(sys.argv) < 2:
-        print("Usage: python server.py <video_file_path> [host] [port]")
+        print("Usage: python server.py <video_file_path|--attach=IPC_SOCKET> [host] [port] [--local=PATH [--framed]] "
+              "[--origins=URL,...]")
         print("Example: python server.py video.mp4")
         print("Example: python server.py video.mp4 localhost 8765")
+        print("Example: python server.py --attach=/tmp/mpvsocket  (mpv --input-ipc-server=/tmp/mpvsocket ...)")
+        print("Example: python server.py video.mp4 --local=/tmp/mpvmod.sock  (ws+unix:///tmp/mpvmod.sock)")
         sys.exit(1)
     
-    filepath = sys.argv[1]
-    host = sys.argv[2] if len(sys.argv) > 2 else "localhost"
-    port = int(sys.argv[3]) if len(sys.argv) > 3 else 8765
+    options = {arg.partition("=")[0]: arg.partition("=")[2] for arg in sys.argv[1:] if arg.startswith("--")}
+    ipc_socket = options.get("--attach") or None
+    # With --attach there is no file argument; host and port come first
+    positional = [None] * bool(ipc_socket) + [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    filepath = positional[0] if positional else None
+    if filepath is None and ipc_socket is None:
+        print("❌ Give a video file or --attach=IPC_SOCKET")
+        sys.exit(1)
+    local_path = options.get("--local") or None
+    local_framing = "framed" if "--framed" in options else "websocket"
+    origins = [origin for origin in options.get("--origins", "").split(",") if origin]
+    host = positional[1] if len(positional) > 1 else "localhost"
+    port = int(positional[2]) if len(positional) > 2 else 8765
     
-    # Create the MPV WebSocket server
-    server = MPVWebSocketServer(poll_interval=0.208)
+    # Create the MPV WebSocket server; it also hosts the capture tools
+    server = MPVWebSocketServer(poll_interval=0.208, ipc_socket=ipc_socket)
+    for handler in default_capture_handlers():
+        server.add_capture_handler(handler)
     
     # Start monitoring
     server.start_monitoring()
     
-    # Load the video file
-    if not server.load_file(filepath):
+    # Load the video file, unless the attached mpv already has one
+    if filepath is None:
+        print(f"✅ Attached to mpv at {ipc_socket}")
+    elif not server.load_file(filepath):
         print("❌ Failed to load video file")
         sys.exit(1)
-    
-    print("✅ Video loaded successfully")
+    else:
+        print("✅ Video loaded successfully")
     print(f"\n🎮 WebSocket Server Info:")
     print(f"   URL: ws://{host}:{port}")
-    print(f"   Video: {Path(filepath).name}")
+    print(f"   Video: {Path(filepath).name if filepath else server.get_filename()}")
     print(f"\n💡 Usage:")
     print(f"   - Connect to ws://{host}:{port} to receive live MPV data stream")
-    print(f"   - One-way communication: Server → Client only")
+    print(f"   - Send {{\"type\": \"request\", \"id\": 1, \"command\": \"pause\"}} to control MPV")
+    print(f"   - Send {{\"type\": \"subscribe\", \"topics\": [\"captures\", \"player\"]}} to receive only those topics")
     print(f"   - Postman: Use WebSocket request to ws://{host}:{port}")
     print(f"   - Control MPV directly via the player window")
+    for handler in server.capture_handlers.values():
+        keys = ", ".join(f"{key.upper()} = {action}" for key, action in handler.hotkeys.items())
+        commands = ", ".join(handler.commands)
+        print(f"   - {handler.name}: {keys or 'no hotkey'} (commands: {commands})")
     print(f"   - Ctrl+C: Quit")
     
     try:
@@ -353,7 +972,7 @@ async def main():
         server.loop = asyncio.get_running_loop()
         
         # Start WebSocket server
-        ws_server = await server.start_websocket_server(host, port)
+        ws_server = await server.start_websocket_server(host, port, local_path, local_framing, origins)
         
         # Keep running until player closes or Ctrl+C
         while server.player_active:
@@ -368,6 +987,7 @@ async def main():
         if server.server:
             server.server.close()
             await server.server.wait_closed()
+        shutdown_logging()
 
 if __name__ == "__main__":
     # Install required packages: pip install websockets python-mpv
@@ -0,0 +1,321 @@
+import asyncio
+import json
+import os
+import signal
+import stat
+import sys
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from pathlib import Path
+
+import websockets
+
+from audio_clips import ClipEncoder
+from captures import default_capture_handlers
+from client_channel import ClientChannel
+from commands import CommandDispatcher, CommandError
+from log import ensure_logging, get_logger, shutdown_logging
+from server import MPVWebSocketServer, open_listeners
+import wire
+
+"""
+Several independent players behind one WebSocket listener.
+
+Each session is a full MPVWebSocketServer with its own mpv, state snapshot,
+subtitle timeline, capture handlers, event log and clients. The SessionServer
+owns the listener and the things worth sharing: the capture worker pool and
+the ClipEncoder (so the clip job limit holds across sessions); the media info
+and keyframe index caches are per-process already.
+
+Clients pick a session when connecting, and get the first session without one:
+
+    ws://localhost:8765/?session=<id>
+
+Sessions come and go without a restart, through commands any client can send:
+
+    create_session   args: id (optional), path, attach (mpv IPC socket), player_options
+                     (only the options in SESSION_PLAYER_OPTIONS)
+    destroy_session  args: id
+    list_sessions
+
+A client asking for a session that does not exist (or connecting while there
+are none) lands in a lobby: its welcome lists the sessions and only the
+commands above work there.
+
+Steps to use:
+
+- python sessions.py [video ...] [--host=localhost] [--port=8765] [--local=PATH] [--origins=URL,...]
+- every video given starts as a session; the first one is the default
+"""
+
+logger = get_logger("sessions")
+
+SESSION_COMMANDS = ("create_session", "destroy_session", "list_sessions")
+
+# The mpv options create_session takes from clients: option -> allowed values,
+# or the accepted type. Display and playback settings only; nothing that loads
+# scripts or config, opens sockets or writes files.
+SESSION_PLAYER_OPTIONS = {
+    "vo": ["gpu", "gpu-next", "null"],
+    "hwdec": ["no", "auto", "auto-safe", "auto-copy"],
+    "fullscreen": bool,
+    "pause": bool,
+    "mute": bool,
+    "volume": (int, float),
+    "speed": (int, float),
+    "start": (int, float),
+    "loop_file": ["no", "inf"],
+    "sub_visibility": bool,
+    "autofit": str,
+    "geometry": str,
+}
+
+
+def session_player_options(options):
+    """Client-supplied player_options checked against SESSION_PLAYER_OPTIONS. Raises CommandError."""
+    if not isinstance(options, dict):
+        raise CommandError("player_options must be an object")
+    checked = {}
+    for name, value in options.items():
+        option = str(name).replace("-", "_")
+        allowed = SESSION_PLAYER_OPTIONS.get(option)
+        if allowed is None:
+            raise CommandError(f"Player option {name} is not allowed (allowed: {', '.join(SESSION_PLAYER_OPTIONS)})")
+        valid = value in allowed if isinstance(allowed, list) else isinstance(value, allowed)
+        if not valid:
+            raise CommandError(f"Bad value for player option {name}: {value!r}")
+        checked[option] = value
+    return checked
+
+
+def check_ipc_socket(path):
+    """A client-supplied attach target: must name a Unix socket or a Windows named pipe. Raises CommandError."""
+    if not isinstance(path, str):
+        raise CommandError("attach must be a socket path")
+    if sys.platform == "win32":
+        if not path.startswith("\\\\.\\pipe\\"):
+            raise CommandError(f"{path} is not a named pipe")
+        return path
+    try:
+        if stat.S_ISSOCK(os.stat(path).st_mode):
+            return path
+    except OSError:
+        pass
+    raise CommandError(f"{path} is not a socket")
+
+
+class SessionServer:
+    def __init__(self, capture_workers=4, clip_jobs=None, clip_mode="encode", max_sessions=8,
+                 handler_factory=default_capture_handlers, session_options=None):
+        """
+        capture_workers, clip_jobs, clip_mode: the pools shared by all sessions,
+            see MPVWebSocketServer
+        max_sessions: create_session fails beyond this many players
+        handler_factory: returns fresh capture handlers for each new session
+        session_options: MPVWebSocketServer keyword arguments for every session
+        """
+        ensure_logging()
+        self.workers = ThreadPoolExecutor(max_workers=capture_workers, thread_name_prefix="capture")
+        self.clips = ClipEncoder(max_jobs=clip_jobs, mode=clip_mode)
+        self.max_sessions = max_sessions
+        self.handler_factory = handler_factory
+        self.session_options = session_options or {}
+        self.sessions = {}  # id -> MPVWebSocketServer
+        self.pending_sessions = set()  # ids whose player is still being created
+        self.default_session = None
+        self.commands = CommandDispatcher()  # lobby connections
+        self.register_commands(self.commands)
+        self.server = None
+        self.local_server = None
+        self.loop = None
+        signal.signal(signal.SIGINT, self.signal_handler)
+
+    def register_commands(self, commands):
+        commands.register("create_session", self.cmd_create_session)
+        commands.register("destroy_session", self.cmd_destroy_session)
+        commands.register("list_sessions", self.cmd_list_sessions)
+
+    async def create_session(self, session_id=None, path=None, ipc_socket=None, **options):
+        """Start a player session, optionally loading path. Returns the MPVWebSocketServer."""
+        session_id = session_id or uuid.uuid4().hex[:8]
+        if session_id in self.sessions or session_id in self.pending_sessions:
+            raise CommandError(f"Session {session_id} already exists")
+        if len(self.sessions) + len(self.pending_sessions) >= self.max_sessions:
+            raise CommandError(f"Already running {self.max_sessions} sessions")
+
+        # Hold the id and the slot while the player is created, so concurrent
+        # create_session requests cannot both pass the checks above
+        self.pending_sessions.add(session_id)
+        try:
+            # Creating the player (a libmpv window, or an IPC connect) blocks; keep it off the loop
+            session = await asyncio.get_running_loop().run_in_executor(None, partial(
+                MPVWebSocketServer, session_id=session_id, workers=self.workers, clips=self.clips,
+                handle_signals=False, ipc_socket=ipc_socket, **{**self.session_options, **options}
+            ))
+            try:
+                for handler in self.handler_factory():
+                    session.add_capture_handler(handler)
+                self.register_commands(session.commands)
+                session.start_session()
+                session.start_monitoring()
+            except Exception:
+                session.cleanup()  # the player and its event thread exist already
+                raise
+            self.sessions[session_id] = session
+        finally:
+            self.pending_sessions.discard(session_id)
+        if self.default_session is None:
+            self.default_session = session_id
+        logger.info("🆕 Session %s started (%d running)", session_id, len(self.sessions))
+
+        if path and not session.load_file(path):
+            await self.destroy_session(session_id)
+            raise CommandError(f"Failed to load {path}")
+        return session
+
+    async def destroy_session(self, session_id):
+        """Disconnect a session's clients and close its player"""
+        session = self.sessions.pop(session_id, None)
+        if session is None:
+            raise CommandError(f"No session {session_id}")
+        if self.default_session == session_id:
+            self.default_session = next(iter(self.sessions), None)
+        for channel in list(session.clients.values()):
+            channel.close()
+        session.cleanup()
+        logger.info("🗑️  Session %s closed (%d running)", session_id, len(self.sessions))
+
+    def session_info(self, session):
+        return {
+            "id": session.session_id,
+            "default": session.session_id == self.default_session,
+            "player_active": session.player_active,
+            "filename": session.get_filename() if session.player_active else None,
+            "clients": len(session.clients),
+        }
+
+    def list_sessions(self):
+        return [self.session_info(session) for session in self.sessions.values()]
+
+    async def cmd_create_session(self, args, progress):
+        """args: id, path, attach (mpv IPC socket), player_options (all optional, see SESSION_PLAYER_OPTIONS)"""
+        options = {}
+        if args.get("player_options"):
+            options["player_options"] = session_player_options(args["player_options"])
+        attach = check_ipc_socket(args["attach"]) if args.get("attach") else None
+        session = await self.create_session(args.get("id"), args.get("path"), attach, **options)
+        return self.session_info(session)
+
+    async def cmd_destroy_session(self, args, progress):
+        """args: id"""
+        if not args.get("id"):
+            raise CommandError("destroy_session needs an id")
+        await self.destroy_session(args["id"])
+        return {"id": args["id"], "sessions": self.list_sessions()}
+
+    async def cmd_list_sessions(self, args, progress):
+        return {"sessions": self.list_sessions()}
+
+    async def handle_client(self, websocket):
+        """Route a connection to the session named in ?session=, or to the lobby"""
+        requested = (wire.connection_query(websocket).get("session") or [None])[0]
+        session = self.sessions.get(requested or self.default_session)
+        if session is None:
+            await self.handle_lobby(websocket, requested)
+        else:
+            await session.handle_client(websocket)
+
+    async def handle_lobby(self, websocket, requested):
+        channel = ClientChannel(websocket)  # JSON only; the welcome is JSON for every client anyway
+
+        def send(message):
+            channel.offer(message["type"], json.dumps(message))
+
+        send({
+            "type": "welcome",
+            "content": f"No session {requested}" if requested else "No sessions running",
+            "session": None,
+            "sessions": self.list_sessions(),
+            "commands": list(SESSION_COMMANDS),
+        })
+        channel.start()
+        try:
+            async for raw in websocket:
+                try:
+                    request = wire.decode_frame(raw) if isinstance(raw, bytes) else json.loads(raw)
+                    if not isinstance(request, dict):
+                        raise ValueError("expected an object")
+                except Exception as e:
+                    send({"type": "response", "id": None, "ok": False, "error": f"Bad request: {e}"})
+                    continue
+                try:
+                    self.commands.dispatch(channel, request, send)
+                except Exception as e:
+                    send({"type": "response", "id": None, "ok": False, "error": f"Bad request: {e}"})
+        except websockets.exceptions.ConnectionClosed:
+            pass
+        finally:
+            self.commands.cancel_client(channel)
+            channel.close()
+
+    async def prune_closed_sessions(self, interval=1.0):
+        """Drop sessions whose player window was closed"""
+        while True:
+            await asyncio.sleep(interval)
+            for session_id, session in list(self.sessions.items()):
+                if not session.player_active and session_id in self.sessions:
+                    await self.destroy_session(session_id)
+
+    async def start(self, host="localhost", port=8765, local_path=None, local_framing="websocket", origins=()):
+        self.loop = asyncio.get_running_loop()
+        self.clips.loop = self.loop
+        self.server, self.local_server = await open_listeners(self.handle_client, host, port, local_path,
+                                                              local_framing, origins)
+        return self.server
+
+    def signal_handler(self, sig, frame):
+        """Handle Ctrl+C gracefully"""
+        logger.info("\n🛑 Shutting down...")
+        self.cleanup()
+        shutdown_logging()
+        sys.exit(0)
+
+    def cleanup(self):
+        for session in list(self.sessions.values()):
+            session.cleanup()
+        self.sessions.clear()
+        self.workers.shutdown(wait=False, cancel_futures=True)
+        self.clips.stop()
+        if self.local_server:
+            self.local_server.close()
+
+
+async def main():
+    options = {arg.partition("=")[0]: arg.partition("=")[2] for arg in sys.argv[1:] if arg.startswith("--")}
+    videos = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    host = options.get("--host") or "localhost"
+    port = int(options.get("--port") or 8765)
+
+    sessions = SessionServer()
+    try:
+        await sessions.start(host, port, options.get("--local") or None,
+                             "framed" if "--framed" in options else "websocket",
+                             [origin for origin in options.get("--origins", "").split(",") if origin])
+        for video in videos:
+            session = await sessions.create_session(path=video)
+            print(f"🎬 {Path(video).name}: ws://{host}:{port}/?session={session.session_id}")
+        print(f"\n💡 Create more with {{\"type\": \"request\", \"id\": 1, \"command\": \"create_session\", "
+              f"\"args\": {{\"path\": \"...\"}}}} on any connection")
+        print(f"   - Ctrl+C: Quit")
+        await sessions.prune_closed_sessions()
+    finally:
+        sessions.cleanup()
+        if sessions.server:
+            sessions.server.close()
+            await sessions.server.wait_closed()
+        shutdown_logging()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
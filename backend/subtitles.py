@@ -0,0 +1,157 @@
+import bisect
+import glob
+import re
+from pathlib import Path
+from typing import NamedTuple
+
+"""
+Subtitle timeline for the server.
+
+SRT files are parsed into cues sorted by start time, then cut into elementary
+segments: the spans between consecutive cue boundaries (every start and end).
+Each segment stores which cues are on screen during it, so "what is active at
+time t" is one bisect, and overlapping cues need no special handling.
+"""
+
+TIMECODE = re.compile(
+    r"(\d+):(\d{2}):(\d{2})[,.](\d{1,3})\s*-->\s*(\d+):(\d{2}):(\d{2})[,.](\d{1,3})"
+)
+TAG = re.compile(r"<[^>]*>")
+SUBTITLE_EXTENSIONS = (".srt", ".ass", ".ssa", ".vtt", ".sub")
+
+
+class Cue(NamedTuple):
+    index: int  # position in start order once in a SubtitleIndex (file order before); unique
+    number: int  # the SRT sequence number, same as the GUI's segment index; merged or edited files repeat them
+    start: float
+    end: float
+    text: str
+
+
+def _seconds(hours, minutes, seconds, millis):
+    return int(hours) * 3600 + int(minutes) * 60 + int(seconds) + int(millis.ljust(3, "0")) / 1000
+
+
+def parse_srt(content):
+    """Parse SRT text into a list of cues in file order"""
+    cues = []
+    for block in re.split(r"\n\s*\n", content.replace("\r\n", "\n").strip()):
+        lines = block.strip().split("\n")
+        for i, line in enumerate(lines):
+            match = TIMECODE.search(line)
+            if match:
+                break
+        else:
+            continue
+
+        try:
+            number = int(lines[i - 1]) if i > 0 else len(cues) + 1
+        except ValueError:
+            number = len(cues) + 1
+
+        start = _seconds(*match.group(1, 2, 3, 4))
+        end = _seconds(*match.group(5, 6, 7, 8))
+        text = TAG.sub("", "\n".join(lines[i + 1:])).strip()
+        if end > start:
+            cues.append(Cue(len(cues), number, start, end, text))
+    return cues
+
+
+def load_srt(path):
+    with open(path, encoding="utf-8-sig", errors="replace") as f:
+        return parse_srt(f.read())
+
+
+def find_sidecar_subtitles(video_path):
+    """movie.srt, or movie.<lang>.srt, next to movie.mkv"""
+    video_path = Path(video_path)
+    exact = video_path.with_suffix(".srt")
+    if exact.exists():
+        return exact
+    candidates = sorted(video_path.parent.glob(f"{glob.escape(video_path.stem)}.*.srt"))
+    return candidates[0] if candidates else None
+
+
+def find_external_subtitles(video_path, extensions=SUBTITLE_EXTENSIONS):
+    """Every movie.<ext> and movie.<lang>.<ext> subtitle file next to movie.mkv, sorted"""
+    video_path = Path(video_path)
+    stem = glob.escape(video_path.stem)
+    found = set()
+    for extension in extensions:
+        found.update(video_path.parent.glob(f"{stem}{extension}"))
+        found.update(video_path.parent.glob(f"{stem}.*{extension}"))
+    return sorted(found)
+
+
+class SubtitleIndex:
+    def __init__(self, cues):
+        # Keyed by position, not SRT number: numbers are not guaranteed unique
+        ordered = sorted(cues, key=lambda cue: (cue.start, cue.end))
+        self.cues = [cue._replace(index=i) for i, cue in enumerate(ordered)]
+
+        boundaries = sorted({cue.start for cue in self.cues} | {cue.end for cue in self.cues})
+        starts_at = {}
+        ends_at = {}
+        for cue in self.cues:
+            starts_at.setdefault(cue.start, []).append(cue.index)
+            ends_at.setdefault(cue.end, []).append(cue.index)
+
+        # Sweep the boundaries once; segment i covers [boundaries[i], boundaries[i + 1])
+        self.boundaries = boundaries
+        self.segments = []
+        active = []
+        for boundary in boundaries:
+            ended = ends_at.get(boundary)
+            if ended:
+                active = [index for index in active if index not in ended]
+            active.extend(starts_at.get(boundary, ()))
+            self.segments.append(tuple(active))
+
+    def __len__(self):
+        return len(self.cues)
+
+    def segment_at(self, time_pos):
+        """(segment start, segment end, active cue indices) for the segment containing time_pos"""
+        i = bisect.bisect_right(self.boundaries, time_pos) - 1
+        if i < 0:
+            end = self.boundaries[0] if self.boundaries else float("inf")
+            return float("-inf"), end, ()
+        end = self.boundaries[i + 1] if i + 1 < len(self.boundaries) else float("inf")
+        return self.boundaries[i], end, self.segments[i]
+
+    def active_at(self, time_pos):
+        """Indices of the cues on screen at time_pos, in start order"""
+        return self.segment_at(time_pos)[2]
+
+    def next_boundary(self, time_pos):
+        """The first cue start or end strictly after time_pos, or None"""
+        i = bisect.bisect_right(self.boundaries, time_pos)
+        return self.boundaries[i] if i < len(self.boundaries) else None
+
+
+class CueTracker:
+    """Turns a stream of positions into cue enter/exit transitions"""
+
+    def __init__(self, index):
+        self.index = index
+        self.active = ()
+        self.segment_start = float("inf")
+        self.segment_end = float("-inf")
+
+    def update(self, time_pos):
+        """Returns (entered, exited) cue indices, or None if nothing changed"""
+        if time_pos is None:
+            active = ()
+            self.segment_start, self.segment_end = float("inf"), float("-inf")
+        elif self.segment_start <= time_pos < self.segment_end:
+            # Still inside the same segment; the common case costs two comparisons
+            return None
+        else:
+            self.segment_start, self.segment_end, active = self.index.segment_at(time_pos)
+
+        if active == self.active:
+            return None
+        entered = [index for index in active if index not in self.active]
+        exited = [index for index in self.active if index not in active]
+        self.active = active
+        return entered, exited
@@ -0,0 +1,97 @@
+import threading
+import time
+
+"""
+Event-driven time streaming for the WebSocket server.
+
+mpv already tells us every time time-pos changes (once per frame while playing,
+never while paused), so instead of polling we coalesce those observer samples
+and emit at most `max_emit_rate` updates per second.
+"""
+
+
+class TimeStream:
+    def __init__(self, emit, coalesce_window=0.0, max_emit_rate=30.0):
+        """
+        emit: called with the latest time_pos whenever an update should go out
+        coalesce_window: seconds to hold the first sample after a quiet period,
+            so a burst (e.g. a seek) collapses into one update
+        max_emit_rate: upper bound on updates per second, 0 for unlimited
+        """
+        self.emit = emit
+        self.coalesce_window = coalesce_window
+        self.min_interval = 1.0 / max_emit_rate if max_emit_rate else 0.0
+        self.loop = None  # asyncio loop used for trailing flushes
+        self.lock = threading.Lock()
+        self.active = False
+        self.pending = None
+        self.has_pending = False
+        self.flush_armed = False
+        self.generation = 0  # bumped on every emit; stale flushes compare against it
+        self.last_emit = 0.0
+        self.urgent_next = False
+
+    def start(self):
+        with self.lock:
+            self.active = True
+            self.generation += 1
+
+    def stop(self):
+        with self.lock:
+            self.active = False
+            self.flush_armed = False
+            self.has_pending = False
+            self.generation += 1
+
+    def mark_urgent(self):
+        """Emit the next sample immediately, bypassing coalescing (used on seek)"""
+        with self.lock:
+            self.urgent_next = True
+
+    def push(self, time_pos, urgent=False):
+        """Feed a new sample. Safe to call from mpv's event thread."""
+        now = time.monotonic()
+        with self.lock:
+            if not self.active:
+                return
+            self.pending = time_pos
+            self.has_pending = True
+
+            if urgent or self.urgent_next:
+                self.urgent_next = False
+                value = self._take_locked(now)
+            elif self.flush_armed:
+                # The armed flush will pick up this newer sample
+                return
+            else:
+                delay = max(self.coalesce_window, self.last_emit + self.min_interval - now)
+                if delay > 0:
+                    if self.loop is None:
+                        # Nothing to flush on yet; a later sample will carry the update
+                        return
+                    self.flush_armed = True
+                    self.loop.call_soon_threadsafe(self._arm_flush, delay, self.generation)
+                    return
+                value = self._take_locked(now)
+
+        self.emit(value)
+
+    def _take_locked(self, now):
+        value = self.pending
+        self.pending = None
+        self.has_pending = False
+        self.flush_armed = False
+        self.last_emit = now
+        self.generation += 1
+        return value
+
+    def _arm_flush(self, delay, generation):
+        # Runs on the asyncio loop
+        self.loop.call_later(delay, self._flush, generation)
+
+    def _flush(self, generation):
+        with self.lock:
+            if generation != self.generation or not self.has_pending:
+                return
+            value = self._take_locked(time.monotonic())
+        self.emit(value)
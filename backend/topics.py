@@ -0,0 +1,118 @@
+from wire import connection_query
+
+"""
+Topic subscriptions for broadcasts.
+
+Every broadcast message type belongs to one topic:
+
+    time      time_update (stream, poll and anchor modes)
+    cues      cue_enter, cue_exit
+    player    event, status, media_info
+    captures  capture
+    stats     stats
+    server    info, error, anything else
+
+A client gets every topic until it says otherwise, either when connecting:
+
+    ws://localhost:8765/?topics=time:10,captures
+
+or at any time with a subscribe message, answered with "subscribed":
+
+    {"type": "subscribe", "topics": {"time": {"max_rate": 10}, "captures": {}}}
+    {"type": "subscribe", "topics": ["captures", "player"]}
+
+max_rate caps the time or stats topic's messages per second for this client.
+Messages inside the interval are held back, each replacing the last, and the
+latest goes out when the interval is up, so a client never keeps a stale
+position or stats after the stream pauses. Clock anchors are state changes and
+always go out at once. Other topics carry events that cannot be thinned out
+and take no max_rate.
+
+The server keeps a client set per topic and does not serialize a message whose
+topic nobody is subscribed to.
+"""
+
+TOPICS = ("time", "cues", "player", "captures", "stats", "server")
+RATE_LIMITED_TOPICS = ("time", "stats")
+TOPIC_OF = {
+    "time_update": "time",
+    "cue_enter": "cues",
+    "cue_exit": "cues",
+    "event": "player",
+    "status": "player",
+    "media_info": "player",
+    "capture": "captures",
+    "stats": "stats",
+}
+
+
+def topic_of(msg_type):
+    return TOPIC_OF.get(msg_type, "server")
+
+
+def parse_topics(spec):
+    """
+    Topic -> minimum seconds between messages (0 for no limit), from a list of
+    topic names or a dict of topic -> {"max_rate": n} / None. Raises ValueError.
+    """
+    if isinstance(spec, (list, tuple)):
+        spec = {topic: None for topic in spec}
+    if not isinstance(spec, dict):
+        raise ValueError("topics must be a list of names or an object")
+    intervals = {}
+    for topic, options in spec.items():
+        if topic not in TOPICS:
+            raise ValueError(f"Unknown topic: {topic} (known: {', '.join(TOPICS)})")
+        max_rate = (options or {}).get("max_rate") if isinstance(options, dict) else options
+        if max_rate is not None and topic not in RATE_LIMITED_TOPICS:
+            raise ValueError(f"max_rate only applies to {', '.join(RATE_LIMITED_TOPICS)}, not {topic}")
+        if max_rate is not None and float(max_rate) <= 0:
+            raise ValueError(f"max_rate for {topic} must be positive")
+        intervals[topic] = 1 / float(max_rate) if max_rate else 0.0
+    return intervals
+
+
+def requested_topics(websocket):
+    """parse_topics() of the connection URL's ?topics=name[:max_rate],... or None if absent"""
+    values = connection_query(websocket).get("topics")
+    if not values:
+        return None
+    spec = {}
+    for item in values[0].split(","):
+        name, _, rate = item.strip().partition(":")
+        if name:
+            spec[name] = {"max_rate": float(rate)} if rate else None
+    return parse_topics(spec)
+
+
+class Subscription:
+    def __init__(self, intervals=None):
+        """intervals: topic -> minimum seconds between messages, default every topic unlimited"""
+        self.intervals = dict.fromkeys(TOPICS, 0.0) if intervals is None else intervals
+        self.last_sent = {}  # topic -> time.monotonic() of the last message let through
+        self.pending = {}  # topic -> (msg_type, payload) held back until the interval is up
+
+    def delay(self, topic, now):
+        """Seconds before a message on topic may go to this client (0 for now), None if not subscribed"""
+        interval = self.intervals.get(topic)
+        if interval is None:
+            return None
+        if not interval:
+            return 0.0
+        return max(0.0, self.last_sent.get(topic, float("-inf")) + interval - now)
+
+    def sent(self, topic, now):
+        """Count a message on topic as sent; it supersedes any held back one"""
+        if self.intervals.get(topic):
+            self.last_sent[topic] = now
+            self.pending.pop(topic, None)
+
+    def defer(self, topic, msg_type, payload):
+        """Hold back the latest message on topic. True if none was held yet, so a flush needs scheduling."""
+        first = topic not in self.pending
+        self.pending[topic] = (msg_type, payload)
+        return first
+
+    def as_dict(self):
+        return {topic: {"max_rate": round(1 / interval, 3) if interval else None}
+                for topic, interval in self.intervals.items()}
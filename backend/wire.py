@@ -0,0 +1,114 @@
+import json
+import struct
+from urllib.parse import parse_qs, urlsplit
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+"""
+Wire formats for the WebSocket server.
+
+JSON text frames stay the default. A client that asks for the "mpvmod.bin"
+subprotocol during the handshake gets binary frames instead:
+
+    time_update:  <B d d B>  type=0x01, media time (s), server monotonic (s), paused
+    clock anchor: <B d d d B d>  type=0x04, media time, anchor monotonic, speed,
+                  paused, server monotonic at send (see clock_sync.py)
+    other types:  0x02 + MessagePack body, or 0x03 + JSON body if msgpack is not installed
+
+The welcome message is always a JSON text frame, so every client can read the
+negotiated protocol from it before the first binary frame arrives.
+"""
+
+PROTOCOL_JSON = "mpvmod.json"
+PROTOCOL_BINARY = "mpvmod.bin"
+SUBPROTOCOLS = [PROTOCOL_BINARY, PROTOCOL_JSON]
+
+FRAME_TIME_UPDATE = 0x01
+FRAME_MSGPACK = 0x02
+FRAME_JSON = 0x03
+FRAME_ANCHOR = 0x04
+
+TIME_UPDATE_FRAME = struct.Struct("<BddB")
+ANCHOR_FRAME = struct.Struct("<BdddBd")
+
+
+def negotiated_protocol(websocket):
+    """The client's protocol; anything but the binary subprotocol means JSON"""
+    if getattr(websocket, "subprotocol", None) == PROTOCOL_BINARY:
+        return PROTOCOL_BINARY
+    return PROTOCOL_JSON
+
+
+def select_subprotocol(first, second):
+    """
+    Subprotocol choice for websockets.serve(select_subprotocol=...): the
+    binary one if offered, else JSON if offered, else none at all, so clients
+    that offer nothing still connect (websockets >= 14 answers them with a 400
+    when only subprotocols= is given). The new API calls this with
+    (connection, offered), the legacy one with (offered, available).
+    """
+    offered = first if isinstance(first, (list, tuple)) else second
+    for protocol in SUBPROTOCOLS:
+        if protocol in offered:
+            return protocol
+    return None
+
+
+def connection_query(websocket):
+    """The connection URL's query string as parse_qs() lists (new and legacy websockets APIs)"""
+    request = getattr(websocket, "request", None)
+    path = getattr(request, "path", None) or getattr(websocket, "path", "") or ""
+    return parse_qs(urlsplit(path).query)
+
+
+def encode_time_update(time_pos, monotonic, paused):
+    return TIME_UPDATE_FRAME.pack(FRAME_TIME_UPDATE, time_pos, monotonic, 1 if paused else 0)
+
+
+def encode_anchor(anchor, sent_monotonic):
+    return ANCHOR_FRAME.pack(
+        FRAME_ANCHOR, anchor.media_time, anchor.server_monotonic, anchor.speed,
+        1 if anchor.paused else 0, sent_monotonic
+    )
+
+
+def encode_message(message):
+    """Binary frame for a low-frequency message dict"""
+    if msgpack is not None:
+        return bytes((FRAME_MSGPACK,)) + msgpack.packb(message, use_bin_type=True)
+    return bytes((FRAME_JSON,)) + json.dumps(message).encode("utf-8")
+
+
+def decode_frame(frame):
+    """Reference decoder for clients: binary frame -> message dict"""
+    frame_type = frame[0]
+    if frame_type == FRAME_TIME_UPDATE:
+        _, time_pos, monotonic, paused = TIME_UPDATE_FRAME.unpack(frame)
+        return {
+            "type": "time_update",
+            "time_pos": time_pos,
+            "monotonic": monotonic,
+            "paused": bool(paused),
+        }
+    if frame_type == FRAME_ANCHOR:
+        _, media_time, anchor_monotonic, speed, paused, sent_monotonic = ANCHOR_FRAME.unpack(frame)
+        return {
+            "type": "time_update",
+            "anchor": {
+                "media_time": media_time,
+                "server_monotonic": anchor_monotonic,
+                "speed": speed,
+                "paused": bool(paused),
+            },
+            "server_monotonic": sent_monotonic,
+        }
+    if frame_type == FRAME_MSGPACK:
+        if msgpack is None:
+            raise ValueError("MessagePack frame received but msgpack is not installed")
+        return msgpack.unpackb(frame[1:], raw=False)
+    if frame_type == FRAME_JSON:
+        return json.loads(frame[1:].decode("utf-8"))
+    raise ValueError(f"Unknown frame type: {frame_type:#x}")
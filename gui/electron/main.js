@@ -16,6 +16,10 @@ const isDev = process.argv.includes('--dev') || !app.isPackaged
 
 let mpvWS
 let mainWindow; 
+// Last broadcast sequence number seen and the server run it belongs to, so a
+// reconnect only replays what was missed (see backend/event_log.py)
+let lastSeq = null
+let serverEpoch = null
 
 function createWindow() {
     mainWindow = new BrowserWindow({
@@ -46,8 +50,21 @@ function createWindow() {
     });
 }
 
+// Set MPVMOD_SOCKET to the server's --local=PATH to skip TCP loopback (Unix only)
+const localSocket = process.env.MPVMOD_SOCKET
+// Player session to follow when the server runs several (backend/sessions.py)
+const sessionId = process.env.MPVMOD_SESSION
+
 function connectMPV() {
-    mpvWS = new WebSocket('ws://localhost:8765');
+    const query = new URLSearchParams()
+    if (sessionId) query.set('session', sessionId)
+    if (lastSeq !== null) {
+        query.set('since', lastSeq)
+        query.set('epoch', serverEpoch)
+    }
+    const resume = query.toString() ? `/?${query}` : '/'
+    const url = localSocket ? `ws+unix://${localSocket}:${resume}` : `ws://localhost:8765${resume}`
+    mpvWS = new WebSocket(url);
     
     mpvWS.on('open', () => {
         console.log('Connected to MPV server');
@@ -58,6 +75,13 @@ function connectMPV() {
         try {
             const parsed = JSON.parse(data);
             console.log(parsed.content)
+            if (parsed.type === 'welcome') {
+                // parsed.events holds the missed messages (or, with parsed.resync, the whole recent history)
+                serverEpoch = parsed.epoch
+                lastSeq = parsed.seq
+            } else if (parsed.seq !== undefined) {
+                lastSeq = Math.max(lastSeq ?? 0, parsed.seq)
+            }
             console.log(mainWindow && !mainWindow.isDestroyed(), "57ru")
             // Send to renderer
             if (mainWindow && !mainWindow.isDestroyed()) {
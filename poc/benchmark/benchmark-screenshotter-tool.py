@@ -1,10 +1,16 @@
 
 import subprocess
+import sys
+from pathlib import Path
+from time import perf_counter
 
 import subprocess
 import cv2
 import numpy as np
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "backend"))
+from frame_search import find_frame
+
 # TODO: < 20 ms response time on screenshots. < 50 ms hard cap
 
 ### Get the screenshot's alleged time from the file name
@@ -39,35 +45,16 @@ score = np.sum(diff)
 ### Compare
 
 def find_matching_frame(video_path, screenshot_path, start_time, search_range=10):
+    """
+    One ffmpeg decode of start_time +- search_range seconds, scored in one
+    vectorized pass (backend/frame_search.py). Returns the best frame's pts.
+    """
     print("in find_matching_frame")
-    best_match = None
-    best_score = float('inf')
-    
-    # Load reference screenshot
-    reference = cv2.imread(screenshot_path)
-    
-    # Search around the timestamp
-    for offset in range(-search_range, search_range + 1):
-        timestamp = start_time + offset
-        
-        # Extract frame with ffmpeg
-        subprocess.run([
-            'ffmpeg', '-ss', str(timestamp), '-i', video_path,
-            '-vframes', '1', '-y', 'temp_frame.png'
-        ], capture_output=True)
-        
-        # Compare frames
-        frame = cv2.imread('temp_frame.png')
-        if frame is not None:
-            # Calculate similarity (MSE, SSIM, etc.)
-            diff = cv2.absdiff(reference, frame)
-            score = np.sum(diff)
-            
-            if score < best_score:
-                best_score = score
-                best_match = timestamp
-    
-    return best_match
+    started = perf_counter()
+    match = find_frame(video_path, screenshot_path, start_time, window=search_range)
+    print(f"scored {match.frames} frames in {(perf_counter() - started) * 1000:.0f}ms "
+          f"(mse {match.mse:.2f}, ssim {match.ssim:.4f})")
+    return match.time
 
 """
 Script output:
@@ -80,8 +67,9 @@ HENCE the screenshot was exactly what was asked for.
 (Unless this is a false positive)
 """
 
-best = find_matching_frame(path_to_video, screenshot, time - 10, 10)
+best = find_matching_frame(path_to_video, screenshot, time, 10)
 print("BEST MATCH: ",  best)
 
 ### If not the same, get the difference in frame count, convert to ms
+print(f"Offset: {(best - time) * 1000:.1f}ms")
 
@@ -0,0 +1,73 @@
+import asyncio
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "backend"))
+
+from audio_clips import COPY, ENCODE, make_audio_clip
+
+"""
+Encode vs stream-copy audio clips (backend/audio_clips.py make_audio_clip).
+
+Generates a long synthetic source with ffmpeg's lavfi (test pattern + sine,
+AAC audio), then cuts the same clips from across the whole file in both modes,
+one at a time, and reports time per clip and the output sizes.
+
+Steps to use:
+
+- python clip_modes.py [source minutes] [clips]
+- needs ffmpeg and ffprobe on PATH
+"""
+
+CLIP_LENGTH = 6.0
+
+
+def make_source(directory, seconds):
+    source = Path(directory) / "source.mkv"
+    subprocess.run([
+        "ffmpeg", "-hide_banner", "-loglevel", "error",
+        "-f", "lavfi", "-i", f"testsrc2=size=320x180:rate=24:duration={seconds}",
+        "-f", "lavfi", "-i", f"sine=frequency=440:sample_rate=48000:duration={seconds}",
+        "-c:v", "libx264", "-preset", "ultrafast", "-c:a", "aac", "-b:a", "128k", str(source), "-y"
+    ], check=True)
+    return source
+
+
+async def run_mode(source, directory, seconds, clips, mode):
+    timings, sizes, used = [], [], set()
+    for i in range(clips):
+        t1 = (i + 0.5) * (seconds - CLIP_LENGTH) / clips
+        started = time.perf_counter()
+        path, actual, _, _ = await make_audio_clip(
+            source, t1, t1 + CLIP_LENGTH, Path(directory) / mode / f"clip{i}.mp3", mode=mode
+        )
+        timings.append(time.perf_counter() - started)
+        sizes.append(path.stat().st_size)
+        used.add(actual)
+
+    timings.sort()
+    print(f"{mode:>6}: mean {sum(timings) / clips * 1000:7.1f}ms  p50 {timings[clips // 2] * 1000:7.1f}ms  "
+          f"max {timings[-1] * 1000:7.1f}ms  avg size {sum(sizes) // clips} bytes  (used: {', '.join(sorted(used))})")
+    return sum(timings) / clips
+
+
+async def main():
+    minutes = float(sys.argv[1]) if len(sys.argv) > 1 else 60
+    clips = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    seconds = int(minutes * 60)
+    with tempfile.TemporaryDirectory() as directory:
+        print(f"Generating {minutes:g} min synthetic source...")
+        source = make_source(directory, seconds)
+        # Probe once up front so the copy timings do not include the first ffprobe
+        await make_audio_clip(source, 0, 1, Path(directory) / "warmup.mp3", mode=COPY)
+
+        encode = await run_mode(source, directory, seconds, clips, ENCODE)
+        copy = await run_mode(source, directory, seconds, clips, COPY)
+        print(f"\nstream copy is {encode / copy:.1f}x faster per clip")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
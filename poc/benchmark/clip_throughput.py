@@ -0,0 +1,71 @@
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "backend"))
+
+from audio_clips import ClipEncoder
+
+"""
+Audio clip throughput of ClipEncoder (backend/audio_clips.py).
+
+Generates a ten minute synthetic source (test pattern + sine) with ffmpeg's
+lavfi, then submits a burst of five second clips all at once, the way repeated
+hotkey presses would, and measures clips per second for 1 job at a time versus
+one per core.
+
+Steps to use:
+
+- python clip_throughput.py [clips]
+- needs ffmpeg on PATH
+"""
+
+SOURCE_DURATION = 600
+CLIP_LENGTH = 5.0
+
+
+def make_source(directory):
+    source = Path(directory) / "source.mkv"
+    subprocess.run([
+        "ffmpeg", "-hide_banner", "-loglevel", "error",
+        "-f", "lavfi", "-i", f"testsrc2=size=640x360:rate=24:duration={SOURCE_DURATION}",
+        "-f", "lavfi", "-i", f"sine=frequency=440:duration={SOURCE_DURATION}",
+        "-c:v", "libx264", "-preset", "ultrafast", "-c:a", "aac", str(source), "-y"
+    ], check=True)
+    return source
+
+
+def run_burst(source, directory, clips, max_jobs):
+    encoder = ClipEncoder(max_jobs=max_jobs)
+    started = time.perf_counter()
+    jobs = []
+    for i in range(clips):
+        t1 = (i * 17.0) % (SOURCE_DURATION - CLIP_LENGTH)
+        dest = Path(directory) / f"jobs{max_jobs}" / f"clip{i}.mp3"
+        jobs.append(encoder.submit(source, t1, t1 + CLIP_LENGTH, dest))
+    results = [job.result() for job in jobs]
+    elapsed = time.perf_counter() - started
+
+    queued = sorted(result.queued for result in results)
+    print(f"max_jobs={max_jobs:>2}: {clips} clips in {elapsed:.2f}s = {clips / elapsed:.2f} clips/s, "
+          f"longest queue wait {queued[-1]:.2f}s")
+    print(f"             {encoder.histogram.format()}")
+    return clips / elapsed
+
+
+def main():
+    clips = int(sys.argv[1]) if len(sys.argv) > 1 else 24
+    cores = os.cpu_count() or 1
+    with tempfile.TemporaryDirectory() as directory:
+        print(f"Generating {SOURCE_DURATION}s synthetic source...")
+        source = make_source(directory)
+        serial = run_burst(source, directory, clips, 1)
+        parallel = run_burst(source, directory, clips, cores)
+        print(f"\n{cores} cores: {parallel / serial:.2f}x the serial throughput")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+import random
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "backend"))
+
+from clock_sync import AnchorStream, ClockExtrapolator
+from player_state import PlayerSnapshot
+
+"""
+Drift check for the clock-anchor protocol (backend/clock_sync.py).
+
+Simulates ten minutes of playback on a virtual clock: 24 fps time-pos samples,
+a pause, a seek, a speed change and a media clock that runs 500 ppm fast. Anchors
+reach a client whose clock is offset from the server's after 1-5 ms of network
+delay, and the client's extrapolated position is compared with the true
+position every 10 ms. The first 50 ms after each scripted change are skipped:
+no client can know about a seek before mpv reports a position for it.
+
+Steps to use:
+
+- python clock_drift_check.py
+- exits non-zero if the p99 error is above the drift threshold
+"""
+
+FPS = 24.0
+DURATION = 600.0
+STEP = 0.01
+VERIFY_INTERVAL = 2.0
+DRIFT_THRESHOLD = 0.08
+CLIENT_CLOCK_OFFSET = -1234.5  # client clock = server clock + this
+MEDIA_CLOCK_RATE = 1.0005  # media time runs slightly fast against the wall clock
+SETTLE_TIME = 0.05
+
+# (server time, event, value)
+SCRIPT = [
+    (100.0, "pause", True),
+    (110.0, "pause", False),
+    (200.0, "seek", 1500.0),
+    (300.0, "speed", 1.5),
+]
+
+
+class SimulatedPlayer:
+    def __init__(self):
+        self.base_time = 0.0
+        self.base_media = 0.0
+        self.speed = 1.0
+        self.paused = False
+
+    def position(self, t):
+        if self.paused:
+            return self.base_media
+        return self.base_media + (t - self.base_time) * self.speed * MEDIA_CLOCK_RATE
+
+    def rebase(self, t, media=None):
+        self.base_media = self.position(t) if media is None else media
+        self.base_time = t
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def main():
+    random.seed(7)
+    player = SimulatedPlayer()
+    client = ClockExtrapolator()
+    snapshot = [PlayerSnapshot(paused=False)]
+    inbox = []  # (delivery time, anchor, send time)
+    sent = []
+    now = [0.0]
+
+    def emit(anchor, reason):
+        sent.append(reason)
+        inbox.append((now[0] + random.uniform(0.001, 0.005), anchor, now[0]))
+
+    def observe(**changes):
+        snapshot[0] = snapshot[0]._replace(version=snapshot[0].version + 1, **changes)
+        return snapshot[0]
+
+    stream = AnchorStream(emit, lambda: snapshot[0], DRIFT_THRESHOLD, VERIFY_INTERVAL)
+    stream.start()
+
+    script = list(SCRIPT)
+    errors = []
+    settle_until = 0.0
+    next_frame = 0.0
+    next_check = VERIFY_INTERVAL
+    t = 0.0
+    while t < DURATION:
+        now[0] = t
+
+        while script and script[0][0] <= t:
+            _, event, value = script.pop(0)
+            settle_until = t + SETTLE_TIME
+            if event == "pause":
+                player.rebase(t)
+                player.paused = value
+                stream.on_pause(observe(paused=value, time_pos=player.position(t), time_pos_at=t))
+            elif event == "seek":
+                player.rebase(t, value)
+                stream.mark_seek()
+            elif event == "speed":
+                player.rebase(t)
+                player.speed = value
+                stream.on_speed(observe(speed=value, time_pos=player.position(t), time_pos_at=t))
+
+        if t >= next_frame:
+            next_frame += 1.0 / FPS
+            if not player.paused:
+                stream.on_time_pos(observe(time_pos=player.position(t), time_pos_at=t))
+
+        if t >= next_check:
+            next_check += VERIFY_INTERVAL
+            stream.check_drift(snapshot[0], t)
+
+        while inbox and inbox[0][0] <= t:
+            delivered, anchor, sent_at = inbox.pop(0)
+            local = delivered + CLIENT_CLOCK_OFFSET
+            client.observe_server_time(sent_at, local)
+            client.on_anchor(anchor._asdict(), local)
+
+        predicted = client.position(t + CLIENT_CLOCK_OFFSET)
+        if predicted is not None and t >= settle_until:
+            errors.append(abs(predicted - player.position(t)))
+        t += STEP
+
+    per_minute = len(sent) / (DURATION / 60)
+    p99 = percentile(errors, 99)
+    print("Clock anchor drift check")
+    print("=" * 40)
+    print(f"Anchors sent:   {len(sent)} ({per_minute:.1f}/min, vs {60 / 0.208:.0f}/min polling)")
+    print(f"Reasons:        {', '.join(sorted(set(sent)))}")
+    print(f"Error p50:      {percentile(errors, 50) * 1000:.1f} ms")
+    print(f"Error p99:      {p99 * 1000:.1f} ms")
+    print(f"Error max:      {max(errors) * 1000:.1f} ms")
+
+    if p99 > DRIFT_THRESHOLD:
+        print(f"❌ p99 error above the {DRIFT_THRESHOLD * 1000:.0f} ms drift threshold")
+        sys.exit(1)
+    print("✅ Extrapolated position stays within the drift threshold")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,259 @@
+import argparse
+import asyncio
+import contextlib
+import json
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "backend"))
+
+import websockets
+
+from captures import AudioClipHandler, RawScreenshotHandler, ScreenshotHandler, TimeHarvestHandler
+from latency import LatencyHistogram
+from server import MPVWebSocketServer
+
+"""
+End-to-end latency suite for the server in backend/.
+
+Runs the real MPVWebSocketServer headless (vo=null, ao=null) on a synthetic
+video made with ffmpeg's lavfi sources, connects real WebSocket clients and
+measures:
+
+    connect_to_welcome       client connect -> first state (welcome) received
+    seek_to_client           player seek -> time_update for the new position received
+    screenshot_keypress      mpv keypress -> screenshot capture broadcast received
+    screenshot_raw_request   screenshot_raw request -> encoded bytes ready (response)
+    audio_clip_keypress      clip end keypress -> audio clip broadcast received
+
+Each path reports p50/p95/p99 and whether p95 is under the 20 ms target and
+p99 under the 50 ms hard cap from dreams.md / the screenshot benchmark. The
+JSON goes to stdout or --output, so runs can be diffed between commits.
+
+Steps to use:
+
+- python latency_suite.py [--runs 50] [--output results.json]
+- needs ffmpeg, libmpv, python-mpv and websockets; runs on Linux without a display
+"""
+
+TARGET_MS = 20.0
+HARD_CAP_MS = 50.0
+TIMEOUT = 5.0
+VIDEO_SECONDS = 180
+
+
+def make_video(directory):
+    video = Path(directory) / "synthetic.mkv"
+    subprocess.run([
+        "ffmpeg", "-hide_banner", "-loglevel", "error",
+        "-f", "lavfi", "-i", f"testsrc2=size=1280x720:rate=24:duration={VIDEO_SECONDS}",
+        "-f", "lavfi", "-i", f"sine=frequency=440:sample_rate=48000:duration={VIDEO_SECONDS}",
+        "-c:v", "libx264", "-preset", "ultrafast", "-g", "48", "-c:a", "aac", str(video), "-y"
+    ], check=True)
+    # A cue every two seconds, so the subtitle path is exercised as well
+    cues = []
+    for i in range(VIDEO_SECONDS // 2):
+        start, end = i * 2, i * 2 + 1.5
+        cues.append(f"{i + 1}\n{srt_time(start)} --> {srt_time(end)}\nCue {i + 1}\n")
+    video.with_suffix(".srt").write_text("\n".join(cues), encoding="utf-8")
+    return video
+
+
+def srt_time(seconds):
+    return f"{int(seconds // 3600):02d}:{int(seconds % 3600 // 60):02d}:{seconds % 60:06.3f}".replace(".", ",")
+
+
+class Client:
+    """WebSocket client that timestamps every message on receipt"""
+
+    def __init__(self, websocket):
+        self.websocket = websocket
+        self.messages = asyncio.Queue()
+        self.reader = asyncio.create_task(self._read())
+        self.next_id = 0
+
+    async def _read(self):
+        async for raw in self.websocket:
+            self.messages.put_nowait((time.perf_counter(), json.loads(raw)))
+
+    def drain(self):
+        while not self.messages.empty():
+            self.messages.get_nowait()
+
+    async def wait_for(self, predicate):
+        """perf_counter() at receipt of the first message matching predicate"""
+        while True:
+            received, message = await self.messages.get()
+            if predicate(message):
+                return received
+
+    async def request(self, command, args=None):
+        self.next_id += 1
+        request_id = self.next_id
+        await self.websocket.send(json.dumps({"type": "request", "id": request_id, "command": command, "args": args or {}}))
+        return request_id
+
+    async def close(self):
+        self.reader.cancel()
+        await self.websocket.close()
+
+
+def is_capture(handler, action):
+    def predicate(message):
+        extra = message.get("extra_data") or {}
+        return message.get("type") == "capture" and extra.get("handler") == handler and extra.get("action") == action
+    return predicate
+
+
+async def measure(histogram, failures, name, runs, one_run):
+    for _ in range(runs):
+        try:
+            elapsed = await asyncio.wait_for(one_run(), TIMEOUT)
+        except asyncio.TimeoutError:
+            failures[name] = failures.get(name, 0) + 1
+            continue
+        histogram.record(elapsed)
+
+
+async def run_suite(runs):
+    results = {}
+    failures = {}
+    with tempfile.TemporaryDirectory() as directory:
+        print("Generating synthetic video...", file=sys.stderr)
+        video = make_video(directory)
+
+        server = MPVWebSocketServer(player_options={"vo": "null", "ao": "null"})
+        for handler in (
+            ScreenshotHandler(directory=Path(directory) / "screenshots"),
+            RawScreenshotHandler(),
+            AudioClipHandler(directory=Path(directory) / "audio"),
+            TimeHarvestHandler(),
+        ):
+            server.add_capture_handler(handler)
+        server.start_monitoring()
+        server.load_file(str(video))
+        await server.start_websocket_server("localhost", 0)
+        url = f"ws://localhost:{server.server.sockets[0].getsockname()[1]}"
+        loop = asyncio.get_running_loop()
+
+        while server.state.snapshot.time_pos is None:
+            await asyncio.sleep(0.05)
+
+        try:
+            histogram = results["connect_to_welcome"] = LatencyHistogram("connect_to_welcome")
+
+            async def connect_once():
+                started = time.perf_counter()
+                client = Client(await websockets.connect(url))
+                received = await client.wait_for(lambda message: message.get("type") == "welcome")
+                await client.close()
+                return received - started
+
+            await measure(histogram, failures, "connect_to_welcome", runs, connect_once)
+
+            client = Client(await websockets.connect(url))
+
+            histogram = results["seek_to_client"] = LatencyHistogram("seek_to_client")
+
+            async def seek_once():
+                target = round(random.uniform(10, VIDEO_SECONDS - 30), 1)
+                client.drain()
+                started = time.perf_counter()
+                await loop.run_in_executor(None, server.player.seek, target, "absolute")
+                received = await client.wait_for(lambda message: message.get("type") == "time_update"
+                                                 and abs((message.get("extra_data") or {}).get("time_pos", -1) - target) < 0.5)
+                return received - started
+
+            await measure(histogram, failures, "seek_to_client", runs, seek_once)
+
+            histogram = results["screenshot_keypress"] = LatencyHistogram("screenshot_keypress")
+
+            async def screenshot_once():
+                client.drain()
+                started = time.perf_counter()
+                await loop.run_in_executor(None, server.player.command, "keypress", "k")
+                return await client.wait_for(is_capture("screenshot", "capture")) - started
+
+            await measure(histogram, failures, "screenshot_keypress", runs, screenshot_once)
+
+            histogram = results["screenshot_raw_request"] = LatencyHistogram("screenshot_raw_request")
+
+            async def raw_once():
+                client.drain()
+                started = time.perf_counter()
+                request_id = await client.request("screenshot_raw", {"format": "jpeg", "max_width": 640})
+                return await client.wait_for(lambda message: message.get("type") == "response"
+                                             and message.get("id") == request_id) - started
+
+            await measure(histogram, failures, "screenshot_raw_request", runs, raw_once)
+
+            histogram = results["audio_clip_keypress"] = LatencyHistogram("audio_clip_keypress")
+
+            async def clip_once():
+                await loop.run_in_executor(None, server.player.command, "keypress", "c")
+                await asyncio.sleep(1.0)
+                client.drain()
+                started = time.perf_counter()
+                await loop.run_in_executor(None, server.player.command, "keypress", "n")
+                return await client.wait_for(is_capture("audio_clip", "end")) - started
+
+            await measure(histogram, failures, "audio_clip_keypress", max(1, runs // 5), clip_once)
+
+            await client.close()
+        finally:
+            server.cleanup()
+            server.server.close()
+            await server.server.wait_closed()
+
+    return results, failures
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                              cwd=Path(__file__).resolve().parent).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=50, help="samples per path (audio clips use a fifth)")
+    parser.add_argument("--output", help="write the JSON here instead of stdout")
+    args = parser.parse_args()
+
+    # The server logs to stdout; keep stdout for the JSON
+    with contextlib.redirect_stdout(sys.stderr):
+        results, failures = asyncio.run(run_suite(args.runs))
+    report = {
+        "commit": git_commit(),
+        "platform": platform.platform(),
+        "python": platform.python_version(),
+        "runs": args.runs,
+        "target_ms": TARGET_MS,
+        "hard_cap_ms": HARD_CAP_MS,
+        "results": {},
+    }
+    for name, histogram in results.items():
+        summary = histogram.summary()
+        summary["failures"] = failures.get(name, 0)  # timed out, including failed captures
+        if summary["count"]:
+            summary["p95_under_target"] = summary["p95_ms"] <= TARGET_MS
+            summary["p99_under_hard_cap"] = summary["p99_ms"] <= HARD_CAP_MS
+        report["results"][name] = summary
+        print(histogram.format(), file=sys.stderr)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(output + "\n", encoding="utf-8")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
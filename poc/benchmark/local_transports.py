@@ -0,0 +1,106 @@
+import argparse
+import asyncio
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "backend"))
+
+import websockets
+
+from latency import LatencyHistogram
+from local_transport import connect_framed, serve_framed
+
+"""
+TCP WebSocket vs the local transports in backend/local_transport.py.
+
+Each transport serves the same echo handler, with the signature the server's
+handle_client has, and a client sends a message the size of a typical
+time_update, waits for it to come back, and repeats:
+
+    tcp_websocket     ws://localhost, what the Electron client uses today
+    unix_websocket    the WebSocket protocol over a Unix socket (ws+unix://)
+    unix_framed       length-prefixed frames over a Unix socket, what
+                      Windows named pipes use
+
+Round trip p50/p95/p99 and CPU per message come out per transport. Client and
+server share a process, so the CPU figure (time.process_time()) covers both
+ends of one round trip.
+
+Steps to use:
+
+- python local_transports.py [--messages 5000]
+- Unix only (the framed path also runs on Windows pipes, but not this script)
+"""
+
+MESSAGE = json.dumps({
+    "type": "time_update",
+    "content": "⏱️  12:34.5 / 23:45.6 (52.9%)",
+    "timestamp": 1760000000.123,
+    "extra_data": {"time_pos": 754.512, "progress": 52.941, "formatted_time": "12:34.5", "formatted_duration": "23:45.6"},
+})
+
+
+async def echo(connection):
+    async for message in connection:
+        await connection.send(message)
+
+
+async def round_trips(name, connection, messages):
+    histogram = LatencyHistogram(name)
+    for _ in range(messages // 10):  # warm up
+        await connection.send(MESSAGE)
+        await connection.recv()
+    cpu_started = time.process_time()
+    for _ in range(messages):
+        started = time.perf_counter()
+        await connection.send(MESSAGE)
+        await connection.recv()
+        histogram.record(time.perf_counter() - started)
+    cpu_us = (time.process_time() - cpu_started) / messages * 1_000_000
+    return histogram, cpu_us
+
+
+async def run(messages):
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        server = await websockets.serve(echo, "localhost", 0)
+        port = server.sockets[0].getsockname()[1]
+        async with websockets.connect(f"ws://localhost:{port}") as connection:
+            results.append(await round_trips("tcp_websocket", connection, messages))
+        server.close()
+        await server.wait_closed()
+
+        path = str(Path(directory) / "ws.sock")
+        server = await websockets.unix_serve(echo, path)
+        async with websockets.unix_connect(path) as connection:
+            results.append(await round_trips("unix_websocket", connection, messages))
+        server.close()
+        await server.wait_closed()
+
+        path = str(Path(directory) / "framed.sock")
+        server = await serve_framed(echo, path)
+        connection = await connect_framed(path)
+        results.append(await round_trips("unix_framed", connection, messages))
+        await connection.close()
+        server.close()
+        await server.wait_closed()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=5000, help="round trips per transport")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args.messages))
+    baseline = results[0][0].percentile(50)
+    for histogram, cpu_us in results:
+        print(histogram.format())
+        print(f"   CPU {cpu_us:.1f}µs/round trip, p50 {histogram.percentile(50) / baseline:.2f}x tcp_websocket\n")
+
+
+if __name__ == "__main__":
+    main()
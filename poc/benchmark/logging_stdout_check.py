@@ -0,0 +1,96 @@
+import io
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "backend"))
+
+from latency import LatencyHistogram
+from log import setup_logging, shutdown_logging
+from server import MPVWebSocketServer
+
+"""
+Check that broadcasting does not wait on the console (backend/log.py).
+
+Builds a real MPVWebSocketServer around a stub player (no mpv needed) and
+calls its broadcast_message with a time_update the way the time stream does,
+plus an event, once with console output going to a fast in-memory stream and
+once to a stream that takes 5 ms per write (a slow Windows console).
+For comparison it also times the old behaviour, a print() to the slow stream.
+
+Steps to use:
+
+- python logging_stdout_check.py
+- exits non-zero if broadcast p99 with the slow console is more than 1 ms
+  above the fast one
+"""
+
+CALLS = 500
+SLOW_WRITE = 0.005
+ALLOWED_SLOWDOWN = 0.001
+
+
+class SlowStream(io.StringIO):
+    def write(self, text):
+        time.sleep(SLOW_WRITE)
+        return super().write(text)
+
+
+class StubPlayer:
+    """The parts of mpv.MPV the server touches while setting up and shutting down"""
+
+    def observe_property(self, name, handler):
+        pass
+
+    def event_callback(self, *event_types):
+        return lambda callback: callback
+
+    def on_key_press(self, key):
+        return lambda callback: callback
+
+    def terminate(self):
+        pass
+
+
+def time_broadcasts(stream, name):
+    # No clients and no event loop: broadcast_message logs, and keeps the
+    # event in the replay log, which is the path the time stream's thread takes
+    setup_logging(stream=stream)
+    server = MPVWebSocketServer(player=StubPlayer(), stats_interval=0, handle_signals=False)
+    histogram = LatencyHistogram(name)
+    for i in range(CALLS):
+        started = time.perf_counter()
+        server.broadcast_message("time_update", f"⏱️  0:{i % 60:04.1f}", {"time_pos": i / 24})
+        server.broadcast_message("event", f"Event {i}")
+        histogram.record(time.perf_counter() - started)
+    server.cleanup()
+    shutdown_logging()
+    return histogram
+
+
+def time_prints(stream, name, calls=200):
+    histogram = LatencyHistogram(name)
+    for i in range(calls):
+        started = time.perf_counter()
+        print(f"⏱️  0:{i % 60:04.1f}", file=stream)
+        histogram.record(time.perf_counter() - started)
+    return histogram
+
+
+def main():
+    fast = time_broadcasts(io.StringIO(), "broadcast, fast console")
+    slow = time_broadcasts(SlowStream(), "broadcast, slow console")
+    old = time_prints(SlowStream(), "print(), slow console")
+    for histogram in (fast, slow, old):
+        print(histogram.format())
+
+    slowdown = slow.percentile(99) - fast.percentile(99)
+    print(f"\np99 difference fast vs slow console: {slowdown * 1000:.3f}ms")
+    if slowdown > ALLOWED_SLOWDOWN:
+        print("FAIL: broadcast latency depends on console speed")
+        sys.exit(1)
+    print("OK: broadcast latency does not depend on console speed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "backend"))
+
+from media_index import load_index, probe_timestamps
+
+"""
+Check that backend/media_index.py indexes a real file.
+
+Generates a short clip with ffmpeg (test pattern video with a keyframe every
+48 frames, sine wave audio), indexes it through load_index() with a fresh
+cache directory, and checks the keyframes and audio packets it finds: ffprobe
+lists packets before streams, which once left every index empty. The same
+clip is indexed again as MPEG-TS with timestamps starting at 10s, whose
+keyframes must still be in media time (relative to the container start time).
+
+Steps to use:
+
+- python media_index_check.py
+- needs ffmpeg and ffprobe on PATH; exits non-zero if the index looks wrong
+"""
+
+SECONDS = 6
+GOP = 48  # frames between keyframes at 24 fps: one every 2 seconds
+
+
+def generate(path, *output_options):
+    subprocess.run([
+        "ffmpeg", "-v", "error", "-y",
+        "-f", "lavfi", "-i", f"testsrc2=size=320x240:rate=24:duration={SECONDS}",
+        "-f", "lavfi", "-i", f"sine=frequency=440:duration={SECONDS}",
+        "-c:v", "libx264", "-g", str(GOP), "-keyint_min", str(GOP), "-sc_threshold", "0",
+        "-c:a", "aac", "-shortest", *output_options, str(path)
+    ], check=True)
+
+
+def check(video, cache_dir):
+    failures = []
+    keyframes, audio_packets, start_time = probe_timestamps(video)
+    index = load_index(video, cache_dir=cache_dir)
+    print(f"{video.name}: start_time {index.start_time}")
+    print(f"  keyframes: {list(index.keyframes)}")
+    print(f"  audio packets: {len(index.audio_packets)}, first {list(index.audio_packets[:3])}")
+
+    if not len(index.keyframes):
+        failures.append("no keyframes")
+    elif len(index.keyframes) < SECONDS * 24 // GOP:
+        failures.append(f"expected at least {SECONDS * 24 // GOP} keyframes")
+    if not len(index.audio_packets):
+        failures.append("no audio packets")
+    if list(index.keyframes) != keyframes or list(index.audio_packets) != audio_packets:
+        failures.append("cached index differs from ffprobe")
+    if index.start_time != start_time:
+        failures.append(f"cached start_time {index.start_time} differs from ffprobe's {start_time}")
+    # In media time whatever the container's start time; edit lists can shift pts by a frame or two
+    if abs(index.keyframe_before(3.0) - 2.0) > 0.2:
+        failures.append(f"keyframe before 3.0 is {index.keyframe_before(3.0)}, expected about 2.0")
+    return [f"{video.name}: {failure}" for failure in failures]
+
+
+def main():
+    failures = []
+    with tempfile.TemporaryDirectory() as directory:
+        mp4 = Path(directory) / "sample.mp4"
+        generate(mp4)
+        failures += check(mp4, Path(directory) / "cache")
+        # MPEG-TS with timestamps starting at 10s, as broadcast recordings do
+        ts = Path(directory) / "sample.ts"
+        generate(ts, "-output_ts_offset", "10")
+        failures += check(ts, Path(directory) / "cache")
+
+    for failure in failures:
+        print(f"FAIL {failure}")
+    if not failures:
+        print("OK")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+import argparse
+import asyncio
+import json
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "backend"))
+
+import mpv
+
+from ipc_player import IPCConnection, IPCPlayer
+from latency import LatencyHistogram
+
+"""
+libmpv (python-mpv) vs mpv's JSON IPC socket (backend/ipc_player.py).
+
+poc/low_latency_basic.py says libmpv is "10x faster" than JSON IPC; this puts
+numbers on it. Both backends drive a headless mpv (vo=null, ao=null) playing a
+lavfi test source, so no media file is needed. Measured per backend:
+
+    get_property          one blocking time-pos read, as the server does it
+    property_change       set speed -> observer callback with the new value
+    throughput            time-pos reads per second; libmpv one after another,
+                          IPC with --pipeline requests in flight (request_id)
+
+Steps to use:
+
+- python player_backends.py [--runs 2000] [--pipeline 64] [--output results.json]
+- needs mpv on PATH plus libmpv and python-mpv; Unix sockets only
+"""
+
+SOURCE = "av://lavfi:testsrc2=size=320x240:rate=24"
+THROUGHPUT_SECONDS = 3.0
+
+
+def time_get_property(name, read, runs):
+    histogram = LatencyHistogram(f"{name} get_property")
+    for _ in range(runs):
+        started = time.perf_counter()
+        read()
+        histogram.record(time.perf_counter() - started)
+    return histogram
+
+
+def time_property_change(name, player, runs):
+    """player needs observe_property(name, handler) and a settable speed"""
+    histogram = LatencyHistogram(f"{name} property_change")
+    changed = threading.Event()
+    expected = [None]
+
+    def on_speed(_, value):
+        if value == expected[0]:
+            changed.set()
+
+    player.observe_property("speed", on_speed)
+    for i in range(runs):
+        expected[0] = 1.0 + (i % 2 + 1) / 10
+        changed.clear()
+        started = time.perf_counter()
+        player.speed = expected[0]
+        if changed.wait(2.0):
+            histogram.record(time.perf_counter() - started)
+    player.speed = 1.0
+    return histogram
+
+
+def libmpv_throughput(player):
+    reads = 0
+    deadline = time.perf_counter() + THROUGHPUT_SECONDS
+    while time.perf_counter() < deadline:
+        player.time_pos
+        reads += 1
+    return reads / THROUGHPUT_SECONDS
+
+
+async def ipc_throughput(socket_path, pipeline):
+    connection = IPCConnection()
+    await connection.connect(socket_path)
+    reads = 0
+    deadline = time.perf_counter() + THROUGHPUT_SECONDS
+    try:
+        while time.perf_counter() < deadline:
+            await asyncio.gather(*(connection.get_property("time-pos") for _ in range(pipeline)))
+            reads += pipeline
+    finally:
+        await connection.close()
+    return reads / THROUGHPUT_SECONDS
+
+
+def wait_for_socket(path, process, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while not Path(path).exists():
+        if process.poll() is not None or time.monotonic() > deadline:
+            raise RuntimeError("mpv did not create its IPC socket")
+        time.sleep(0.05)
+
+
+def run(runs, pipeline):
+    results = {}
+
+    player = mpv.MPV(vo="null", ao="null", idle=True)
+    try:
+        player.play(SOURCE)
+        player.wait_until_playing()
+        results["libmpv"] = {
+            "get_property": time_get_property("libmpv", lambda: player.time_pos, runs),
+            "property_change": time_property_change("libmpv", player, max(1, runs // 10)),
+            "throughput": libmpv_throughput(player),
+        }
+    finally:
+        player.terminate()
+
+    with tempfile.TemporaryDirectory() as directory:
+        socket_path = str(Path(directory) / "mpv.sock")
+        process = subprocess.Popen(
+            ["mpv", "--no-config", "--vo=null", "--ao=null", "--idle=yes",
+             f"--input-ipc-server={socket_path}", SOURCE],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        try:
+            wait_for_socket(socket_path, process)
+            player = IPCPlayer(socket_path)
+            while player.time_pos is None:
+                time.sleep(0.05)
+            results["ipc"] = {
+                "get_property": time_get_property("ipc", lambda: player.time_pos, runs),
+                "property_change": time_property_change("ipc", player, max(1, runs // 10)),
+                "throughput": asyncio.run(ipc_throughput(socket_path, pipeline)),
+            }
+            player.terminate()
+        finally:
+            process.terminate()
+            process.wait()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=2000, help="get_property samples (a tenth for property_change)")
+    parser.add_argument("--pipeline", type=int, default=64, help="IPC requests in flight for throughput")
+    parser.add_argument("--output", help="also write the summaries here as JSON")
+    args = parser.parse_args()
+
+    results = run(args.runs, args.pipeline)
+    report = {}
+    for backend, measured in results.items():
+        report[backend] = {"throughput_per_s": round(measured["throughput"])}
+        for key in ("get_property", "property_change"):
+            print(measured[key].format())
+            report[backend][key] = measured[key].summary()
+        print(f"{backend} throughput: {measured['throughput']:,.0f} reads/s\n")
+
+    ratio = report["ipc"]["get_property"]["p50_ms"] / max(report["libmpv"]["get_property"]["p50_ms"], 1e-6)
+    print(f"get_property p50: IPC is {ratio:.1f}x libmpv")
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2) + "\n", encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
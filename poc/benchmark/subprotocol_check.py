@@ -0,0 +1,70 @@
+import asyncio
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "backend"))
+
+import websockets
+
+from server import open_listeners
+import wire
+
+"""
+Check that the server's listeners accept clients whatever subprotocols they offer.
+
+websockets >= 14 rejects a client that offers no subprotocol with HTTP 400
+when the server lists some, which is what the Electron GUI (new WebSocket(url))
+and every plain websockets.connect() do. Starts the real listeners from
+server.py (TCP and a Unix socket) with a handler that answers with the
+negotiated protocol, and connects offering nothing, the binary subprotocol
+and the JSON one.
+
+Steps to use:
+
+- python subprotocol_check.py
+- exits non-zero if any connection fails or negotiates the wrong protocol
+"""
+
+CASES = [
+    (None, wire.PROTOCOL_JSON),
+    ([wire.PROTOCOL_BINARY], wire.PROTOCOL_BINARY),
+    ([wire.PROTOCOL_JSON], wire.PROTOCOL_JSON),
+    (["something.else", wire.PROTOCOL_BINARY], wire.PROTOCOL_BINARY),
+]
+
+
+async def answer_protocol(websocket):
+    await websocket.send(wire.negotiated_protocol(websocket))
+
+
+async def check(connect, name):
+    failures = 0
+    for offered, expected in CASES:
+        try:
+            async with connect(subprotocols=offered) as websocket:
+                got = await asyncio.wait_for(websocket.recv(), 5)
+        except Exception as e:
+            got = f"{type(e).__name__}: {e}"
+        ok = got == expected
+        failures += not ok
+        print(f"{'OK  ' if ok else 'FAIL'} {name} offering {offered}: {got}")
+    return failures
+
+
+async def main():
+    with tempfile.TemporaryDirectory() as directory:
+        local_path = str(Path(directory) / "mpvmod.sock")
+        server, local_server = await open_listeners(answer_protocol, "localhost", 0, local_path)
+        port = server.sockets[0].getsockname()[1]
+        try:
+            failures = await check(lambda **kw: websockets.connect(f"ws://localhost:{port}", **kw), "tcp")
+            failures += await check(lambda **kw: websockets.unix_connect(local_path, **kw), "unix")
+        finally:
+            server.close()
+            local_server.close()
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -64,4 +64,28 @@ def copy_file_to_clipboard(file_path):
         try:
             win32clipboard.CloseClipboard()
         except:
-            pass
\ No newline at end of file
+            pass
+
+def copy_image_to_clipboard(bmp_bytes):
+    """
+    Copy an in-memory BMP image to the Windows clipboard so it can be pasted
+    into image editors and Anki. CF_DIB is a BMP without its 14-byte file header.
+    """
+    try:
+        win32clipboard.OpenClipboard()
+        win32clipboard.EmptyClipboard()
+        win32clipboard.SetClipboardData(win32con.CF_DIB, bytes(bmp_bytes[14:]))
+        print(f"✓ Image copied to clipboard ({len(bmp_bytes)} bytes)")
+        return True
+
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        print(f"✗ Error copying image to clipboard: {e}")
+        return False
+
+    finally:
+        try:
+            win32clipboard.CloseClipboard()
+        except:
+            pass
@@ -30,10 +30,12 @@ path_to_video = r"C:\Users\roly\Videos\How to Learn Japanese with Netflix + Anki
 t1 = 8
 t2 = 16
 
-subprocess.run([
-   "ffmpeg", "-ss", str(t1), path_to_video,  "-to", str(t2), 
-   "-vn", "-acodec", "mp3", "snippet.mp3", "-y"
-], capture_output=True)
+# Only when run directly, not when grab_audio.py imports this module
+if __name__ == "__main__":
+   subprocess.run([
+      "ffmpeg", "-ss", str(t1), path_to_video,  "-to", str(t2), 
+      "-vn", "-acodec", "mp3", "snippet.mp3", "-y"
+   ], capture_output=True)
 
 
 def make_audio_mp3(video_path: str, t1, t2, dest_file_path: Path):
@@ -1,4 +1,3 @@
-import time
 import threading
 from pathlib import Path
 import signal
@@ -12,7 +11,9 @@ os.environ["PATH"] = r"C:\Users\roly\mpv-dev-x86_64" + os.pathsep + os.environ["
 import mpv
 
 from clipboard import copy_file_to_clipboard
-from ffmpeg_util import make_audio_mp3, seconds_to_time_str
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+from audio_clips import ClipEncoder
 
 
 test_video = r"C:\Users\roly\Videos\How to Learn Japanese with Netflix + Anki [CfvDKgNUSi8].mp4"
@@ -23,6 +24,9 @@ Steps to use:
 - Run the script
 - press C, then N a little later, to clip an audio clip
 - find it in /audio
+
+Clips encode on a ClipEncoder in the background, so C/N can be pressed again
+right away; each clip is copied to the clipboard when its ffmpeg job finishes.
 """
 
 class MPVAudioCapture:
@@ -33,6 +37,7 @@ class MPVAudioCapture:
         self.running = True
 
         self.start_of_recording = None
+        self.clips = ClipEncoder()
         
         print("🔧 Initializing MPV...")
         
@@ -94,23 +99,27 @@ class MPVAudioCapture:
             print("EXPECTING: ", file_name)
             mp3_with_timestamp = Path.cwd() / "audio" / file_name
             
-            # Take mp3 using MPV command
-            # FIXME: Replace with ffmpeg callout
-            make_audio_mp3(test_video, self.start_of_recording, end_timestamp, mp3_with_timestamp)
-            
-            # Wait for file to be saved
-            time.sleep(0.5)  # FIXME: what if ffmpeg takes 1.2 sec?
-            
-            if mp3_with_timestamp.exists():
-                print(f"✓ mp3 saved: {mp3_with_timestamp}")
-                copy_file_to_clipboard(mp3_with_timestamp)
-            else:
-                print("✗ mp3 file was not created")
-                
+            # Returns right away; on_clip_done runs when ffmpeg finishes
+            source = self.player.path or test_video
+            job = self.clips.submit(source, self.start_of_recording, end_timestamp, mp3_with_timestamp)
+            job.add_done_callback(self.on_clip_done)
+
         except Exception as e:
             traceback.print_exc()
             print(f"✗ mp3 recording failed: {e}")
 
+    def on_clip_done(self, job):
+        if job.cancelled():
+            print("✗ mp3 recording replaced by a newer one")
+            return
+        try:
+            clip = job.result()
+        except Exception as e:
+            print(f"✗ mp3 recording failed: {e}")
+            return
+        print(f"✓ mp3 saved in {clip.encode:.2f}s (queued {clip.queued:.2f}s): {clip.path}")
+        copy_file_to_clipboard(clip.path)
+
     def quit_player(self, *args):
         """Quit the player"""
         print("\n👋 Quitting...")
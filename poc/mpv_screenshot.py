@@ -1,4 +1,3 @@
-import time
 import threading
 from pathlib import Path
 import signal
@@ -10,7 +9,11 @@ import os
 os.environ["PATH"] = r"C:\Users\roly\mpv-dev-x86_64" + os.pathsep + os.environ["PATH"]
 
 import mpv
-from clipboard import create_dropfile_structure, copy_file_to_clipboard
+from clipboard import create_dropfile_structure, copy_file_to_clipboard, copy_image_to_clipboard
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+from screenshot_pipeline import ScreenshotPipeline
+from raw_screenshots import RawScreenshotPipeline
 
 """
 Steps to use:
@@ -19,13 +22,19 @@ Steps to use:
 - press the k hotkey to take screenshot
 - find it in /screenshots
 
+With mode='raw' the frame is grabbed with screenshot-raw and encoded in memory
+on a thread pool. It goes straight to the clipboard and is only written to
+/screenshots if save_to_disk is set.
+
 """
 
 class MPVScreenshotCapture:
-    def __init__(self, hotkey='k', screenshot_name='screenshot-poc.jpg'):
+    def __init__(self, hotkey='k', screenshot_name='screenshot-poc.jpg', mode='file', save_to_disk=False):
         # self.screenshot_path = Path.cwd() / screenshot_name
         self.screenshot_name = screenshot_name
         self.hotkey = hotkey.lower()
+        self.mode = mode
+        self.save_to_disk = save_to_disk
         self.running = True
         
         print("🔧 Initializing MPV...")
@@ -39,6 +48,8 @@ class MPVScreenshotCapture:
                 input_vo_keyboard=True  # Enable keyboard input
             )
             print("✅ MPV initialized successfully")
+            self.pipeline = ScreenshotPipeline(self.player)
+            self.raw_pipeline = RawScreenshotPipeline(self.player)
 
             @self.player.on_key_press(self.hotkey)
             def on_screenshot_hotkey():
@@ -70,25 +81,46 @@ class MPVScreenshotCapture:
             print("EXPECTING: ", file_name)
             screenshot_with_timestamp = Path.cwd() / "screenshots" / file_name
             
-            # Take screenshot using MPV command
-            self.player.command('screenshot-to-file', str(screenshot_with_timestamp))
-            
-            # Wait for file to be saved
-            time.sleep(0.5)
-            
-            if screenshot_with_timestamp.exists():
-                print(f"✓ Screenshot saved: {screenshot_with_timestamp}")
-                copy_file_to_clipboard(screenshot_with_timestamp)
-            else:
-                print("✗ Screenshot file was not created")
-                
+            if self.mode == 'raw':
+                # Grabs on this thread, encodes on the pool; on_encoded runs when the bytes are ready
+                path = screenshot_with_timestamp if self.save_to_disk else None
+                image_format = 'jpeg' if self.save_to_disk else 'bmp'
+                self.raw_pipeline.capture(image_format=image_format, path=path).add_done_callback(self.on_encoded)
+                return
+
+            # Returns right away; on_saved runs once mpv reports the file is written
+            self.pipeline.capture(screenshot_with_timestamp).add_done_callback(self.on_saved)
+
         except Exception as e:
             traceback.print_exc()
             print(f"✗ Screenshot failed: {e}")
 
+    def on_saved(self, future):
+        try:
+            screenshot = future.result()
+        except Exception as e:
+            print(f"✗ Screenshot failed: {e}")
+            return
+        print(f"✓ Screenshot saved in {screenshot.latency * 1000:.1f}ms: {screenshot.path}")
+        copy_file_to_clipboard(screenshot.path)
+
+    def on_encoded(self, future):
+        try:
+            screenshot = future.result()
+        except Exception as e:
+            print(f"✗ Screenshot failed: {e}")
+            return
+        print(f"✓ Screenshot {screenshot.width}x{screenshot.height} {screenshot.format} "
+              f"(grab {screenshot.grab_latency * 1000:.1f}ms, encode {screenshot.encode_latency * 1000:.1f}ms)")
+        if screenshot.path:
+            copy_file_to_clipboard(screenshot.path)
+        else:
+            copy_image_to_clipboard(screenshot.data)
+
     def quit_player(self, *args):
         """Quit the player"""
         print("\n👋 Quitting...")
+        print(self.pipeline.histogram.format())
         self.running = False
         self.player.terminate()
 
@@ -139,6 +171,9 @@ class MPVScreenshotCapture:
             print(f"❌ Error during playback: {e}")
         finally:
             self.running = False
+            print(self.pipeline.histogram.format())
+            self.pipeline.stop()
+            self.raw_pipeline.stop()
             if hasattr(self, 'player') and self.player:
                 try:
                     self.player.terminate()
@@ -151,6 +186,7 @@ def main():
     HOTKEY = 'k'  # Change this to your preferred hotkey
 
     SCREENSHOT_NAME = f'screenshot-poc'
+    MODE = 'file'  # 'raw' to encode in memory instead of going through disk
     
     # Check if video file provided as argument
     video_file = None
@@ -169,7 +205,8 @@ def main():
     # Create and run the capture tool
     capture_tool = MPVScreenshotCapture(
         hotkey=HOTKEY,
-        screenshot_name=SCREENSHOT_NAME
+        screenshot_name=SCREENSHOT_NAME,
+        mode=MODE
     )
     
     capture_tool.run(video_file)